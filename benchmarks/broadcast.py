@@ -0,0 +1,164 @@
+"""
+BroadcastDispatcher against a local Bot API stub.
+
+The stub speaks just enough HTTP/1.1 for sendMessage and enforces
+Telegram-like flood limits (--stub-rate messages per second per bot, one
+per second per chat, 429 with retry_after beyond that); every
+--blocked-every-th chat has blocked the bot (403). Recipients and progress
+come from the load-test fake backend, so no database is needed.
+
+The broadcast is cancelled after --interrupt-after seconds and resumed from
+its checkpoint. The report shows throughput, 429s and how many recipients
+were missed or messaged twice across the interruption.
+
+Run from the repository root:
+    PYTHONPATH=src:src/database python -m benchmarks.broadcast
+    PYTHONPATH=src:src/database python -m benchmarks.broadcast --users 20000 --rate 200 --stub-rate 250
+"""
+import argparse
+import asyncio
+import json
+import math
+import tempfile
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Optional
+
+from benchmarks.load.dataset import Dataset
+from benchmarks.load.fake import FakeStore, fake_pool_factory
+from src.config.config import DatabaseConfig
+from src.config.logging_config import setup_logging
+from src.database.manager import DatabaseManager
+from services.broadcast import BroadcastDispatcher
+from services.rate_limiter import InMemoryRateLimiter
+from services.telegram_bot import TelegramBotClient
+
+_GLOBAL = 0
+
+
+class BotApiStub:
+    """sendMessage endpoint with flood limits, counts deliveries per chat"""
+
+    def __init__(self, rate: float, blocked_every: int = 50):
+        burst = max(1, int(rate))
+        self._global = InMemoryRateLimiter(burst, burst / rate)
+        self._per_chat = InMemoryRateLimiter(1, 1.0)
+        self.blocked_every = blocked_every
+        self.delivered: Counter = Counter()
+        self.rejected = 0
+        self.blocked = 0
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self, host: str = "127.0.0.1") -> str:
+        self._server = await asyncio.start_server(self._serve, host, 0)
+        port = self._server.sockets[0].getsockname()[1]
+        return f"http://{host}:{port}"
+
+    async def stop(self) -> None:
+        self._server.close()
+        await self._server.wait_closed()
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while request_line := await reader.readline():
+                headers = {}
+                while (line := await reader.readline()) not in (b"\r\n", b"\n", b""):
+                    name, _, value = line.decode().partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get("content-length", 0)))
+                status, payload = self.handle(request_line.decode().split()[1], body)
+                data = json.dumps(payload).encode()
+                writer.write(
+                    b"HTTP/1.1 %d X\r\ncontent-type: application/json\r\ncontent-length: %d\r\n\r\n%s"
+                    % (status, len(data), data)
+                )
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    def handle(self, path: str, body: bytes):
+        if not path.endswith("/sendMessage"):
+            return 404, {"ok": False, "error_code": 404, "description": "Not Found"}
+        chat_id = json.loads(body)["chat_id"]
+        now = time.monotonic()
+        wait = max(self._per_chat.retry_after(chat_id, now), self._global.retry_after(_GLOBAL, now))
+        if wait > 0:
+            self.rejected += 1
+            return 429, {
+                "ok": False, "error_code": 429, "description": "Too Many Requests",
+                "parameters": {"retry_after": math.ceil(wait)},
+            }
+        self._per_chat.try_acquire(chat_id, now)
+        self._global.try_acquire(_GLOBAL, now)
+        if chat_id % self.blocked_every == 0:
+            self.blocked += 1
+            return 403, {"ok": False, "error_code": 403, "description": "Forbidden: bot was blocked by the user"}
+        self.delivered[chat_id] += 1
+        return 200, {"ok": True, "result": {"message_id": sum(self.delivered.values()), "chat": {"id": chat_id}}}
+
+
+async def run(args: argparse.Namespace) -> None:
+    dataset = Dataset(users=args.users, transactions=0)
+    stub = BotApiStub(args.stub_rate, args.blocked_every)
+    base_url = await stub.start()
+
+    factory = fake_pool_factory(FakeStore(dataset), latency=args.latency_ms / 1000, write_latency=args.latency_ms / 1000)
+    db = DatabaseManager(DatabaseConfig(DB_MAX_POOL_SIZE=10), pool_factory=factory)
+    await db.connect()
+    bot = TelegramBotClient("0:stub", base_url, max_concurrency=args.concurrency)
+    dispatcher = BroadcastDispatcher(
+        db, bot, concurrency=args.concurrency, global_rate=args.rate,
+        checkpoint_interval=args.checkpoint_interval
+    )
+    try:
+        broadcast = await dispatcher.create("Scheduled maintenance tonight")
+        started = time.perf_counter()
+        first = asyncio.create_task(dispatcher.run(broadcast.broadcast_id))
+        await asyncio.sleep(args.interrupt_after)
+        first.cancel()
+        try:
+            await first
+        except asyncio.CancelledError:
+            pass
+        interrupted = await dispatcher.broadcasts.get(broadcast.broadcast_id)
+        print(f"interrupted at user_id {interrupted.last_user_id}, {interrupted.sent} sent")
+
+        (finished,) = await dispatcher.resume_unfinished()
+        elapsed = time.perf_counter() - started
+    finally:
+        await bot.close()
+        await db.disconnect()
+        await stub.stop()
+
+    expected = {telegram_id for _, telegram_id in FakeStore(dataset).recipients(0, dataset.users)}
+    reachable = {chat_id for chat_id in expected if chat_id % args.blocked_every}
+    print(
+        f"status {finished.status}: {sum(stub.delivered.values())} delivered to {len(stub.delivered)} chats "
+        f"in {elapsed:.1f}s ({sum(stub.delivered.values()) / elapsed:.1f} msg/s incl. the pause)\n"
+        f"recipients {len(expected)}, missed {len(reachable - set(stub.delivered))}, "
+        f"sent twice {sum(1 for count in stub.delivered.values() if count > 1)}, "
+        f"blocked {stub.blocked}, 429s {stub.rejected}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--rate", type=float, default=100.0, help="Dispatcher global messages per second")
+    parser.add_argument("--stub-rate", type=float, default=120.0, help="Stub flood limit, messages per second")
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--blocked-every", type=int, default=50)
+    parser.add_argument("--checkpoint-interval", type=float, default=1.0)
+    parser.add_argument("--interrupt-after", type=float, default=5.0)
+    parser.add_argument("--latency-ms", type=float, default=0.5, help="Fake database round-trip")
+    args = parser.parse_args()
+
+    setup_logging("WARNING", str(Path(tempfile.mkdtemp()) / "broadcast.log"))
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Import-time regression guard based on python -X importtime.
+
+For each entry point it reports the cumulative import time, fails when it
+exceeds the budget, and fails when a module that should load lazily was
+imported anyway.
+
+Run from the repository root:
+    python -m benchmarks.import_time
+    python -m benchmarks.import_time --budget-scale 2   # slower CI machines
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+# (label, code, budget in ms, modules that must not be imported)
+ENTRY_POINTS = [
+    (
+        "config",
+        "import src.config.config",
+        250,
+        ("structlog", "asyncpg"),
+    ),
+    (
+        "db worker settings",
+        # No TELEGRAM_*/ZARINPAL_* in the environment: AppConfig must not be validated
+        "from src.config.config import get_settings; get_settings().db",
+        250,
+        ("structlog", "asyncpg"),
+    ),
+    (
+        "models",
+        "import src.database.models",
+        75,
+        ("structlog", "asyncpg", "pydantic", "numpy"),
+    ),
+    (
+        "logging config",
+        "import src.config.logging_config",
+        100,
+        ("structlog",),
+    ),
+]
+
+
+def measure(code: str, baseline: frozenset = frozenset()) -> tuple:
+    env = {
+        key: value for key, value in os.environ.items()
+        if not key.upper().startswith(("TELEGRAM_", "ZARINPAL_"))
+    }
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True, text=True, env=env,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+
+    total_us = 0
+    imported = set()
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        # Top-level imports are indented by exactly one space
+        top_level = not name.startswith("  ")
+        name = name.strip()
+        imported.add(name)
+        # Interpreter startup imports are excluded
+        if top_level and name not in baseline:
+            total_us += int(cumulative)
+    return total_us / 1000, imported
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--budget-scale", type=float, default=1.0)
+    args = parser.parse_args()
+
+    _, startup = measure("pass")
+    startup = frozenset(startup)
+
+    failures = []
+    for label, code, budget, forbidden in ENTRY_POINTS:
+        try:
+            elapsed, imported = measure(code, startup)
+        except RuntimeError as e:
+            failures.append(f"{label}: {e}")
+            print(f"{label:<20}  FAILED")
+            continue
+
+        budget *= args.budget_scale
+        leaked = sorted(name for name in forbidden if name in imported)
+        status = "ok"
+        if elapsed > budget:
+            status = "over budget"
+            failures.append(f"{label}: {elapsed:.1f} ms > {budget:.0f} ms")
+        if leaked:
+            status = "eager imports"
+            failures.append(f"{label}: imported {', '.join(leaked)}")
+        print(f"{label:<20}{elapsed:8.1f} ms  (budget {budget:.0f} ms)  {status}")
+
+    if failures:
+        print("\n".join(failures), file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
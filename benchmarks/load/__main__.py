@@ -0,0 +1,211 @@
+"""
+Load test for the repository layer.
+
+Drives the message_storm, purchase_spike, expiry_sweep and mixed scenarios
+against UserRepository, PlanRepository, SubscriptionRepository and
+TransactionRepository at each concurrency level. Every (scenario,
+concurrency) run gets a fresh DatabaseManager, so pool metrics don't carry
+over. Writes p50/p95/p99 latency, throughput and pool saturation per run,
+plus per-scenario curves over concurrency, as JSON tagged with the git
+commit.
+
+The fake backend (default) needs no database and models round-trips with
+--latency-ms/--write-latency-ms. The postgres backend uses the DB_* settings
+(or --dsn) and expects the schema (python -m src.database.migrations upgrade);
+--seed replaces its data with the generated dataset first.
+
+Run from the repository root (repositories import models/database/... as
+top-level packages):
+    PYTHONPATH=src:src/database python -m benchmarks.load --output results.json
+    PYTHONPATH=src:src/database python -m benchmarks.load --backend postgres --seed \\
+        --users 1000000 --transactions 5000000 --concurrency 16,64,256
+    PYTHONPATH=src:src/database python -m benchmarks.load --compare results.json
+"""
+import argparse
+import asyncio
+import json
+import subprocess
+import sys
+import tempfile
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List
+
+from benchmarks.load.dataset import Dataset, seed_postgres
+from benchmarks.load.fake import FakeStore, fake_pool_factory
+from benchmarks.load.workloads import SCENARIOS, Context, run_scenario
+from src.config.config import DatabaseConfig
+from src.config.logging_config import setup_logging
+from src.database.manager import DatabaseManager
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def make_db(args: argparse.Namespace, dataset: Dataset) -> DatabaseManager:
+    overrides: Dict[str, Any] = {
+        "DB_MAX_POOL_SIZE": args.pool_size,
+        "DB_MIN_POOL_SIZE": min(args.pool_size, DatabaseConfig.model_fields["DB_MIN_POOL_SIZE"].default),
+        "DB_INSTRUMENTATION_ENABLED": True,
+    }
+    if args.dsn:
+        overrides["DB_DSN"] = args.dsn
+    config = DatabaseConfig(**overrides)
+
+    if args.backend == "fake":
+        factory = fake_pool_factory(
+            FakeStore(dataset),
+            latency=args.latency_ms / 1000,
+            write_latency=args.write_latency_ms / 1000,
+            seed=args.seed_rng
+        )
+        return DatabaseManager(config, pool_factory=factory)
+    return DatabaseManager(config)
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    dataset = Dataset(users=args.users, transactions=args.transactions)
+
+    if args.seed:
+        if args.backend != "postgres":
+            raise SystemExit("--seed needs --backend postgres")
+        db = make_db(args, dataset)
+        await db.connect()
+        try:
+            print(f"seeding {args.users} users, {args.transactions} transactions", file=sys.stderr)
+            await seed_postgres(db, dataset)
+        finally:
+            await db.disconnect()
+
+    results: List[Dict[str, Any]] = []
+    for name in args.scenarios:
+        for concurrency in args.concurrency:
+            db = make_db(args, dataset)
+            await db.connect()
+            try:
+                ctx = Context.build(db, dataset, batch_window=args.batch_window)
+                result = await run_scenario(
+                    ctx, SCENARIOS[name], concurrency, args.duration, seed=args.seed_rng
+                )
+            finally:
+                await db.disconnect()
+            results.append(result)
+            total = result["total"]
+            print(
+                f"{name:<15} c={concurrency:<5}"
+                f"{total['throughput_per_s']:>10.1f} ops/s   "
+                f"p50 {total['p50_ms']:8.2f} ms   p95 {total['p95_ms']:8.2f} ms   "
+                f"p99 {total['p99_ms']:8.2f} ms   "
+                f"saturation {result['pool'].get('saturation', 0):.2f}   "
+                f"errors {total['errors']}",
+                file=sys.stderr
+            )
+
+    return {
+        "commit": git_commit(),
+        "started_at": datetime.now(timezone.utc).isoformat(),
+        "backend": args.backend,
+        "pool_size": args.pool_size,
+        "batch_window": args.batch_window,
+        "duration_s": args.duration,
+        "dataset": {
+            "users": dataset.users,
+            "transactions": dataset.transactions,
+            "subscriptions": dataset.subscriptions,
+            "expired_subscriptions": dataset.expired_subscriptions,
+        },
+        "results": results,
+        "curves": curves(results),
+    }
+
+
+def curves(results: List[Dict[str, Any]]) -> Dict[str, List[Dict[str, Any]]]:
+    """Throughput, tail latency and pool saturation over concurrency per scenario"""
+    by_scenario: Dict[str, List[Dict[str, Any]]] = {}
+    for result in results:
+        by_scenario.setdefault(result["scenario"], []).append({
+            "concurrency": result["concurrency"],
+            "throughput_per_s": result["total"]["throughput_per_s"],
+            "p99_ms": result["total"]["p99_ms"],
+            "pool_utilization": result["pool"].get("utilization"),
+            "pool_saturation": result["pool"].get("saturation"),
+            "acquire_wait_p95_ms": result["pool"]["acquire_wait"].get("p95"),
+        })
+    return by_scenario
+
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any]) -> None:
+    """Print throughput and p99 change per run present in both reports"""
+    previous = {(r["scenario"], r["concurrency"]): r["total"] for r in baseline["results"]}
+    print(f"{baseline['commit']} -> {current['commit']}", file=sys.stderr)
+    for result in current["results"]:
+        before = previous.get((result["scenario"], result["concurrency"]))
+        if before is None:
+            continue
+        after = result["total"]
+        print(
+            f"{result['scenario']:<15} c={result['concurrency']:<5}"
+            f"throughput {_change(before['throughput_per_s'], after['throughput_per_s'])}   "
+            f"p99 {_change(before['p99_ms'], after['p99_ms'])}",
+            file=sys.stderr
+        )
+
+
+def _change(before: float, after: float) -> str:
+    if not before:
+        return f"{after:.2f}"
+    return f"{before:.2f} -> {after:.2f} ({(after - before) / before:+.1%})"
+
+
+def _int_list(value: str) -> List[int]:
+    return [int(item) for item in value.split(",") if item]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backend", choices=("fake", "postgres"), default="fake")
+    parser.add_argument("--dsn", help="Postgres DSN, defaults to the DB_* settings")
+    parser.add_argument("--seed", action="store_true", help="Replace database contents with the dataset first")
+    parser.add_argument("--users", type=int, default=1_000_000)
+    parser.add_argument("--transactions", type=int, default=5_000_000)
+    parser.add_argument(
+        "--scenarios", type=lambda value: value.split(","), default=list(SCENARIOS),
+        help=f"Comma-separated, any of {', '.join(SCENARIOS)}"
+    )
+    parser.add_argument("--concurrency", type=_int_list, default=[8, 32, 128])
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds per run")
+    parser.add_argument("--pool-size", type=int, default=20)
+    parser.add_argument("--batch-window", type=float, default=None, help="Repository micro-batching window in seconds")
+    parser.add_argument("--latency-ms", type=float, default=0.5, help="Fake backend read round-trip")
+    parser.add_argument("--write-latency-ms", type=float, default=1.0, help="Fake backend write round-trip")
+    parser.add_argument("--seed-rng", type=int, default=0)
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout")
+    parser.add_argument("--compare", help="Earlier JSON report to compare against")
+    args = parser.parse_args()
+
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+
+    # Keep per-batch INFO logs of the sweeper out of the report
+    setup_logging("WARNING", str(Path(tempfile.mkdtemp()) / "load.log"))
+    report = asyncio.run(run(args))
+
+    if args.compare:
+        compare(json.loads(Path(args.compare).read_text()), report)
+    text = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(text)
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,293 @@
+"""
+Deterministic load-test dataset.
+
+Every row is derived from its index, so the fake backend can answer reads
+for millions of users without holding them in memory and a Postgres seed
+always produces the same data for the same sizes.
+"""
+import random
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Iterator, List, Optional, Sequence, Tuple
+
+FIRST_TELEGRAM_ID = 100_000_000
+GB = 1024 ** 3
+
+# (name, price_toman, traffic_bytes, duration_days)
+PLANS: Sequence[Tuple[str, int, int, int]] = (
+    ("weekly", 45_000, 10 * GB, 7),
+    ("monthly", 150_000, 50 * GB, 30),
+    ("quarterly", 400_000, 150 * GB, 90),
+    ("yearly", 1_400_000, 600 * GB, 365),
+)
+
+FREE_TRIAL_BYTES = 1 * GB
+FREE_TRIAL_DAYS = 7
+# Days of traffic_usage history per subscribed user
+USAGE_DAYS = 3
+
+# (price_toman, traffic_bytes)
+EXTRA_TRAFFIC_PLANS: Sequence[Tuple[int, int]] = (
+    (30_000, 10 * GB),
+    (120_000, 50 * GB),
+)
+
+
+@dataclass
+class Dataset:
+    """
+    users: every user_index in [0, users) is a registered user.
+    Every subscribed_every-th user has a paid subscription, every
+    expired_every-th one of those is past expires_at (work for the sweeper).
+    The user after each subscribed one is on a free trial, and every
+    outbox_every-th user has an undelivered outbox event.
+    """
+
+    users: int = 1_000_000
+    transactions: int = 5_000_000
+    subscribed_every: int = 3
+    expired_every: int = 10
+    banned_every: int = 200
+    outbox_every: int = 100
+    hot_fraction: float = 0.01
+    hot_share: float = 0.5
+    # Subscription expiry is relative to now so Postgres' NOW() agrees with it
+    now: datetime = field(default_factory=lambda: datetime.now().replace(microsecond=0))
+
+    # ----- users -----
+
+    def telegram_id(self, user_index: int) -> int:
+        return FIRST_TELEGRAM_ID + user_index
+
+    def user_index(self, telegram_id: int) -> Optional[int]:
+        index = telegram_id - FIRST_TELEGRAM_ID
+        return index if 0 <= index < self.users else None
+
+    def profile(self, telegram_id: int) -> Tuple[str, str, str]:
+        """(username, first_name, last_name)"""
+        return f"user{telegram_id}", "Load", f"Test{telegram_id % 1000}"
+
+    def user_row(self, user_index: int) -> tuple:
+        """User columns in model field order"""
+        telegram_id = self.telegram_id(user_index)
+        return (
+            user_index + 1,
+            telegram_id,
+            *self.profile(telegram_id),
+            user_index % self.banned_every == 0,
+            self.now - timedelta(minutes=user_index),
+        )
+
+    def pick_user(self, rng: random.Random) -> int:
+        """Skewed telegram_id: hot_share of the traffic comes from the hot_fraction most active users"""
+        if rng.random() < self.hot_share:
+            return self.telegram_id(rng.randrange(max(1, int(self.users * self.hot_fraction))))
+        return self.telegram_id(rng.randrange(self.users))
+
+    # ----- plans -----
+
+    def plan_row(self, plan_index: int) -> tuple:
+        """Plan columns in model field order"""
+        return (plan_index + 1, *PLANS[plan_index])
+
+    def extra_traffic_plan_row(self, plan_index: int) -> tuple:
+        """Extra traffic plan columns in model field order"""
+        return (plan_index + 1, *EXTRA_TRAFFIC_PLANS[plan_index])
+
+    # ----- subscriptions -----
+
+    def is_subscribed(self, user_index: int) -> bool:
+        return user_index % self.subscribed_every == 0
+
+    def is_expired(self, user_index: int) -> bool:
+        return self.is_subscribed(user_index) and (user_index // self.subscribed_every) % self.expired_every == 0
+
+    @property
+    def subscriptions(self) -> int:
+        return (self.users + self.subscribed_every - 1) // self.subscribed_every
+
+    @property
+    def expired_subscriptions(self) -> int:
+        return (self.subscriptions + self.expired_every - 1) // self.expired_every
+
+    def subscription_row(self, user_index: int) -> tuple:
+        """Subscription columns in model field order, user_index must be subscribed"""
+        _, _, traffic_bytes, duration_days = PLANS[user_index % len(PLANS)]
+        started_at = self.now - timedelta(days=user_index % duration_days)
+        expires_at = started_at + timedelta(days=duration_days)
+        if self.is_expired(user_index):
+            expires_at = self.now - timedelta(hours=1 + user_index % 48)
+        return (
+            user_index // self.subscribed_every + 1,
+            self.telegram_id(user_index),
+            None,
+            traffic_bytes,
+            (user_index * 7919) % traffic_bytes,
+            0,
+            started_at,
+            expires_at,
+            True,
+        )
+
+    def has_free_subscription(self, user_index: int) -> bool:
+        return user_index % self.subscribed_every == 1
+
+    def free_subscription_row(self, user_index: int) -> tuple:
+        """Free subscription columns in model field order, user_index must have one"""
+        started_at = self.now - timedelta(days=user_index % FREE_TRIAL_DAYS)
+        return (
+            user_index // self.subscribed_every + 1,
+            self.telegram_id(user_index),
+            FREE_TRIAL_BYTES,
+            (user_index * 7919) % FREE_TRIAL_BYTES,
+            started_at,
+            started_at + timedelta(days=FREE_TRIAL_DAYS),
+        )
+
+    def traffic_usage_rows(self, user_index: int) -> Iterator[tuple]:
+        """(telegram_id, used_bytes, recorded_at) for each of the last USAGE_DAYS days"""
+        telegram_id = self.telegram_id(user_index)
+        for day in range(USAGE_DAYS):
+            yield (
+                telegram_id,
+                (user_index * 7919 + day) % GB,
+                self.now - timedelta(days=day, minutes=user_index % 1440),
+            )
+
+    def expired_user_indexes(self) -> Iterator[int]:
+        for subscription_index in range(0, self.subscriptions, self.expired_every):
+            yield subscription_index * self.subscribed_every
+
+    # ----- transactions -----
+
+    def transaction_row(self, transaction_index: int) -> tuple:
+        """Transaction columns in model field order"""
+        user_index = transaction_index % self.users
+        plan_index = transaction_index % len(PLANS)
+        status = "failed" if transaction_index % 17 == 0 else "completed"
+        created_at = self.now - timedelta(seconds=transaction_index * 6)
+        return (
+            transaction_index + 1,
+            self.telegram_id(user_index),
+            "plan_purchase",
+            status,
+            plan_index + 1,
+            None,
+            PLANS[plan_index][1],
+            f"S{transaction_index:035d}",
+            0 if status == "failed" else 10_000_000 + transaction_index,
+            created_at,
+            None if status == "failed" else created_at,
+            PLANS[plan_index][2],
+        )
+
+    def user_transaction_rows(self, telegram_id: int, limit: int) -> List[tuple]:
+        """Newest-first history of one user, synthesized from its telegram_id"""
+        user_index = self.user_index(telegram_id)
+        if user_index is None:
+            return []
+        per_user = self.transactions // max(1, self.users)
+        return [
+            self.transaction_row(user_index + i * self.users)
+            for i in range(min(limit, per_user))
+        ]
+
+
+async def seed_postgres(db, dataset: Dataset, chunk_size: int = 50_000) -> None:
+    """
+    Replace every table the hot queries read with the dataset using COPY.
+    Destructive: only meant for a throwaway database.
+    """
+    # revenue_daily is rolled up from transactions by a trigger, so it goes
+    # too or a reseed counts the revenue twice
+    await db.execute(
+        """
+        TRUNCATE users, plans, extra_traffic_plans, subscriptions, free_subscriptions,
+            transactions, purchases, revenue_daily, rollup_backfills, traffic_usage, outbox
+        RESTART IDENTITY CASCADE
+        """
+    )
+
+    await db.copy_records(
+        "plans",
+        list(PLANS),
+        columns=("name", "price_toman", "traffic_bytes", "duration_days")
+    )
+    await db.copy_records(
+        "extra_traffic_plans",
+        list(EXTRA_TRAFFIC_PLANS),
+        columns=("price_toman", "traffic_bytes")
+    )
+
+    await _copy_chunked(
+        db, "users",
+        (dataset.user_row(i)[1:6] for i in range(dataset.users)),
+        ("telegram_id", "username", "first_name", "last_name", "is_banned"),
+        chunk_size
+    )
+    await _copy_chunked(
+        db, "subscriptions",
+        (
+            dataset.subscription_row(i)[1:]
+            for i in range(0, dataset.users, dataset.subscribed_every)
+        ),
+        (
+            "telegram_id", "purchase_id", "traffic_limit_bytes", "traffic_used_bytes",
+            "extra_traffic_bytes", "started_at", "expires_at", "is_active"
+        ),
+        chunk_size
+    )
+    await _copy_chunked(
+        db, "free_subscriptions",
+        (
+            dataset.free_subscription_row(i)[1:]
+            for i in range(dataset.users) if dataset.has_free_subscription(i)
+        ),
+        ("telegram_id", "traffic_limit_bytes", "traffic_used_bytes", "started_at", "expires_at"),
+        chunk_size
+    )
+    await _copy_chunked(
+        db, "traffic_usage",
+        (
+            row
+            for i in range(0, dataset.users, dataset.subscribed_every)
+            for row in dataset.traffic_usage_rows(i)
+        ),
+        ("telegram_id", "used_bytes", "recorded_at"),
+        chunk_size
+    )
+    await _copy_chunked(
+        db, "transactions",
+        (dataset.transaction_row(i)[1:] for i in range(dataset.transactions)),
+        (
+            "telegram_id", "transaction_type", "status", "plan_id", "extra_traffic_plan_id",
+            "price_toman", "authority", "ref_id", "created_at", "completed_at", "traffic_bytes"
+        ),
+        chunk_size
+    )
+    await _copy_chunked(
+        db, "outbox",
+        (
+            (dataset.telegram_id(i), "load_test.seeded", "{}")
+            for i in range(0, dataset.users, dataset.outbox_every)
+        ),
+        ("telegram_id", "event_type", "payload"),
+        chunk_size
+    )
+    await db.execute(
+        """
+        ANALYZE users, plans, extra_traffic_plans, subscriptions, free_subscriptions,
+            transactions, revenue_daily, traffic_usage, outbox
+        """
+    )
+
+
+async def _copy_chunked(db, table: str, rows: Iterator[tuple], columns: Sequence[str], chunk_size: int) -> None:
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            await db.copy_records(table, chunk, columns=columns)
+            chunk = []
+    if chunk:
+        await db.copy_records(table, chunk, columns=columns)
@@ -0,0 +1,532 @@
+"""
+In-memory stand-in for an asyncpg pool, plugged in through
+DatabaseManager(pool_factory=...).
+
+Connections are limited to max_size like the real pool and every call waits
+a simulated round-trip, so pool contention, the supervisor's limiter and the
+repositories' single-flight/batching behave as they would against Postgres.
+Queries are answered from the deterministic Dataset plus an overlay of rows
+written during the run; only the query shapes the workloads use are known.
+"""
+import asyncio
+import json
+import random
+import re
+from contextlib import asynccontextmanager
+from dataclasses import fields
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from src.database.models import (
+    Broadcast, ExtraTrafficPlan, FreeSubscription, Plan, Purchase, Subscription, Transaction, User
+)
+from benchmarks.load.dataset import Dataset, EXTRA_TRAFFIC_PLANS, PLANS
+
+_record_types: Dict[Tuple[str, ...], type] = {}
+
+
+def record_type(names: Sequence[str]) -> type:
+    """Tuple subclass that also behaves like a mapping, like asyncpg.Record"""
+    names = tuple(names)
+    cls = _record_types.get(names)
+    if cls is None:
+        index = {name: i for i, name in enumerate(names)}
+
+        class Record(tuple):
+            __slots__ = ()
+
+            def __getitem__(self, key):
+                if isinstance(key, str):
+                    return tuple.__getitem__(self, index[key])
+                return tuple.__getitem__(self, key)
+
+            def keys(self):
+                return names
+
+        cls = _record_types[names] = Record
+    return cls
+
+
+def _model_record(model: type) -> type:
+    return record_type([field.name for field in fields(model)])
+
+
+UserRecord = _model_record(User)
+PlanRecord = _model_record(Plan)
+ExtraTrafficPlanRecord = _model_record(ExtraTrafficPlan)
+SubscriptionRecord = _model_record(Subscription)
+FreeSubscriptionRecord = _model_record(FreeSubscription)
+TransactionRecord = _model_record(Transaction)
+PurchaseRecord = _model_record(Purchase)
+BroadcastRecord = _model_record(Broadcast)
+SweptRecord = record_type(("id", "telegram_id", "reason"))
+
+
+class FakeStore:
+    """Dataset rows plus everything written during the run"""
+
+    def __init__(self, dataset: Dataset):
+        self.dataset = dataset
+        self.users: Dict[int, tuple] = {}
+        # telegram_id -> latest subscription, None once expired and swept
+        self.subscriptions: Dict[int, Optional[tuple]] = {}
+        self.transactions: Dict[str, tuple] = {}
+        self._next_user_id = dataset.users + 1
+        self._next_subscription_id = dataset.subscriptions + 1
+        self._next_transaction_id = dataset.transactions + 1
+        self._next_purchase_id = 1
+        self.broadcasts: Dict[int, list] = {}
+        self.outbox: List[tuple] = []
+        self._expired = dataset.expired_user_indexes()
+
+    def user(self, telegram_id: int) -> Optional[tuple]:
+        row = self.users.get(telegram_id)
+        if row is None:
+            index = self.dataset.user_index(telegram_id)
+            if index is not None:
+                row = self.dataset.user_row(index)
+        return row
+
+    def upsert_user(self, telegram_id: int, username, first_name, last_name) -> tuple:
+        row = self.user(telegram_id)
+        if row is None:
+            row = (self._next_user_id, telegram_id, username, first_name, last_name, False, self.dataset.now)
+            self._next_user_id += 1
+        else:
+            row = (row[0], telegram_id, username, first_name, last_name, row[5], row[6])
+        self.users[telegram_id] = row
+        return row
+
+    def load_user(self, telegram_id: int, username, first_name, last_name) -> Tuple[tuple, bool]:
+        """Upsert that skips an unchanged profile, returns (row, written)"""
+        row = self.user(telegram_id)
+        if row is not None and row[2:5] == (username, first_name, last_name):
+            return row, False
+        return self.upsert_user(telegram_id, username, first_name, last_name), True
+
+    def recipients(self, after_user_id: int, limit: int) -> List[tuple]:
+        """Non-banned (user_id, telegram_id) after after_user_id, user_id is user_index + 1"""
+        rows = []
+        for index in range(max(0, after_user_id), self.dataset.users):
+            if index % self.dataset.banned_every:
+                rows.append((index + 1, self.dataset.telegram_id(index)))
+                if len(rows) == limit:
+                    break
+        return rows
+
+    def create_broadcast(self, text: str, parse_mode: Optional[str]) -> list:
+        now = datetime.now()
+        row = [len(self.broadcasts) + 1, text, parse_mode, "pending", 0, 0, 0, 0, now, now]
+        self.broadcasts[row[0]] = row
+        return row
+
+    def update_broadcast(self, broadcast_id: int, **values) -> int:
+        row = self.broadcasts.get(broadcast_id)
+        if row is None:
+            return 0
+        names = [field.name for field in fields(Broadcast)]
+        for name, value in values.items():
+            row[names.index(name)] = value
+        row[names.index("updated_at")] = datetime.now()
+        return 1
+
+    def active_subscription(self, telegram_id: int) -> Optional[tuple]:
+        if telegram_id in self.subscriptions:
+            row = self.subscriptions[telegram_id]
+            return row if row is not None and row[8] else None
+        index = self.dataset.user_index(telegram_id)
+        if index is None or not self.dataset.is_subscribed(index) or self.dataset.is_expired(index):
+            return None
+        return self.dataset.subscription_row(index)
+
+    def free_subscription(self, telegram_id: int) -> Optional[tuple]:
+        index = self.dataset.user_index(telegram_id)
+        if index is None or not self.dataset.has_free_subscription(index):
+            return None
+        return self.dataset.free_subscription_row(index)
+
+    def deactivate_subscriptions(self, telegram_id: int) -> int:
+        active = self.active_subscription(telegram_id)
+        if active is None:
+            return 0
+        self.subscriptions[telegram_id] = active[:8] + (False,)
+        return 1
+
+    def add_extra_traffic(self, telegram_id: int, extra_traffic_bytes: int) -> Optional[tuple]:
+        """Credit the latest unexpired subscription, reactivating it"""
+        if telegram_id in self.subscriptions:
+            row = self.subscriptions[telegram_id]
+        else:
+            row = self.active_subscription(telegram_id)
+        if row is None or row[7] <= datetime.now():
+            return None
+        row = row[:3] + (row[3] + extra_traffic_bytes,) + row[4:8] + (True,)
+        self.subscriptions[telegram_id] = row
+        return row
+
+    def create_subscription(self, telegram_id: int, purchase_id: int, traffic_limit_bytes: int, days: int) -> tuple:
+        now = datetime.now()
+        row = (
+            self._next_subscription_id, telegram_id, purchase_id, traffic_limit_bytes,
+            0, 0, now, now + timedelta(days=days), True
+        )
+        self._next_subscription_id += 1
+        self.subscriptions[telegram_id] = row
+        return row
+
+    def sweep(self, limit: int) -> List[tuple]:
+        swept = []
+        for index in self._expired:
+            telegram_id = self.dataset.telegram_id(index)
+            if telegram_id in self.subscriptions:
+                continue
+            self.subscriptions[telegram_id] = None
+            subscription_id = self.dataset.subscription_row(index)[0]
+            swept.append((subscription_id, telegram_id, "expired"))
+            self.add_outbox_event(
+                telegram_id, "subscription.deactivated",
+                json.dumps({"subscription_id": subscription_id, "reason": "expired"})
+            )
+            if len(swept) >= limit:
+                break
+        return swept
+
+    def create_transaction(self, telegram_id, transaction_type, price_toman, authority, plan_id, extra_plan_id) -> tuple:
+        row = (
+            self._next_transaction_id, telegram_id, transaction_type, "pending",
+            plan_id, extra_plan_id, price_toman, authority, 0, datetime.now(), None, None
+        )
+        self._next_transaction_id += 1
+        self.transactions[authority] = row
+        return row
+
+    def settle(self, authority: str, status: str, ref_id: int) -> Optional[tuple]:
+        row = self.transactions.get(authority)
+        if row is None or row[3] != "pending":
+            return None
+        completed_at = datetime.now() if status == "completed" else None
+        row = row[:3] + (status,) + row[4:8] + (ref_id, row[9], completed_at, row[11])
+        self.transactions[authority] = row
+        return row
+
+    def add_outbox_event(self, telegram_id: int, event_type: str, payload: str) -> int:
+        self.outbox.append((len(self.outbox) + 1, telegram_id, event_type, payload))
+        return len(self.outbox)
+
+    def create_purchase(self, telegram_id: int, transaction_id: int, price_toman: int) -> tuple:
+        row = (self._next_purchase_id, telegram_id, transaction_id, price_toman, datetime.now())
+        self._next_purchase_id += 1
+        return row
+
+
+def _one(rows: List[tuple]) -> Optional[tuple]:
+    return rows[0] if rows else None
+
+
+class FakeConnection:
+    """Answers the workload query shapes from a FakeStore"""
+
+    def __init__(self, pool: "FakePool"):
+        self._pool = pool
+        self._store = pool.store
+        self._registry_statements: Dict[str, Any] = {}
+        # writes None: the handler returns (rows, writes)
+        self._handlers: List[Tuple[re.Pattern, Callable[..., Any], Optional[bool]]] = [
+            (re.compile(r"^SELECT 1$"), lambda: [(1,)], False),
+            (re.compile(r"^INSERT INTO users \(telegram_id, username, first_name, last_name\) VALUES"),
+             self._upsert_user, True),
+            (re.compile(r"^SELECT is_banned FROM users WHERE telegram_id = \$1$"), self._is_banned, False),
+            (re.compile(r"^SELECT .+ FROM users WHERE telegram_id = \$1$"), self._user, False),
+            (re.compile(r"^SELECT .+ FROM users WHERE telegram_id = ANY\(\$1::bigint\[\]\)$"), self._users, False),
+            (re.compile(r"^SELECT .+ FROM plans ORDER BY price_toman"), self._plans, False),
+            (re.compile(r"^SELECT .+ FROM plans WHERE plan_id = \$1$"), self._plan, False),
+            (re.compile(r"^SELECT .+ FROM extra_traffic_plans ORDER BY price_toman"),
+             self._extra_traffic_plans, False),
+            (re.compile(r"^WITH existing AS \( ?SELECT .+ FROM users WHERE telegram_id = \$1"),
+             self._user_context, None),
+            (re.compile(r"^SELECT .+ FROM free_subscriptions WHERE telegram_id = \$1"),
+             self._free_subscription, False),
+            (re.compile(r"^SELECT .+ FROM subscriptions WHERE telegram_id = \$1 AND is_active = TRUE"),
+             self._active_subscription, False),
+            (re.compile(r"^SELECT DISTINCT ON \(telegram_id\) \* FROM subscriptions WHERE telegram_id = ANY"),
+             self._active_subscriptions, False),
+            (re.compile(r"^UPDATE subscriptions SET is_active = FALSE WHERE telegram_id = \$1 AND is_active = TRUE$"),
+             self._deactivate_subscriptions, True),
+            (re.compile(r"^UPDATE subscriptions s SET traffic_limit_bytes = s\.traffic_limit_bytes \+ \$2"),
+             self._add_extra_traffic, True),
+            (re.compile(r"^INSERT INTO subscriptions"), self._create_subscription, True),
+            (re.compile(r"^WITH due AS \( ?SELECT id FROM subscriptions"), self._sweep, True),
+            (re.compile(r"^INSERT INTO transactions"), self._create_transaction, True),
+            (re.compile(r"^UPDATE transactions SET status = \$2, ref_id = \$3 WHERE authority = \$1"),
+             self._settle, True),
+            (re.compile(r"^SELECT \* FROM transactions WHERE authority = ANY\(\$1::text\[\]\) AND status = 'pending'"),
+             self._pending_transactions, False),
+            (re.compile(r"^SELECT \* FROM transactions WHERE telegram_id = \$1 ORDER BY created_at DESC"),
+             self._user_transactions, False),
+            (re.compile(r"^INSERT INTO purchases"), self._create_purchase, True),
+            (re.compile(r"^INSERT INTO outbox"), self._add_outbox_event, True),
+            (re.compile(r"^SELECT user_id, telegram_id FROM users WHERE user_id > \$1 AND is_banned = FALSE"),
+             self._recipients, False),
+            (re.compile(r"^INSERT INTO broadcasts"), self._create_broadcast, True),
+            (re.compile(r"^SELECT .+ FROM broadcasts WHERE broadcast_id = \$1"), self._broadcast, False),
+            (re.compile(r"^SELECT .+ FROM broadcasts WHERE status IN"), self._unfinished_broadcasts, False),
+            (re.compile(r"^UPDATE broadcasts SET last_user_id = \$2"), self._checkpoint_broadcast, True),
+            (re.compile(r"^UPDATE broadcasts SET status = \$2"), self._broadcast_status, True),
+        ]
+
+    async def _run(self, query: str, args: Sequence[Any]) -> List[tuple]:
+        text = " ".join(query.split())
+        for pattern, handler, writes in self._handlers:
+            if pattern.match(text):
+                rows = handler(*args)
+                if writes is None:
+                    rows, writes = rows
+                await self._pool.round_trip(writes, len(rows) if isinstance(rows, list) else 1)
+                return rows
+        raise NotImplementedError(f"Fake backend has no handler for: {text[:120]}")
+
+    # ----- asyncpg.Connection surface -----
+
+    async def fetch(self, query: str, *args, timeout: Optional[float] = None) -> List[tuple]:
+        return await self._run(query, args)
+
+    async def fetchrow(self, query: str, *args, timeout: Optional[float] = None) -> Optional[tuple]:
+        return _one(await self._run(query, args))
+
+    async def fetchval(self, query: str, *args, timeout: Optional[float] = None) -> Any:
+        row = _one(await self._run(query, args))
+        return row[0] if row else None
+
+    async def execute(self, query: str, *args, timeout: Optional[float] = None) -> str:
+        result = await self._run(query, args)
+        if isinstance(result, str):
+            return result
+        return f"{query.split()[0].upper()} {len(result)}"
+
+    async def copy_records_to_table(self, table: str, records, columns=None, timeout: Optional[float] = None) -> str:
+        count = len(list(records))
+        await self._pool.round_trip(True, count)
+        return f"COPY {count}"
+
+    async def prepare(self, query: str) -> "FakeStatement":
+        await self._pool.round_trip(False, 0)
+        return FakeStatement(self, query)
+
+    @asynccontextmanager
+    async def transaction(self):
+        await self._pool.round_trip(False, 0)
+        yield
+        await self._pool.round_trip(True, 0)
+
+    # ----- handlers, return rows -----
+
+    def _upsert_user(self, telegram_id, username, first_name, last_name):
+        return [UserRecord(self._store.upsert_user(telegram_id, username, first_name, last_name))]
+
+    def _user_context(self, telegram_id, username, first_name, last_name):
+        row, written = self._store.load_user(telegram_id, username, first_name, last_name)
+        subscription = self._store.active_subscription(telegram_id) or (None,) * len(fields(Subscription))
+        free = self._store.free_subscription(telegram_id) or (None,) * len(fields(FreeSubscription))
+        return [row + subscription + free], written
+
+    def _is_banned(self, telegram_id):
+        row = self._store.user(telegram_id)
+        return [(row[5],)] if row else []
+
+    def _user(self, telegram_id):
+        row = self._store.user(telegram_id)
+        return [UserRecord(row)] if row else []
+
+    def _users(self, telegram_ids):
+        rows = (self._store.user(telegram_id) for telegram_id in telegram_ids)
+        return [UserRecord(row) for row in rows if row]
+
+    def _plans(self):
+        return [PlanRecord(self._store.dataset.plan_row(i)) for i in range(len(PLANS))]
+
+    def _plan(self, plan_id):
+        if 1 <= plan_id <= len(PLANS):
+            return [PlanRecord(self._store.dataset.plan_row(plan_id - 1))]
+        return []
+
+    def _extra_traffic_plans(self):
+        dataset = self._store.dataset
+        return [ExtraTrafficPlanRecord(dataset.extra_traffic_plan_row(i)) for i in range(len(EXTRA_TRAFFIC_PLANS))]
+
+    def _active_subscription(self, telegram_id):
+        row = self._store.active_subscription(telegram_id)
+        return [SubscriptionRecord(row)] if row else []
+
+    def _free_subscription(self, telegram_id):
+        row = self._store.free_subscription(telegram_id)
+        return [FreeSubscriptionRecord(row)] if row else []
+
+    def _active_subscriptions(self, telegram_ids):
+        rows = (self._store.active_subscription(telegram_id) for telegram_id in telegram_ids)
+        return [SubscriptionRecord(row) for row in rows if row]
+
+    def _deactivate_subscriptions(self, telegram_id):
+        return f"UPDATE {self._store.deactivate_subscriptions(telegram_id)}"
+
+    def _add_extra_traffic(self, telegram_id, extra_traffic_bytes):
+        row = self._store.add_extra_traffic(telegram_id, extra_traffic_bytes)
+        return [SubscriptionRecord(row)] if row else []
+
+    def _create_subscription(self, telegram_id, purchase_id, traffic_limit_bytes, days):
+        return [SubscriptionRecord(self._store.create_subscription(telegram_id, purchase_id, traffic_limit_bytes, days))]
+
+    def _sweep(self, limit):
+        return [SweptRecord(row) for row in self._store.sweep(limit)]
+
+    def _create_transaction(self, *args):
+        return [TransactionRecord(self._store.create_transaction(*args))]
+
+    def _settle(self, authority, status, ref_id, pending_window):
+        row = self._store.settle(authority, status, ref_id)
+        return [TransactionRecord(row)] if row else []
+
+    def _pending_transactions(self, authorities, pending_window):
+        rows = (self._store.transactions.get(authority) for authority in authorities)
+        return [TransactionRecord(row) for row in rows if row and row[3] == "pending"]
+
+    def _user_transactions(self, telegram_id, limit):
+        return [TransactionRecord(row) for row in self._store.dataset.user_transaction_rows(telegram_id, limit)]
+
+    def _create_purchase(self, telegram_id, transaction_id, price_toman):
+        return [PurchaseRecord(self._store.create_purchase(telegram_id, transaction_id, price_toman))]
+
+    def _add_outbox_event(self, telegram_id, event_type, payload):
+        return [(self._store.add_outbox_event(telegram_id, event_type, payload),)]
+
+    def _recipients(self, after_user_id, limit):
+        return self._store.recipients(after_user_id, limit)
+
+    def _create_broadcast(self, text, parse_mode):
+        return [BroadcastRecord(self._store.create_broadcast(text, parse_mode))]
+
+    def _broadcast(self, broadcast_id):
+        row = self._store.broadcasts.get(broadcast_id)
+        return [BroadcastRecord(row)] if row else []
+
+    def _unfinished_broadcasts(self):
+        return [
+            BroadcastRecord(row) for row in self._store.broadcasts.values()
+            if row[3] in ("pending", "running")
+        ]
+
+    def _checkpoint_broadcast(self, broadcast_id, last_user_id, sent, failed, blocked):
+        updated = self._store.update_broadcast(
+            broadcast_id, last_user_id=last_user_id, sent=sent, failed=failed, blocked=blocked
+        )
+        return f"UPDATE {updated}"
+
+    def _broadcast_status(self, broadcast_id, status):
+        return f"UPDATE {self._store.update_broadcast(broadcast_id, status=status)}"
+
+
+class FakeStatement:
+    """Prepared statement bound to its connection"""
+
+    __slots__ = ("_conn", "_query")
+
+    def __init__(self, conn: FakeConnection, query: str):
+        self._conn = conn
+        self._query = query
+
+    async def fetch(self, *args) -> List[tuple]:
+        return await self._conn.fetch(self._query, *args)
+
+    async def fetchrow(self, *args) -> Optional[tuple]:
+        return await self._conn.fetchrow(self._query, *args)
+
+    async def fetchval(self, *args) -> Any:
+        return await self._conn.fetchval(self._query, *args)
+
+
+class _FakeAcquire:
+    """Both awaitable and an async context manager, like asyncpg's PoolAcquireContext"""
+
+    __slots__ = ("_pool", "_conn")
+
+    def __init__(self, pool: "FakePool"):
+        self._pool = pool
+        self._conn = None
+
+    def __await__(self):
+        return self._pool._acquire().__await__()
+
+    async def __aenter__(self) -> FakeConnection:
+        self._conn = await self._pool._acquire()
+        return self._conn
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        await self._pool.release(self._conn)
+
+
+class FakePool:
+    """
+    max_size connections; every call costs latency seconds (write_latency for
+    writes) scaled by a random factor in [0.5, 1.5), plus per_row for each row.
+    """
+
+    def __init__(
+            self,
+            store: FakeStore,
+            max_size: int,
+            init: Optional[Callable[[FakeConnection], Any]] = None,
+            latency: float = 0.0005,
+            write_latency: float = 0.001,
+            per_row: float = 0.000002,
+            seed: int = 0
+    ):
+        self.store = store
+        self.max_size = max_size
+        self.latency = latency
+        self.write_latency = write_latency
+        self.per_row = per_row
+        self._init = init
+        self._rng = random.Random(seed)
+        self._slots = asyncio.Semaphore(max_size)
+        self._idle: List[FakeConnection] = []
+
+    async def round_trip(self, writes: bool, rows: int) -> None:
+        base = self.write_latency if writes else self.latency
+        await asyncio.sleep(base * (0.5 + self._rng.random()) + rows * self.per_row)
+
+    def acquire(self, timeout: Optional[float] = None) -> _FakeAcquire:
+        return _FakeAcquire(self)
+
+    async def _acquire(self) -> FakeConnection:
+        await self._slots.acquire()
+        try:
+            if self._idle:
+                return self._idle.pop()
+            conn = FakeConnection(self)
+            # Connection setup: TCP + auth, a few round-trips
+            for _ in range(3):
+                await self.round_trip(False, 0)
+            if self._init is not None:
+                await self._init(conn)
+            return conn
+        except BaseException:
+            self._slots.release()
+            raise
+
+    async def release(self, conn: FakeConnection) -> None:
+        self._idle.append(conn)
+        self._slots.release()
+
+    async def expire_connections(self) -> None:
+        self._idle.clear()
+
+    async def close(self) -> None:
+        self._idle.clear()
+
+
+def fake_pool_factory(store: FakeStore, **latency) -> Callable[..., Any]:
+    """pool_factory for DatabaseManager creating a FakePool over store"""
+
+    async def create_pool(max_size: int = 10, init=None, **kwargs) -> FakePool:
+        return FakePool(store, max_size, init=init, **latency)
+
+    return create_pool
@@ -0,0 +1,275 @@
+"""
+Load-test workloads: operations built from the repositories, scenarios
+mixing them, and a closed-loop driver collecting latencies and pool samples.
+"""
+import asyncio
+import random
+import time
+import uuid
+from collections import Counter, defaultdict
+from contextlib import suppress
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from benchmarks.load.dataset import Dataset
+from repositories.plan_repository import PlanRepository
+from repositories.purchase_repository import PurchaseRepository
+from repositories.subscription_repository import SubscriptionRepository
+from repositories.transaction_repository import TransactionRepository
+from repositories.user_context_loader import UserContextLoader
+from repositories.user_repository import UserRepository
+from services.expiry_sweeper import ExpirySweeper
+
+
+@dataclass
+class Context:
+    db: Any
+    dataset: Dataset
+    users: UserRepository
+    plans: PlanRepository
+    subscriptions: SubscriptionRepository
+    transactions: TransactionRepository
+    purchases: PurchaseRepository
+    user_contexts: UserContextLoader
+
+    @classmethod
+    def build(cls, db, dataset: Dataset, batch_window: Optional[float] = None) -> "Context":
+        return cls(
+            db=db,
+            dataset=dataset,
+            users=UserRepository(db, batch_window=batch_window),
+            plans=PlanRepository(db),
+            subscriptions=SubscriptionRepository(db, batch_window=batch_window),
+            transactions=TransactionRepository(db),
+            purchases=PurchaseRepository(db),
+            user_contexts=UserContextLoader(db),
+        )
+
+
+# ===== OPERATIONS =====
+
+async def message(ctx: Context, rng: random.Random) -> None:
+    """Per-update hot path: upsert the sender, check the ban flag, load the subscription"""
+    telegram_id = ctx.dataset.pick_user(rng)
+    await ctx.users.upsert_user(telegram_id, *ctx.dataset.profile(telegram_id))
+    if not await ctx.users.is_banned(telegram_id):
+        await ctx.subscriptions.get_active_paid_subscription(telegram_id)
+
+
+async def message_sequential(ctx: Context, rng: random.Random) -> None:
+    """Full per-update lookup with one call per query, free subscription included"""
+    telegram_id = ctx.dataset.pick_user(rng)
+    await ctx.users.upsert_user(telegram_id, *ctx.dataset.profile(telegram_id))
+    if not await ctx.users.is_banned(telegram_id):
+        if await ctx.subscriptions.get_active_paid_subscription(telegram_id) is None:
+            await ctx.subscriptions.get_free_subscription(telegram_id)
+
+
+async def message_context(ctx: Context, rng: random.Random) -> None:
+    """Same lookup as message_sequential through UserContextLoader, one round-trip"""
+    telegram_id = ctx.dataset.pick_user(rng)
+    await ctx.user_contexts.load(telegram_id, *ctx.dataset.profile(telegram_id))
+
+
+async def purchase(ctx: Context, rng: random.Random) -> None:
+    """Plan purchase: pending transaction, then settle + purchase + subscription in one transaction"""
+    telegram_id = ctx.dataset.pick_user(rng)
+    plan = rng.choice(await ctx.plans.get_all_plans())
+    authority = f"L{uuid.uuid4().hex}"
+    await ctx.transactions.create_transaction(
+        telegram_id, "plan_purchase", plan.price_toman, authority, plan.plan_id
+    )
+    async with ctx.db.transaction() as conn:
+        transaction = await ctx.transactions.settle(authority, "completed", rng.randrange(10 ** 9), conn=conn)
+        bought = await ctx.purchases.create_purchase(
+            telegram_id, transaction.transaction_id, transaction.price_toman, conn=conn
+        )
+        await ctx.subscriptions.creat_subscription(
+            telegram_id, bought.purchase_id, plan.traffic_bytes, plan.duration_days, conn=conn
+        )
+
+
+async def history(ctx: Context, rng: random.Random) -> None:
+    """Transaction history screen"""
+    await ctx.transactions.get_user_transactions(ctx.dataset.pick_user(rng))
+
+
+OPERATIONS: Dict[str, Callable[[Context, random.Random], Awaitable[None]]] = {
+    "message": message,
+    "message_sequential": message_sequential,
+    "message_context": message_context,
+    "purchase": purchase,
+    "history": history,
+}
+
+
+# ===== SCENARIOS =====
+
+@dataclass(frozen=True)
+class Scenario:
+    name: str
+    # operation name -> weight
+    mix: Dict[str, float]
+    # Run one full ExpirySweeper pass next to the mix
+    sweep: bool = False
+
+
+SCENARIOS: Dict[str, Scenario] = {
+    scenario.name: scenario
+    for scenario in (
+        Scenario("message_storm", {"message": 1.0}),
+        Scenario("purchase_spike", {"message": 0.5, "purchase": 0.5}),
+        Scenario("expiry_sweep", {"message": 1.0}, sweep=True),
+        Scenario("context_sequential", {"message_sequential": 1.0}),
+        Scenario("context_single", {"message_context": 1.0}),
+        Scenario("mixed", {"message": 0.9, "history": 0.07, "purchase": 0.03}, sweep=True),
+    )
+}
+
+
+# ===== DRIVER =====
+
+def percentile(ordered: List[float], q: float) -> float:
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def latency_summary(samples: List[float], errors: int, elapsed: float) -> Dict[str, Any]:
+    ordered = sorted(samples)
+    return {
+        "count": len(ordered),
+        "errors": errors,
+        "throughput_per_s": round(len(ordered) / elapsed, 1) if elapsed else 0.0,
+        "mean_ms": round(sum(ordered) / len(ordered) * 1000, 3) if ordered else 0.0,
+        "p50_ms": round(percentile(ordered, 0.50) * 1000, 3),
+        "p95_ms": round(percentile(ordered, 0.95) * 1000, 3),
+        "p99_ms": round(percentile(ordered, 0.99) * 1000, 3),
+        "max_ms": round(ordered[-1] * 1000, 3) if ordered else 0.0,
+    }
+
+
+@dataclass
+class PoolSamples:
+    in_use: List[int] = field(default_factory=list)
+    limit: List[int] = field(default_factory=list)
+    waiting: List[int] = field(default_factory=list)
+
+    def sample(self, supervisor) -> None:
+        self.in_use.append(supervisor.limiter.in_use)
+        self.limit.append(supervisor.limiter.limit)
+        self.waiting.append(supervisor.limiter.waiting)
+
+    def summary(self) -> Dict[str, Any]:
+        if not self.in_use:
+            return {}
+        count = len(self.in_use)
+        return {
+            "samples": count,
+            "limit_min": min(self.limit),
+            "limit_max": max(self.limit),
+            "in_use_mean": round(sum(self.in_use) / count, 2),
+            "in_use_max": max(self.in_use),
+            "waiting_mean": round(sum(self.waiting) / count, 2),
+            "waiting_max": max(self.waiting),
+            # Mean fraction of the admitted connections in use
+            "utilization": round(sum(u / l for u, l in zip(self.in_use, self.limit)) / count, 3),
+            # Fraction of samples with callers queued for a connection
+            "saturation": round(sum(1 for w in self.waiting if w) / count, 3),
+        }
+
+
+async def run_scenario(
+        ctx: Context,
+        scenario: Scenario,
+        concurrency: int,
+        duration: float,
+        seed: int = 0,
+        sample_interval: float = 0.05,
+        sweep_batch_size: int = 500
+) -> Dict[str, Any]:
+    """Drive scenario with concurrency closed-loop workers for duration seconds"""
+    loop = asyncio.get_running_loop()
+    latencies: Dict[str, List[float]] = defaultdict(list)
+    errors: Counter = Counter()
+    first_errors: Dict[str, str] = {}
+    names = list(scenario.mix)
+    weights = [scenario.mix[name] for name in names]
+    deadline = loop.time() + duration
+
+    async def worker(worker_id: int) -> None:
+        rng = random.Random(seed * 100_003 + worker_id)
+        while loop.time() < deadline:
+            name = rng.choices(names, weights)[0]
+            started = time.perf_counter()
+            try:
+                await OPERATIONS[name](ctx, rng)
+            except Exception as e:
+                errors[name] += 1
+                first_errors.setdefault(name, repr(e))
+            else:
+                latencies[name].append(time.perf_counter() - started)
+
+    pool = PoolSamples()
+
+    async def sampler() -> None:
+        while True:
+            pool.sample(ctx.db.supervisor)
+            await asyncio.sleep(sample_interval)
+
+    sweep_result: Dict[str, Any] = {}
+
+    async def sweep() -> None:
+        sweeper = ExpirySweeper(ctx.db, batch_size=sweep_batch_size)
+        started = time.perf_counter()
+        try:
+            sweep_result["deactivated"] = await sweeper.sweep_once()
+            sweep_result["completed"] = True
+        finally:
+            sweep_result["duration_s"] = round(time.perf_counter() - started, 3)
+            sweep_result["batch"] = latency_summary(list(sweeper.batch_latencies), 0, 0)
+
+    sampler_task = asyncio.create_task(sampler())
+    sweep_task = asyncio.create_task(sweep()) if scenario.sweep else None
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(i) for i in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    if sweep_task is not None:
+        # A sweep that outlives the run is reported as incomplete
+        sweep_task.cancel()
+        with suppress(asyncio.CancelledError):
+            await sweep_task
+        sweep_result.setdefault("completed", False)
+    sampler_task.cancel()
+    with suppress(asyncio.CancelledError):
+        await sampler_task
+
+    all_latencies = [sample for samples in latencies.values() for sample in samples]
+    metrics = ctx.db.metrics_snapshot()
+    result = {
+        "scenario": scenario.name,
+        "concurrency": concurrency,
+        "duration_s": round(elapsed, 3),
+        "operations": {
+            name: latency_summary(latencies[name], errors[name], elapsed) for name in names
+        },
+        "total": latency_summary(all_latencies, sum(errors.values()), elapsed),
+        "pool": {
+            **pool.summary(),
+            "acquire_wait": _ms(metrics.get("pool_acquire_wait", {})),
+        },
+    }
+    if first_errors:
+        result["first_errors"] = first_errors
+    if scenario.sweep:
+        result["sweep"] = sweep_result
+    return result
+
+
+def _ms(histogram: Dict[str, Any]) -> Dict[str, Any]:
+    """Instrumentation histogram snapshot with bucket bounds in milliseconds"""
+    return {
+        key: round(value * 1000, 3) if key.startswith("p") else value
+        for key, value in histogram.items()
+    }
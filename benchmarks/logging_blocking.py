@@ -0,0 +1,80 @@
+"""
+Event-loop blocking time per log call, synchronous handlers vs the async pipeline.
+
+Each mode runs in a fresh interpreter so handler setup doesn't leak between them.
+
+Run from the repository root:
+    python -m benchmarks.logging_blocking
+"""
+import argparse
+import asyncio
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+
+async def measure(calls: int) -> list:
+    from src.config.logging_config import get_logger
+
+    logger = get_logger("benchmark")
+    samples = []
+    for i in range(calls):
+        started = time.perf_counter()
+        logger.info("payment settled", telegram_id=123456789, authority=f"A{i:035d}", amount=150_000)
+        samples.append(time.perf_counter() - started)
+        if i % 100 == 0:
+            # Let other tasks run, as they would on a busy loop
+            await asyncio.sleep(0)
+    return samples
+
+
+def run_mode(mode: str, calls: int, serializer: str) -> None:
+    from src.config.logging_config import setup_logging, get_log_pipeline
+
+    log_file = Path(tempfile.mkdtemp()) / "bench.log"
+    # Console output goes to /dev/null via the parent, file output is real
+    setup_logging(
+        "INFO", str(log_file),
+        async_logging=mode == "async",
+        json_serializer=serializer,
+        queue_size=calls + 1,
+    )
+    samples = asyncio.run(measure(calls))
+    samples.sort()
+    pipeline = get_log_pipeline()
+    dropped = pipeline.dropped if pipeline else 0
+    print(
+        f"{mode:<6}{serializer:<8}"
+        f"mean {statistics.fmean(samples) * 1e6:7.1f} us   "
+        f"p99 {samples[int(len(samples) * 0.99)] * 1e6:7.1f} us   "
+        f"max {samples[-1] * 1e6:8.1f} us   "
+        f"dropped {dropped}",
+        file=sys.stderr,
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--calls", type=int, default=20_000)
+    parser.add_argument("--mode", choices=("sync", "async"))
+    parser.add_argument("--serializer", default="json")
+    args = parser.parse_args()
+
+    if args.mode:
+        run_mode(args.mode, args.calls, args.serializer)
+        return
+
+    for mode, serializer in (("sync", "json"), ("async", "json"), ("async", "orjson")):
+        subprocess.run(
+            [sys.executable, "-m", "benchmarks.logging_blocking",
+             "--mode", mode, "--serializer", serializer, "--calls", str(args.calls)],
+            stdout=subprocess.DEVNULL,
+            check=True,
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Memory and build throughput of 100k Subscription rows:
+plain dataclass (per-instance __dict__) vs slotted dataclass vs SubscriptionBatch.
+
+Run from the repository root:
+    python -m benchmarks.model_memory
+"""
+import argparse
+import time
+import tracemalloc
+from dataclasses import make_dataclass, fields
+from datetime import datetime, timedelta
+
+from src.database.models import Subscription, SubscriptionBatch
+from src.database.models import batch as batch_module
+
+# Same fields without slots, i.e. the models before they were slotted
+DictSubscription = make_dataclass(
+    "DictSubscription", [(field.name, field.type, field.default) for field in fields(Subscription)]
+)
+
+
+def make_rows(count: int) -> list:
+    started = datetime(2024, 1, 1)
+    return [
+        (i, 10 ** 8 + i, i, 50 * 1024 ** 3, i * 1024, 0,
+         started, started + timedelta(days=30 + i % 60), True)
+        for i in range(count)
+    ]
+
+
+def measure(label: str, build, rows: list) -> None:
+    tracemalloc.start()
+    started = time.perf_counter()
+    result = build(rows)
+    elapsed = time.perf_counter() - started
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(
+        f"{label:<20}{current / len(rows):8.1f} B/row   "
+        f"{len(rows) / elapsed:12,.0f} rows/s"
+    )
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=100_000)
+    args = parser.parse_args()
+
+    rows = make_rows(args.rows)
+    print(f"numpy: {'yes' if batch_module._numpy() is not None else 'no (array fallback)'}")
+
+    dict_models = measure("dataclass", lambda r: [DictSubscription(*row) for row in r], rows)
+    slot_models = measure("slots dataclass", lambda r: [Subscription(*row) for row in r], rows)
+    batch = measure("SubscriptionBatch", SubscriptionBatch.from_rows, rows)
+
+    now = datetime(2024, 2, 15)
+    started = time.perf_counter()
+    per_object = sum(
+        max(0, s.traffic_limit_bytes + s.extra_traffic_bytes - s.traffic_used_bytes)
+        for s in slot_models if now > s.expires_at
+    )
+    object_elapsed = time.perf_counter() - started
+
+    started = time.perf_counter()
+    expired = batch.is_expired(now)
+    remaining = batch.remaining_traffic_bytes
+    if batch_module._numpy() is not None:
+        vectorized = int(remaining[expired].sum())
+    else:
+        vectorized = sum(r for r, e in zip(remaining, expired) if e)
+    batch_elapsed = time.perf_counter() - started
+
+    assert per_object == vectorized
+    print(f"remaining/expired over all rows: objects {object_elapsed * 1000:.1f} ms, "
+          f"batch {batch_elapsed * 1000:.1f} ms")
+    del dict_models
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+Memory and lookup cost of QuotaIndex at 1M users, against a dict of
+slotted Subscription objects (what caching get_active_paid_subscription
+results would hold).
+
+Run from the repository root:
+    PYTHONPATH=src python -m benchmarks.quota_index
+    PYTHONPATH=src python -m benchmarks.quota_index --users 5000000
+"""
+import argparse
+import gc
+import random
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+from src.database.models import Subscription
+from services.quota_index import QuotaIndex, to_seconds
+
+FIRST_TELEGRAM_ID = 100_000_000
+STARTED = datetime(2026, 1, 1)
+
+
+def row(i: int) -> tuple:
+    return (
+        FIRST_TELEGRAM_ID + i * 7,
+        STARTED + timedelta(days=30 + i % 60),
+        50 * 1024 ** 3,
+        i * 1024,
+    )
+
+
+def build_index(users: int, presized: bool) -> QuotaIndex:
+    index = QuotaIndex(users if presized else 1024)
+    for i in range(users):
+        index.put(*row(i))
+    return index
+
+
+def build_dict(users: int) -> dict:
+    subscriptions = {}
+    for i in range(users):
+        telegram_id, expires_at, total, used = row(i)
+        subscriptions[telegram_id] = Subscription(
+            i, telegram_id, i, total, used, 0, STARTED, expires_at, True
+        )
+    return subscriptions
+
+
+def measure(label: str, build, users: int):
+    gc.collect()
+    tracemalloc.start()
+    started = time.perf_counter()
+    result = build(users)
+    elapsed = time.perf_counter() - started
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(
+        f"{label:<22}{current / users:8.1f} B/user   {current / 1024 ** 2:8.1f} MiB   "
+        f"build {elapsed:6.2f} s"
+    )
+    return result
+
+
+def lookups(label: str, lookup, keys: list) -> None:
+    started = time.perf_counter()
+    for key in keys:
+        lookup(key)
+    elapsed = time.perf_counter() - started
+    print(f"{label:<22}{elapsed / len(keys) * 1e9:8.1f} ns/lookup   {len(keys) / elapsed:12,.0f} lookups/s")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=1_000_000)
+    parser.add_argument("--lookups", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    index = measure("QuotaIndex presized", lambda n: build_index(n, True), args.users)
+    print(f"{'':<22}{index.memory_bytes() / args.users:8.1f} B/user in arrays, capacity {index.capacity:,}")
+    del index
+    index = measure("QuotaIndex grown", lambda n: build_index(n, False), args.users)
+    subscriptions = measure("dict[Subscription]", build_dict, args.users)
+
+    rng = random.Random(0)
+    # 90% hits, misses are ids between the stored ones
+    keys = [
+        FIRST_TELEGRAM_ID + rng.randrange(args.users) * 7 + (0 if rng.random() < 0.9 else 3)
+        for _ in range(args.lookups)
+    ]
+    now = to_seconds(STARTED + timedelta(days=45))
+    now_dt = STARTED + timedelta(days=45)
+
+    def dict_remaining(telegram_id: int) -> int:
+        subscription = subscriptions.get(telegram_id)
+        if subscription is None or subscription.expires_at <= now_dt:
+            return 0
+        return subscription.remaining_traffic_bytes
+
+    lookups("QuotaIndex", lambda key: index.remaining_bytes(key, now), keys)
+    lookups("dict[Subscription]", dict_remaining, keys)
+
+    for key in keys[:10_000]:
+        assert index.remaining_bytes(key, now) == dict_remaining(key)
+
+
+if __name__ == "__main__":
+    main()
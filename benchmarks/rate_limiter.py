@@ -0,0 +1,39 @@
+"""
+In-process rate limiter throughput with many distinct users.
+
+Run from the repository root:
+    python -m benchmarks.rate_limiter
+"""
+import argparse
+import random
+import time
+
+from src.services.rate_limiter import InMemoryRateLimiter
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--checks", type=int, default=2_000_000)
+    parser.add_argument("--limit", type=int, default=10)
+    args = parser.parse_args()
+
+    limiter = InMemoryRateLimiter(args.limit)
+    rng = random.Random(0)
+    telegram_ids = [rng.randrange(10 ** 9) for _ in range(args.users)]
+    stream = [rng.choice(telegram_ids) for _ in range(args.checks)]
+
+    started = time.perf_counter()
+    allowed = sum(limiter.try_acquire(telegram_id) for telegram_id in stream)
+    elapsed = time.perf_counter() - started
+
+    print(f"users:      {args.users}")
+    print(f"checks:     {args.checks}")
+    print(f"allowed:    {allowed}")
+    print(f"buckets:    {len(limiter)}")
+    print(f"checks/sec: {args.checks / elapsed:,.0f}")
+    print(f"ns/check:   {elapsed / args.checks * 1e9:.0f}")
+
+
+if __name__ == "__main__":
+    main()
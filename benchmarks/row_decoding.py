@@ -0,0 +1,52 @@
+"""
+Row decoding micro-benchmark: dict(record) + Model(**row) vs Model(*record).
+
+asyncpg.Record can't be built outside a connection, so rows are modelled
+as tuples (positional path) and key/value pairs fed to dict() (current path).
+
+Run from the repository root:
+    python -m benchmarks.row_decoding
+"""
+import argparse
+import timeit
+from dataclasses import fields
+from datetime import datetime
+
+from src.database.models import Plan, User, Subscription
+
+NOW = datetime(2024, 1, 1)
+
+SAMPLES = {
+    Plan: (1, "monthly", 150_000, 50 * 1024 ** 3, 30),
+    User: (1, 123456789, "someone", "Some", "One", False, NOW),
+    Subscription: (1, 123456789, 7, 50 * 1024 ** 3, 1024 ** 3, 0, NOW, NOW, True),
+}
+
+
+def bench(model: type, number: int) -> None:
+    values = SAMPLES[model]
+    names = [field.name for field in fields(model)]
+    items = list(zip(names, values))
+
+    dict_path = timeit.timeit(lambda: model(**dict(items)), number=number)
+    positional_path = timeit.timeit(lambda: model(*values), number=number)
+
+    print(
+        f"{model.__name__:<14}"
+        f"dict: {dict_path / number * 1e9:8.1f} ns/row   "
+        f"positional: {positional_path / number * 1e9:8.1f} ns/row   "
+        f"speedup: {dict_path / positional_path:4.2f}x"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=500_000)
+    args = parser.parse_args()
+
+    for model in SAMPLES:
+        bench(model, args.rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Per-update lookup latency: sequential repository calls vs UserContextLoader.
+
+context_sequential runs upsert_user, is_banned, get_active_paid_subscription
+and (without a paid one) get_free_subscription; context_single does the same
+through UserContextLoader.load in one statement. Both use the load-test
+dataset and driver, on the fake backend by default (--latency-ms models the
+round-trip) or on Postgres (DB_* settings or --dsn, seeded with
+python -m benchmarks.load --backend postgres --seed).
+
+Run from the repository root:
+    PYTHONPATH=src:src/database python -m benchmarks.user_context
+    PYTHONPATH=src:src/database python -m benchmarks.user_context --backend postgres --concurrency 1,16,64
+"""
+import argparse
+import asyncio
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, List
+
+from benchmarks.load.dataset import Dataset
+from benchmarks.load.fake import FakeStore, fake_pool_factory
+from benchmarks.load.workloads import SCENARIOS, Context, run_scenario
+from src.config.config import DatabaseConfig
+from src.config.logging_config import setup_logging
+from src.database.manager import DatabaseManager
+
+PATHS = ("context_sequential", "context_single")
+
+
+def make_db(args: argparse.Namespace, dataset: Dataset) -> DatabaseManager:
+    overrides: Dict[str, Any] = {"DB_MAX_POOL_SIZE": args.pool_size, "DB_INSTRUMENTATION_ENABLED": True}
+    if args.dsn:
+        overrides["DB_DSN"] = args.dsn
+    config = DatabaseConfig(**overrides)
+    if args.backend == "fake":
+        factory = fake_pool_factory(
+            FakeStore(dataset), latency=args.latency_ms / 1000, write_latency=args.write_latency_ms / 1000
+        )
+        return DatabaseManager(config, pool_factory=factory)
+    return DatabaseManager(config)
+
+
+async def run(args: argparse.Namespace) -> List[Dict[str, Any]]:
+    dataset = Dataset(users=args.users, transactions=args.transactions)
+    results = []
+    for concurrency in args.concurrency:
+        row: Dict[str, Any] = {"concurrency": concurrency}
+        for name in PATHS:
+            db = make_db(args, dataset)
+            await db.connect()
+            try:
+                result = await run_scenario(Context.build(db, dataset), SCENARIOS[name], concurrency, args.duration)
+            finally:
+                await db.disconnect()
+            row[name] = result["total"]
+        results.append(row)
+
+        sequential, single = row["context_sequential"], row["context_single"]
+        print(
+            f"c={concurrency:<5}"
+            f"p50 {sequential['p50_ms']:7.2f} -> {single['p50_ms']:7.2f} ms   "
+            f"p99 {sequential['p99_ms']:7.2f} -> {single['p99_ms']:7.2f} ms   "
+            f"throughput {sequential['throughput_per_s']:9.1f} -> {single['throughput_per_s']:9.1f} ops/s"
+        )
+    return results
+
+
+def _int_list(value: str) -> List[int]:
+    return [int(item) for item in value.split(",") if item]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backend", choices=("fake", "postgres"), default="fake")
+    parser.add_argument("--dsn", help="Postgres DSN, defaults to the DB_* settings")
+    parser.add_argument("--users", type=int, default=1_000_000)
+    parser.add_argument("--transactions", type=int, default=5_000_000)
+    parser.add_argument("--concurrency", type=_int_list, default=[1, 16, 64])
+    parser.add_argument("--duration", type=float, default=5.0, help="Seconds per run")
+    parser.add_argument("--pool-size", type=int, default=20)
+    parser.add_argument("--latency-ms", type=float, default=0.5, help="Fake backend read round-trip")
+    parser.add_argument("--write-latency-ms", type=float, default=1.0, help="Fake backend write round-trip")
+    args = parser.parse_args()
+
+    setup_logging("WARNING", str(Path(tempfile.mkdtemp()) / "user_context.log"))
+    print("sequential -> single statement")
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,2 @@
+from .cache import Cache, CacheStats, CachedRepositoryMixin
+from .local import LocalTTLCache
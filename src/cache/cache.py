@@ -0,0 +1,286 @@
+import asyncio
+import json
+from dataclasses import dataclass, fields, is_dataclass
+from datetime import date, datetime
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterable, Optional
+from .local import LocalTTLCache, MISS
+from src.config.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+# Tags of the JSON encoding of values JSON has no type for
+_MODEL = "$model"
+_DATETIME = "$datetime"
+_DATE = "$date"
+
+
+def _encode_default(value: Any) -> Any:
+    if is_dataclass(value) and not isinstance(value, type):
+        return {_MODEL: [getattr(value, field.name) for field in fields(value)]}
+    if isinstance(value, datetime):
+        return {_DATETIME: value.isoformat()}
+    if isinstance(value, date):
+        return {_DATE: value.isoformat()}
+    raise TypeError(f"Can't cache {type(value).__name__}")
+
+
+def encode(value: Any) -> bytes:
+    """JSON for Redis; dataclass models are stored as their field values in order"""
+    return json.dumps(value, default=_encode_default, separators=(",", ":")).encode()
+
+
+def decode(raw: bytes, model: Optional[type] = None) -> Any:
+    """Inverse of encode, model is the dataclass of the namespace's entries"""
+
+    def hook(obj: Dict[str, Any]) -> Any:
+        if _MODEL in obj:
+            if model is None:
+                raise ValueError("Cached model in a namespace without a registered model")
+            return model(*obj[_MODEL])
+        if _DATETIME in obj:
+            return datetime.fromisoformat(obj[_DATETIME])
+        if _DATE in obj:
+            return date.fromisoformat(obj[_DATE])
+        return obj
+
+    return json.loads(raw, object_hook=hook)
+
+
+@dataclass
+class CacheStats:
+    local_hits: int = 0
+    redis_hits: int = 0
+    misses: int = 0
+    redis_errors: int = 0
+
+    @property
+    def hit_ratio(self) -> float:
+        hits = self.local_hits + self.redis_hits
+        total = hits + self.misses
+        return hits / total if total else 0.0
+
+
+class Cache:
+    """
+    Read-through cache: process-local TTL/LRU tier in front of Redis.
+
+    Redis keys carry a version so a deploy that changes a cached model
+    never reads entries written by the old code. Values are stored as JSON,
+    never pickled: dataclass models are rebuilt from their fields with the
+    model registered for the namespace, anything else must be plain JSON.
+    Invalidations are published on a Redis channel; after start() every
+    process drops the keys from its local tier too. The local TTL still
+    bounds staleness while the subscription is down.
+    Redis failures are logged and treated as misses.
+    """
+
+    def __init__(
+            self,
+            redis: Any = None,
+            local_max_size: int = 10_000,
+            local_ttl: float = 5.0,
+            redis_ttl: float = 300.0,
+            negative_ttl: float = 30.0,
+            version: int = 2,
+            prefix: str = "ezlink"
+    ):
+        self.redis = redis
+        self.local = LocalTTLCache(max_size=local_max_size, ttl=local_ttl)
+        self.redis_ttl = redis_ttl
+        self.negative_ttl = negative_ttl
+        self.version = version
+        self.prefix = prefix
+        self.stats = CacheStats()
+        self.channel = f"{prefix}:v{version}:invalidate"
+        self._models: Dict[str, type] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    @classmethod
+    def from_url(cls, redis_url: str, **kwargs) -> "Cache":
+        """Create cache backed by Redis at redis_url"""
+        from redis.asyncio import Redis
+
+        return cls(redis=Redis.from_url(redis_url), **kwargs)
+
+    @classmethod
+    def from_config(cls, config: Any) -> "Cache":
+        """Create cache from AppConfig"""
+        return cls.from_url(
+            config.REDIS_URL,
+            local_max_size=config.CACHE_LOCAL_MAX_SIZE,
+            local_ttl=config.CACHE_LOCAL_TTL,
+            redis_ttl=config.CACHE_REDIS_TTL,
+            negative_ttl=config.CACHE_NEGATIVE_TTL,
+        )
+
+    def register(self, namespace: str, model: type) -> None:
+        """Declare the dataclass model cached in namespace (alone, in lists or as None)"""
+        existing = self._models.get(namespace)
+        if existing is not None and existing is not model:
+            raise ValueError(f"Cache namespace '{namespace}' is already registered with {existing.__name__}")
+        self._models[namespace] = model
+
+    def register_many(self, models: Dict[str, type]) -> None:
+        """Declare the models of several namespaces"""
+        for namespace, model in models.items():
+            self.register(namespace, model)
+
+    def _redis_key(self, namespace: str, key: Hashable) -> str:
+        return f"{self.prefix}:v{self.version}:{namespace}:{key}"
+
+    async def start(self) -> None:
+        """Drop keys invalidated by other processes from the local tier"""
+        if self.redis is not None and self._task is None:
+            self._task = asyncio.create_task(self._subscribe())
+
+    async def _subscribe(self) -> None:
+        while True:
+            pubsub = self.redis.pubsub()
+            try:
+                await pubsub.subscribe(self.channel)
+                while True:
+                    message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                    if message is not None:
+                        self._on_invalidation(message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Cache invalidation subscription lost: {e}")
+            finally:
+                try:
+                    await pubsub.aclose()
+                except Exception:
+                    pass
+            # Invalidations may have been missed meanwhile
+            self.local.clear()
+            await asyncio.sleep(1.0)
+
+    def _on_invalidation(self, data: Any) -> None:
+        try:
+            message = json.loads(data)
+            namespace = message["namespace"]
+            for key in message["keys"]:
+                self.local.delete((namespace, key))
+        except (ValueError, KeyError, TypeError) as e:
+            logger.warning(f"Malformed cache invalidation: {e}")
+
+    async def get(self, namespace: str, key: Hashable) -> Any:
+        """Get cached value or MISS"""
+        value = self.local.get((namespace, key))
+        if value is not MISS:
+            self.stats.local_hits += 1
+            return value
+
+        if self.redis is not None:
+            try:
+                raw = await self.redis.get(self._redis_key(namespace, key))
+            except Exception as e:
+                self.stats.redis_errors += 1
+                logger.warning(f"Redis get failed: {e}")
+                raw = None
+            if raw is not None:
+                try:
+                    value = decode(raw, self._models.get(namespace))
+                except (ValueError, TypeError) as e:
+                    logger.warning(f"Undecodable cache entry {self._redis_key(namespace, key)}: {e}")
+                else:
+                    self.local.set((namespace, key), value)
+                    self.stats.redis_hits += 1
+                    return value
+
+        self.stats.misses += 1
+        return MISS
+
+    async def set(
+            self,
+            namespace: str,
+            key: Hashable,
+            value: Any,
+            ttl: Optional[float] = None
+    ) -> None:
+        """Store value in both tiers, None is cached as a negative entry"""
+        if ttl is None:
+            ttl = self.negative_ttl if value is None else self.redis_ttl
+        self.local.set((namespace, key), value, ttl=min(ttl, self.local.ttl))
+
+        if self.redis is not None:
+            try:
+                await self.redis.set(
+                    self._redis_key(namespace, key), encode(value), px=int(ttl * 1000)
+                )
+            except Exception as e:
+                self.stats.redis_errors += 1
+                logger.warning(f"Redis set failed: {e}")
+
+    async def get_or_load(
+            self,
+            namespace: str,
+            key: Hashable,
+            loader: Callable[[], Awaitable[Any]],
+            ttl: Optional[float] = None
+    ) -> Any:
+        """Get cached value, loading and caching it on miss"""
+        value = await self.get(namespace, key)
+        if value is MISS:
+            value = await loader()
+            await self.set(namespace, key, value, ttl=ttl)
+        return value
+
+    async def invalidate(self, namespace: str, keys: Iterable[Hashable]) -> None:
+        """Drop keys from both tiers, in every process subscribed with start()"""
+        keys = list(keys)
+        for key in keys:
+            self.local.delete((namespace, key))
+
+        if self.redis is not None and keys:
+            try:
+                await self.redis.delete(*(self._redis_key(namespace, key) for key in keys))
+                await self.redis.publish(self.channel, json.dumps({"namespace": namespace, "keys": keys}))
+            except Exception as e:
+                self.stats.redis_errors += 1
+                logger.warning(f"Redis delete failed: {e}")
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self.redis is not None:
+            await self.redis.aclose()
+
+
+class CachedRepositoryMixin:
+    """
+    Opt-in caching for repositories, a no-op when no cache is configured.
+    Loads on a miss read from the primary (self.db): a lagging replica would
+    put back the value an invalidation just removed, for the whole redis_ttl.
+    CACHE_MODELS maps each namespace holding dataclass models to the model,
+    register them with cache.register_many when the repository is created.
+    """
+
+    CACHE_MODELS: Dict[str, type] = {}
+
+    cache: Optional[Cache] = None
+
+    async def _cached(
+            self,
+            namespace: str,
+            key: Hashable,
+            loader: Callable[[], Awaitable[Any]],
+            ttl: Optional[float] = None
+    ) -> Any:
+        if self.cache is None:
+            return await loader()
+        with self.db.primary():
+            return await self.cache.get_or_load(namespace, key, loader, ttl=ttl)
+
+    async def _cache_put(self, namespace: str, key: Hashable, value: Any) -> None:
+        if self.cache is not None:
+            await self.cache.set(namespace, key, value)
+
+    async def _invalidate(self, namespace: str, *keys: Hashable) -> None:
+        if self.cache is not None:
+            await self.cache.invalidate(namespace, keys)
@@ -1,7 +1,7 @@
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from pydantic import Field, field_validator
-from typing import Optional
-from functools import lru_cache
+from typing import Optional, List
+from functools import lru_cache, cached_property
 
 class DatabaseConfig(BaseSettings):
     "Database Configuration"
@@ -13,7 +13,20 @@ class DatabaseConfig(BaseSettings):
     DB_MIN_POOL_SIZE: int = Field(default=5)
     DB_MAX_POOL_SIZE: int = Field(default=20)
     DB_COMMAND_TIMEOUT: float = Field(default=60.0)
+    DB_CONNECT_RETRIES: int = Field(default=5)
+    DB_CONNECT_RETRY_BASE_DELAY: float = Field(default=0.5)
+    DB_WARMUP_POOL_SIZE: int = Field(default=10)
+    DB_HEALTH_CHECK_INTERVAL: float = Field(default=10.0)
+    DB_ACQUIRE_WAIT_TARGET_MS: float = Field(default=10.0)
+    DB_BREAKER_FAILURE_THRESHOLD: int = Field(default=5)
+    DB_BREAKER_RESET_TIMEOUT: float = Field(default=10.0)
+    DB_BACKGROUND_MAX_CONNECTIONS: int = Field(default=2)
+    DB_INSTRUMENTATION_ENABLED: bool = Field(default=False)
+    DB_SLOW_QUERY_THRESHOLD_MS: float = Field(default=200.0)
     DB_DSN: Optional[str] = Field(default=None)
+    DB_REPLICA_DSNS: List[str] = Field(default_factory=list)
+    DB_REPLICA_MAX_LAG_SECONDS: float = Field(default=5.0)
+    DB_REPLICA_HEALTH_INTERVAL: float = Field(default=5.0)
 
     model_config = SettingsConfigDict(
         env_file=".env",
@@ -31,19 +44,60 @@ class AppConfig(BaseSettings):
     TELEGRAM_BOT_TOKEN: str = Field(..., description="Telegram bot token from BotFather")
     TELEGRAM_API_ID: int = Field(..., description="Telegram API ID from my.telegram.org")
     TELEGRAM_API_HASH: str = Field(..., description="Telegram API hash from my.telegram.org")
+    TELEGRAM_API_URL: str = Field(default="https://api.telegram.org", description="Bot API base URL")
 
     ZARINPAL_MERCHANT_ID: str = Field(..., description="Zarinpal merchant ID")
     ZARINPAL_SANDBOX: bool = Field(default=True, description="Use Zarinpal sandbox mode")
     ZARINPAL_CALLBACK_URL: str = Field(..., description="Payment callback URL")
 
     REDIS_URL: str = Field(default="redis://localhost:6379/0", description="Redis connection URL")
+    CACHE_LOCAL_MAX_SIZE: int = Field(default=10_000, description="Max entries in the process-local cache")
+    CACHE_LOCAL_TTL: float = Field(default=5.0, description="Process-local cache TTL in seconds")
+    CACHE_REDIS_TTL: float = Field(default=300.0, description="Redis cache TTL in seconds")
+    CACHE_NEGATIVE_TTL: float = Field(default=30.0, description="TTL in seconds for cached lookups of unknown keys")
 
     FREE_PLAN_GB: float = Field(default=1.0, description="Free plan traffic in GB")
 
+    SWEEP_INTERVAL_SECONDS: float = Field(default=60.0, description="Seconds between expiry/quota sweeps")
+    SWEEP_BATCH_SIZE: int = Field(default=500, description="Subscriptions deactivated per sweep statement")
+
+    PARTITION_MONTHS_AHEAD: int = Field(default=3, description="Monthly partitions created in advance")
+    PARTITION_MAINTENANCE_INTERVAL_SECONDS: float = Field(default=21_600, description="Seconds between partition maintenance runs")
+    TRANSACTIONS_RETENTION_MONTHS: int = Field(default=24, description="Months of transactions kept in the database, 0 keeps all")
+    TRAFFIC_USAGE_RETENTION_MONTHS: int = Field(default=6, description="Months of traffic usage history kept in the database, 0 keeps all")
+    ARCHIVE_DIR: str = Field(default="archive", description="Directory for archived partitions")
+
+    QUOTA_SYNC_INTERVAL_SECONDS: float = Field(default=5.0, description="Seconds between quota index polls of traffic usage")
+    QUOTA_USAGE_OVERLAP_SECONDS: float = Field(default=10.0, description="Seconds each traffic usage poll reaches back")
+    QUOTA_SERVER_HOST: str = Field(default="127.0.0.1", description="Quota lookup server bind address")
+    QUOTA_SERVER_PORT: int = Field(default=8790, description="Quota lookup server port")
+
+    BROADCAST_CONCURRENCY: int = Field(default=100, description="Concurrent broadcast sends")
+    BROADCAST_GLOBAL_RATE: float = Field(default=25.0, description="Broadcast messages per second across all chats")
+    BROADCAST_PER_CHAT_RATE: float = Field(default=1.0, description="Broadcast messages per second to one chat")
+    BROADCAST_BATCH_SIZE: int = Field(default=1000, description="Recipients fetched per page")
+
+    OUTBOX_WORKERS: int = Field(default=2, description="Concurrent outbox dispatch loops per process")
+    OUTBOX_BATCH_SIZE: int = Field(default=100, description="Outbox events claimed per batch")
+    OUTBOX_MAX_ATTEMPTS: int = Field(default=10, description="Failed deliveries before an outbox event is moved to outbox_dead")
+
+    WORKER_PROCESSES: int = Field(default=0, description="Worker processes sharing DB_MAX_POOL_SIZE, 0 uses the CPU count")
+    WORKER_USE_UVLOOP: bool = Field(default=False, description="Run worker event loops on uvloop when installed")
+    WORKER_MAX_CONCURRENCY: int = Field(default=100, description="Users handled concurrently per worker")
+    WORKER_DRAIN_TIMEOUT: float = Field(default=30.0, description="Seconds a worker may spend draining on shutdown")
+
     RATE_LIMIT_MESSAGES_PER_MINUTE: int = Field(default=10, description="Messages allowed per minute per user")
 
     LOG_LEVEL: str = Field(default="INFO", description="Logging level")
     LOG_FILE_PATH: str = Field(default="logs/bot.log", description="Log file path")
+    LOG_ASYNC: bool = Field(default=False, description="Write logs from a background thread")
+    LOG_JSON_SERIALIZER: str = Field(default="json", description="JSON serializer: json or orjson")
+    LOG_QUEUE_SIZE: int = Field(default=10_000, description="Async log records buffered before dropping")
+    LOG_MAX_BYTES: int = Field(default=0, description="Rotate log file at this size, 0 disables")
+    LOG_BACKUP_COUNT: int = Field(default=5, description="Rotated log files to keep")
+    LOG_ROTATE_INTERVAL_SECONDS: float = Field(default=0, description="Rotate log file every N seconds, 0 disables")
+    LOG_DEBUG_SAMPLE_RATE: float = Field(default=1.0, description="Fraction of DEBUG records kept in async mode")
+    LOG_DEBUG_MAX_PER_SECOND: Optional[int] = Field(default=None, description="Cap on DEBUG records per second in async mode")
 
     model_config = SettingsConfigDict(
         env_file=".env",
@@ -74,9 +128,20 @@ class AppConfig(BaseSettings):
             return "https://sandbox.zarinpal.com/pg/v4/payment"
         return "https://api.zarinpal.com/pg/v4/payment"
     
-class Settings(BaseSettings):
-    app: AppConfig = AppConfig()
-    db: DatabaseConfig = DatabaseConfig()
+class Settings:
+    """
+    Application settings.
+    Each section parses .env and validates on first access, so a worker that
+    only touches db never pays for (or fails on) AppConfig.
+    """
+
+    @cached_property
+    def app(self) -> AppConfig:
+        return AppConfig()
+
+    @cached_property
+    def db(self) -> DatabaseConfig:
+        return DatabaseConfig()
 
 @lru_cache()
 def get_settings() -> Settings:
@@ -0,0 +1,322 @@
+# ===== IMPORTS & DEPENDENCIES =====
+import json
+import logging
+import os
+import queue
+import random
+import sys
+import threading
+import time
+from logging.handlers import QueueHandler
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, TextIO
+
+
+# ===== SERIALIZERS =====
+def get_json_serializer(name: str = "json") -> Callable[..., str]:
+    """
+    Get JSON serializer for structlog's JSONRenderer.
+
+    Args:
+        name: "json" for the standard library, "orjson" for orjson when installed
+
+    Returns:
+        Callable with json.dumps signature returning str
+    """
+    if name == "orjson":
+        try:
+            import orjson
+        except ImportError:
+            logging.getLogger(__name__).warning("orjson is not installed, using json")
+        else:
+            def dumps(obj: Any, **kwargs: Any) -> str:
+                return orjson.dumps(obj, default=str).decode()
+            return dumps
+    return json.dumps
+
+
+# ===== FILTERS & HANDLERS =====
+class DebugSampler(logging.Filter):
+    """Sample and rate-limit DEBUG records, other levels always pass"""
+
+    def __init__(self, sample_rate: float = 1.0, max_per_second: Optional[int] = None):
+        super().__init__()
+        self.sample_rate = sample_rate
+        self.max_per_second = max_per_second
+        self.suppressed = 0
+        self._window = 0
+        self._window_count = 0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.DEBUG:
+            return True
+
+        if self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+            self.suppressed += 1
+            return False
+
+        if self.max_per_second is not None:
+            window = int(time.monotonic())
+            if window != self._window:
+                self._window = window
+                self._window_count = 0
+            self._window_count += 1
+            if self._window_count > self.max_per_second:
+                self.suppressed += 1
+                return False
+        return True
+
+
+class DroppingQueueHandler(QueueHandler):
+    """
+    Non-blocking handler: records go to a bounded queue and are formatted
+    on the writer thread. Records are dropped and counted when it's full.
+    """
+
+    def __init__(self, log_queue: "queue.Queue[Optional[logging.LogRecord]]"):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Formatting (JSON rendering) is left to the writer thread
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+# ===== WRITERS =====
+class RotatingFileWriter:
+    """Append-only file rotated by size and/or age"""
+
+    def __init__(
+        self,
+        path: str,
+        max_bytes: int = 0,
+        backup_count: int = 5,
+        rotate_interval: float = 0,
+    ):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.rotate_interval = rotate_interval
+        self._open()
+
+    def _open(self) -> None:
+        self._file = open(self.path, "a", encoding="utf-8")
+        self._size = self._file.tell()
+        self._opened_at = time.monotonic()
+
+    def _should_rotate(self, incoming: int) -> bool:
+        if self.max_bytes and self._size and self._size + incoming > self.max_bytes:
+            return True
+        if self.rotate_interval and time.monotonic() - self._opened_at >= self.rotate_interval:
+            return True
+        return False
+
+    def _rotate(self) -> None:
+        self._file.close()
+        for index in range(self.backup_count - 1, 0, -1):
+            source = f"{self.path}.{index}"
+            if os.path.exists(source):
+                os.replace(source, f"{self.path}.{index + 1}")
+        if self.backup_count > 0:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            self.path.unlink(missing_ok=True)
+        self._open()
+
+    def write(self, data: str) -> None:
+        # max_bytes is about the file on disk, count UTF-8 bytes not characters
+        size = len(data) if data.isascii() else len(data.encode("utf-8"))
+        if self._should_rotate(size):
+            self._rotate()
+        self._file.write(data)
+        self._size += size
+
+    def flush(self) -> None:
+        self._file.flush()
+
+    def close(self) -> None:
+        self._file.close()
+
+
+class BatchingLogWriter(threading.Thread):
+    """Writer thread formatting queued records and writing them in batches"""
+
+    def __init__(
+        self,
+        log_queue: "queue.Queue[Optional[logging.LogRecord]]",
+        formatter: logging.Formatter,
+        outputs: List[Any],
+        batch_size: int = 256,
+        flush_interval: float = 0.5,
+    ):
+        super().__init__(name="log-writer", daemon=True)
+        self.queue = log_queue
+        self.formatter = formatter
+        self.outputs = outputs
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+
+    def run(self) -> None:
+        stopping = False
+        while not stopping:
+            try:
+                record = self.queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+
+            batch = [record]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            if None in batch:
+                stopping = True
+            self._write([r for r in batch if r is not None])
+
+        for output in self.outputs:
+            output.flush()
+
+    def _write(self, records: List[logging.LogRecord]) -> None:
+        lines = []
+        for record in records:
+            try:
+                lines.append(self.formatter.format(record) + "\n")
+            except Exception:
+                # Same policy as logging.Handler.handleError: never crash the writer
+                continue
+        if not lines:
+            return
+
+        data = "".join(lines)
+        for output in self.outputs:
+            try:
+                output.write(data)
+                output.flush()
+            except Exception:
+                continue
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Write everything queued so far and stop, waiting at most about timeout seconds"""
+        deadline = time.monotonic() + timeout
+        try:
+            # Full only if the thread is stuck or dead, nothing would drain it
+            self.queue.put(None, timeout=timeout)
+        except queue.Full:
+            return
+        self.join(max(0.0, deadline - time.monotonic()))
+        if self.is_alive():
+            # Still writing, closing the files under it would fail its writes
+            return
+        for output in self.outputs:
+            if isinstance(output, RotatingFileWriter):
+                output.close()
+
+
+class LogPipeline:
+    """Handle to the running asynchronous pipeline"""
+
+    def __init__(
+        self,
+        handler: DroppingQueueHandler,
+        writer: BatchingLogWriter,
+        sampler: Optional[DebugSampler] = None,
+        settings: Optional[Dict[str, Any]] = None,
+    ):
+        self.handler = handler
+        self.writer = writer
+        self.sampler = sampler
+        # start_log_pipeline arguments, for restart()
+        self.settings = settings or {}
+
+    @property
+    def dropped(self) -> int:
+        """Records dropped because the queue was full"""
+        return self.handler.dropped
+
+    @property
+    def suppressed(self) -> int:
+        """DEBUG records removed by sampling/rate-limiting"""
+        return self.sampler.suppressed if self.sampler else 0
+
+    def stop(self) -> None:
+        logging.getLogger().removeHandler(self.handler)
+        self.writer.stop()
+
+    def restart(self) -> "LogPipeline":
+        """
+        Replace this pipeline in a forked child with a fresh one.
+        The writer thread doesn't survive fork and the queue's lock may have
+        been held by a parent thread at that moment, so neither is touched:
+        the handler is detached and a new queue, writer and handler started.
+        """
+        root = logging.getLogger()
+        root.removeHandler(self.handler)
+        pipeline = start_log_pipeline(**self.settings)
+        root.addHandler(pipeline.handler)
+        return pipeline
+
+
+def start_log_pipeline(
+    formatter: logging.Formatter,
+    log_file_path: str,
+    level: int,
+    stream: TextIO = sys.stdout,
+    queue_size: int = 10_000,
+    max_bytes: int = 0,
+    backup_count: int = 5,
+    rotate_interval: float = 0,
+    debug_sample_rate: float = 1.0,
+    debug_max_per_second: Optional[int] = None,
+) -> LogPipeline:
+    """
+    Start the queue-based pipeline and return its handler for the root logger.
+
+    Args:
+        formatter: Formatter applied on the writer thread
+        log_file_path: Path to the log file
+        level: Minimum level accepted by the handler
+        stream: Console stream
+        queue_size: Records buffered before new ones are dropped
+        max_bytes: Rotate the file when it would exceed this size (0 disables)
+        backup_count: Rotated files to keep
+        rotate_interval: Rotate the file every this many seconds (0 disables)
+        debug_sample_rate: Fraction of DEBUG records kept
+        debug_max_per_second: Cap on DEBUG records per second
+
+    Returns:
+        Running LogPipeline
+    """
+    log_queue: "queue.Queue[Optional[logging.LogRecord]]" = queue.Queue(maxsize=queue_size)
+
+    handler = DroppingQueueHandler(log_queue)
+    handler.setLevel(level)
+
+    sampler = None
+    if debug_sample_rate < 1.0 or debug_max_per_second is not None:
+        sampler = DebugSampler(debug_sample_rate, debug_max_per_second)
+        handler.addFilter(sampler)
+
+    file_writer = RotatingFileWriter(log_file_path, max_bytes, backup_count, rotate_interval)
+    writer = BatchingLogWriter(log_queue, formatter, [stream, file_writer])
+    writer.start()
+    settings = dict(
+        formatter=formatter,
+        log_file_path=log_file_path,
+        level=level,
+        stream=stream,
+        queue_size=queue_size,
+        max_bytes=max_bytes,
+        backup_count=backup_count,
+        rotate_interval=rotate_interval,
+        debug_sample_rate=debug_sample_rate,
+        debug_max_per_second=debug_max_per_second,
+    )
+    return LogPipeline(handler, writer, sampler, settings)
@@ -1,21 +1,63 @@
 # ===== IMPORTS & DEPENDENCIES =====
+import atexit
 import logging
 import sys
 from pathlib import Path
-from typing import Any, Dict
-import structlog
-from structlog.types import FilteringBoundLogger, Processor, WrappedLogger
+from typing import TYPE_CHECKING, Any, Dict, Optional
+from src.config.log_pipeline import LogPipeline, get_json_serializer, start_log_pipeline
+
+# structlog is imported on first use so importing a module that only
+# declares a logger stays cheap
+if TYPE_CHECKING:
+    from structlog.types import FilteringBoundLogger, Processor, WrappedLogger
 
 
 # ===== CONFIGURATION & CONSTANTS =====
-def setup_logging(log_level: str = "INFO", log_file_path: str = "logs/bot.log") -> None:
+_log_pipeline: Optional[LogPipeline] = None
+# Synchronous handlers added by the last setup_logging call
+_log_handlers: "list[logging.Handler]" = []
+_atexit_registered = False
+
+
+def _stop_log_pipeline() -> None:
+    global _log_pipeline
+    if _log_pipeline is not None:
+        _log_pipeline.stop()
+        _log_pipeline = None
+
+
+def setup_logging(
+    log_level: str = "INFO",
+    log_file_path: str = "logs/bot.log",
+    async_logging: bool = False,
+    json_serializer: str = "json",
+    queue_size: int = 10_000,
+    max_bytes: int = 0,
+    backup_count: int = 5,
+    rotate_interval: float = 0,
+    debug_sample_rate: float = 1.0,
+    debug_max_per_second: Optional[int] = None,
+) -> None:
     """
     Configure structured logging with both console and file outputs.
     
     Args:
         log_level: Logging level (DEBUG, INFO, WARNING, ERROR, CRITICAL)
         log_file_path: Path to the log file
+        async_logging: Hand records to a writer thread instead of writing inline
+        json_serializer: "json" or "orjson"
+        queue_size: Async only, records buffered before new ones are dropped
+        max_bytes: Async only, rotate the log file at this size (0 disables)
+        backup_count: Async only, rotated files to keep
+        rotate_interval: Async only, rotate the log file every N seconds (0 disables)
+        debug_sample_rate: Async only, fraction of DEBUG records kept
+        debug_max_per_second: Async only, cap on DEBUG records per second
+    
+    Calling it again replaces the handlers installed by the previous call.
     """
+    global _log_pipeline, _atexit_registered
+    import structlog
+
     # Create logs directory if it doesn't exist
     log_file = Path(log_file_path)
     log_file.parent.mkdir(parents=True, exist_ok=True)
@@ -24,7 +66,7 @@ def setup_logging(log_level: str = "INFO", log_file_path: str = "logs/bot.log")
     timestamper = structlog.processors.TimeStamper(fmt="iso")
     
     # Shared processors for both console and file
-    shared_processors: list[Processor] = [
+    shared_processors: "list[Processor]" = [
         structlog.contextvars.merge_contextvars,
         structlog.stdlib.add_log_level,
         structlog.stdlib.add_logger_name,
@@ -50,25 +92,52 @@ def setup_logging(log_level: str = "INFO", log_file_path: str = "logs/bot.log")
         foreign_pre_chain=shared_processors,
         processors=[
             structlog.stdlib.ProcessorFormatter.remove_processors_meta,
-            structlog.processors.JSONRenderer(),
+            structlog.processors.JSONRenderer(serializer=get_json_serializer(json_serializer)),
         ],
     )
     
-    # Console handler with colored output
-    console_handler = logging.StreamHandler(sys.stdout)
-    console_handler.setFormatter(formatter)
-    console_handler.setLevel(getattr(logging, log_level))
-    
-    # File handler with JSON output
-    file_handler = logging.FileHandler(log_file_path)
-    file_handler.setFormatter(formatter)
-    file_handler.setLevel(getattr(logging, log_level))
-    
-    # Configure root logger
     root_logger = logging.getLogger()
-    root_logger.addHandler(console_handler)
-    root_logger.addHandler(file_handler)
     root_logger.setLevel(getattr(logging, log_level))
+
+    # Undo the previous configuration, flushing what its pipeline still holds
+    _stop_log_pipeline()
+    for handler in _log_handlers:
+        root_logger.removeHandler(handler)
+        handler.close()
+    _log_handlers.clear()
+
+    if async_logging:
+        # Queue handler + writer thread, the event loop never touches disk or stdout
+        _log_pipeline = start_log_pipeline(
+            formatter,
+            log_file_path,
+            getattr(logging, log_level),
+            queue_size=queue_size,
+            max_bytes=max_bytes,
+            backup_count=backup_count,
+            rotate_interval=rotate_interval,
+            debug_sample_rate=debug_sample_rate,
+            debug_max_per_second=debug_max_per_second,
+        )
+        root_logger.addHandler(_log_pipeline.handler)
+        if not _atexit_registered:
+            atexit.register(_stop_log_pipeline)
+            _atexit_registered = True
+    else:
+        # Console handler with colored output
+        console_handler = logging.StreamHandler(sys.stdout)
+        console_handler.setFormatter(formatter)
+        console_handler.setLevel(getattr(logging, log_level))
+
+        # File handler with JSON output
+        file_handler = logging.FileHandler(log_file_path)
+        file_handler.setFormatter(formatter)
+        file_handler.setLevel(getattr(logging, log_level))
+
+        # Configure root logger
+        root_logger.addHandler(console_handler)
+        root_logger.addHandler(file_handler)
+        _log_handlers.extend((console_handler, file_handler))
     
     # Reduce noise from external libraries
     logging.getLogger("pyrogram").setLevel(logging.WARNING)
@@ -78,7 +147,45 @@ def setup_logging(log_level: str = "INFO", log_file_path: str = "logs/bot.log")
 
 
 # ===== UTILITY FUNCTIONS =====
-def get_logger(name: str) -> FilteringBoundLogger:
+class _LazyLogger:
+    """Logger proxy importing structlog when it is first used"""
+
+    __slots__ = ("_name", "_logger")
+
+    def __init__(self, name: str):
+        self._name = name
+        self._logger = None
+
+    def __getattr__(self, attr: str) -> Any:
+        if self._logger is None:
+            import structlog
+
+            self._logger = structlog.get_logger(self._name)
+        return getattr(self._logger, attr)
+
+
+def setup_logging_from_config(config: Any) -> None:
+    """
+    Configure logging from the LOG_* settings of AppConfig.
+    
+    Args:
+        config: AppConfig, or anything with the same LOG_* attributes
+    """
+    setup_logging(
+        log_level=config.LOG_LEVEL,
+        log_file_path=config.LOG_FILE_PATH,
+        async_logging=config.LOG_ASYNC,
+        json_serializer=config.LOG_JSON_SERIALIZER,
+        queue_size=config.LOG_QUEUE_SIZE,
+        max_bytes=config.LOG_MAX_BYTES,
+        backup_count=config.LOG_BACKUP_COUNT,
+        rotate_interval=config.LOG_ROTATE_INTERVAL_SECONDS,
+        debug_sample_rate=config.LOG_DEBUG_SAMPLE_RATE,
+        debug_max_per_second=config.LOG_DEBUG_MAX_PER_SECOND,
+    )
+
+
+def get_logger(name: str) -> "FilteringBoundLogger":
     """
     Get a configured logger instance.
     
@@ -88,4 +195,27 @@ def get_logger(name: str) -> FilteringBoundLogger:
     Returns:
         Configured logger instance
     """
-    return structlog.get_logger(name)
\ No newline at end of file
+    return _LazyLogger(name)
+
+
+def restart_logging_after_fork() -> None:
+    """
+    Restart the asynchronous pipeline in a forked child process.
+    
+    The child inherits the parent's queue handler but not its writer
+    thread, so without this every record is dropped once the queue fills.
+    Call first thing in the child; a no-op without async logging.
+    """
+    global _log_pipeline
+    if _log_pipeline is not None:
+        _log_pipeline = _log_pipeline.restart()
+
+
+def get_log_pipeline() -> Optional[LogPipeline]:
+    """
+    Get the asynchronous log pipeline, if enabled.
+    
+    Returns:
+        Running pipeline (exposes dropped/suppressed counters) or None
+    """
+    return _log_pipeline
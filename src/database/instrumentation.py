@@ -0,0 +1,165 @@
+from bisect import bisect_left
+from typing import Any, Dict, List, Optional, Tuple
+from src.config.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+# Upper bounds in seconds, +Inf is implied
+LATENCY_BUCKETS: Tuple[float, ...] = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+
+
+class Histogram:
+    """Fixed-bucket latency histogram"""
+
+    __slots__ = ("counts", "count", "total")
+
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(LATENCY_BUCKETS, value)] += 1
+        self.count += 1
+        self.total += value
+
+    def quantile(self, q: float) -> float:
+        """Bucket upper bound containing quantile q"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(LATENCY_BUCKETS, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "sum": self.total,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "p99": self.quantile(0.99),
+        }
+
+
+class QueryStats:
+    __slots__ = ("latency", "rows", "errors")
+
+    def __init__(self):
+        self.latency = Histogram()
+        self.rows = 0
+        self.errors = 0
+
+
+def _row_count(result: Any) -> int:
+    if result is None or isinstance(result, str):
+        return 0
+    if isinstance(result, list):
+        return len(result)
+    return 1
+
+
+class Instrumentation:
+    """
+    Per-query-fingerprint latency histograms, row counts and pool wait time.
+    Queries are already parameterized, so the fingerprint is the query text
+    with whitespace collapsed (or the registry name for prepared statements).
+    """
+
+    def __init__(self, slow_query_threshold: float = 0.2):
+        self.slow_query_threshold = slow_query_threshold
+        self.queries: Dict[str, QueryStats] = {}
+        self.pool_wait = Histogram()
+        self._fingerprints: Dict[str, str] = {}
+
+    def fingerprint(self, query: str) -> str:
+        fingerprint = self._fingerprints.get(query)
+        if fingerprint is None:
+            fingerprint = " ".join(query.split())
+            self._fingerprints[query] = fingerprint
+        return fingerprint
+
+    def record_query(
+            self,
+            query: str,
+            elapsed: float,
+            result: Any = None,
+            error: Optional[BaseException] = None
+    ) -> None:
+        fingerprint = self.fingerprint(query)
+        stats = self.queries.get(fingerprint)
+        if stats is None:
+            stats = self.queries[fingerprint] = QueryStats()
+
+        stats.latency.observe(elapsed)
+        if error is not None:
+            stats.errors += 1
+        else:
+            stats.rows += _row_count(result)
+
+        if elapsed >= self.slow_query_threshold:
+            logger.warning(
+                "Slow query",
+                query=fingerprint,
+                duration_ms=round(elapsed * 1000, 2),
+                failed=error is not None
+            )
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Current metrics as plain data"""
+        return {
+            "queries": {
+                fingerprint: {
+                    **stats.latency.snapshot(),
+                    "rows": stats.rows,
+                    "errors": stats.errors,
+                }
+                for fingerprint, stats in self.queries.items()
+            },
+            "pool_acquire_wait": self.pool_wait.snapshot(),
+        }
+
+    def to_prometheus(self, prefix: str = "ezlink_db") -> str:
+        """Metrics in Prometheus text exposition format"""
+        lines: List[str] = [
+            f"# TYPE {prefix}_query_duration_seconds histogram",
+        ]
+        for fingerprint, stats in self.queries.items():
+            lines.extend(_histogram_lines(
+                f"{prefix}_query_duration_seconds", stats.latency, f'query="{_escape(fingerprint)}"'
+            ))
+
+        lines.append(f"# TYPE {prefix}_query_rows_total counter")
+        for fingerprint, stats in self.queries.items():
+            lines.append(f'{prefix}_query_rows_total{{query="{_escape(fingerprint)}"}} {stats.rows}')
+
+        lines.append(f"# TYPE {prefix}_query_errors_total counter")
+        for fingerprint, stats in self.queries.items():
+            lines.append(f'{prefix}_query_errors_total{{query="{_escape(fingerprint)}"}} {stats.errors}')
+
+        lines.append(f"# TYPE {prefix}_pool_acquire_wait_seconds histogram")
+        lines.extend(_histogram_lines(f"{prefix}_pool_acquire_wait_seconds", self.pool_wait))
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _histogram_lines(name: str, histogram: Histogram, labels: str = "") -> List[str]:
+    separator = "," if labels else ""
+    lines = []
+    cumulative = 0
+    for bound, count in zip(LATENCY_BUCKETS, histogram.counts):
+        cumulative += count
+        lines.append(f'{name}_bucket{{{labels}{separator}le="{bound}"}} {cumulative}')
+    lines.append(f'{name}_bucket{{{labels}{separator}le="+Inf"}} {histogram.count}')
+    suffix = f"{{{labels}}}" if labels else ""
+    lines.append(f"{name}_sum{suffix} {histogram.total}")
+    lines.append(f"{name}_count{suffix} {histogram.count}")
+    return lines
@@ -1,19 +1,71 @@
+import asyncio
+import time
 import asyncpg
 from asyncpg import Pool
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Callable, Awaitable, Iterable, Sequence, Type, TypeVar, AsyncIterator
 from src.config.logging_config import get_logger
-from contextlib import asynccontextmanager
+from contextlib import asynccontextmanager, contextmanager
 from src.config.config import DatabaseConfig
+from src.database.statements import statements, RegistryConnection
+from src.database.instrumentation import Instrumentation
+from src.database.routing import ReplicaRouter, in_transaction, on_primary, is_read_only
+from src.database.resilience import CircuitBreaker, PoolSupervisor, retry_with_backoff
 
 logger = get_logger(__name__)
 
+T = TypeVar("T")
+
 class DatabaseManager:
     """Main database manager"""
 
-    def __init__(self, config: DatabaseConfig):
+    def __init__(
+            self,
+            config: DatabaseConfig,
+            pool_factory: Callable[..., Awaitable[Any]] = asyncpg.create_pool
+    ):
+        """
+        pool_factory takes asyncpg.create_pool's arguments and creates the
+        primary and replica pools, e.g. to plug in a fake pool for load tests
+        """
         self.config = config
         self.pool: Optional[Pool] = None
+        self._pool_factory = pool_factory
+        self.statements = statements
         self._is_connected = False
+        self._shutdown_hooks: List[Callable[[], Awaitable[None]]] = []
+        self._listener: Optional[asyncpg.Connection] = None
+        self._listeners: Dict[str, List[Callable[[Optional[str]], Awaitable[None]]]] = {}
+        self._background_tasks: set = set()
+        self._background_slots = asyncio.Semaphore(config.DB_BACKGROUND_MAX_CONNECTIONS)
+        self.replicas: Optional[ReplicaRouter] = None
+        if config.DB_REPLICA_DSNS:
+            self.replicas = ReplicaRouter(
+                config.DB_REPLICA_DSNS,
+                max_lag=config.DB_REPLICA_MAX_LAG_SECONDS,
+                health_interval=config.DB_REPLICA_HEALTH_INTERVAL,
+                pool_factory=pool_factory,
+                min_size=config.DB_MIN_POOL_SIZE,
+                max_size=config.DB_MAX_POOL_SIZE,
+                command_timeout=config.DB_COMMAND_TIMEOUT,
+                connection_class=RegistryConnection
+            )
+        self.supervisor = PoolSupervisor(
+            min_size=config.DB_MIN_POOL_SIZE,
+            max_size=config.DB_MAX_POOL_SIZE,
+            initial_size=config.DB_WARMUP_POOL_SIZE,
+            breaker=CircuitBreaker(
+                config.DB_BREAKER_FAILURE_THRESHOLD, config.DB_BREAKER_RESET_TIMEOUT
+            ),
+            health_interval=config.DB_HEALTH_CHECK_INTERVAL,
+            wait_target=config.DB_ACQUIRE_WAIT_TARGET_MS / 1000
+        )
+        self.instrumentation: Optional[Instrumentation] = None
+        if config.DB_INSTRUMENTATION_ENABLED:
+            self.instrumentation = Instrumentation(config.DB_SLOW_QUERY_THRESHOLD_MS / 1000)
+
+    def add_shutdown_hook(self, hook: Callable[[], Awaitable[None]]) -> None:
+        """Register coroutine to run before the pool is closed"""
+        self._shutdown_hooks.append(hook)
 
     async def connect(self) -> None:
         if self._is_connected:
@@ -21,14 +73,24 @@ class DatabaseManager:
             return
         
         try:
-            self.pool = await asyncpg.create_pool(
-                dsn=self.config.dsn,
-                min_size=self.config.DB_MIN_POOL_SIZE,
-                max_size=self.config.DB_MAX_POOL_SIZE,
-                command_timeout=self.config.DB_COMMAND_TIMEOUT
+            self.pool = await retry_with_backoff(
+                lambda: self._pool_factory(
+                    dsn=self.config.dsn,
+                    min_size=self.config.DB_MIN_POOL_SIZE,
+                    max_size=self.config.DB_MAX_POOL_SIZE,
+                    command_timeout=self.config.DB_COMMAND_TIMEOUT,
+                    connection_class=RegistryConnection,
+                    init=statements.prepare_all
+                ),
+                retries=self.config.DB_CONNECT_RETRIES,
+                base_delay=self.config.DB_CONNECT_RETRY_BASE_DELAY
             )
             self._is_connected = True
             logger.info("Database connecton pool created")
+            await self.supervisor.warm_up(self.pool, self.config.DB_WARMUP_POOL_SIZE)
+            self.supervisor.start(self.pool)
+            if self.replicas is not None:
+                await self.replicas.connect()
         except Exception as e:
             logger.error(f"Failed to connect to database: {e}")
             raise
@@ -36,54 +98,274 @@ class DatabaseManager:
     async def disconnect(self) -> None:
         """Close connection pool"""
         if self.pool and self._is_connected:
+            # Hooks flush write-behind state, so they need a live pool
+            for hook in reversed(self._shutdown_hooks):
+                try:
+                    await hook()
+                except Exception as e:
+                    logger.error(f"Shutdown hook failed: {e}")
+            if self._listener is not None:
+                listener, self._listener = self._listener, None
+                await listener.close()
+            if self.replicas is not None:
+                await self.replicas.close()
+            await self.supervisor.stop()
             await self.pool.close()
             self._is_connected = False
             logger.info("Databse connection pool closed")
 
+    async def listen(
+            self,
+            channel: str,
+            callback: Callable[[Optional[str]], Awaitable[None]]
+    ) -> None:
+        """
+        Call callback with the payload of every NOTIFY on channel.
+        All channels share one dedicated connection outside the pool. If that
+        connection is lost it is re-established and callbacks are called with
+        None, since notifications may have been missed in between.
+        """
+        if not self.is_connected:
+            raise RuntimeError("Database is not connected")
+
+        callbacks = self._listeners.setdefault(channel, [])
+        callbacks.append(callback)
+        if self._listener is None:
+            await self._connect_listener()
+        elif len(callbacks) == 1:
+            await self._listener.add_listener(channel, self._dispatch_notification)
+
+    async def _connect_listener(self) -> None:
+        listener = await asyncpg.connect(dsn=self.config.dsn)
+        for channel in self._listeners:
+            await listener.add_listener(channel, self._dispatch_notification)
+        listener.add_termination_listener(self._on_listener_lost)
+        self._listener = listener
+        logger.info(f"Listening on channels: {', '.join(self._listeners)}")
+
+    def _dispatch_notification(self, conn, pid: int, channel: str, payload: str) -> None:
+        for callback in self._listeners.get(channel, ()):
+            self._spawn(callback(payload))
+
+    def _on_listener_lost(self, conn) -> None:
+        if conn is not self._listener:
+            return
+        logger.warning("Listener connection lost, reconnecting")
+        self._listener = None
+        self._spawn(self._reconnect_listener())
+
+    async def _reconnect_listener(self) -> None:
+        delay = 0.5
+        while self.is_connected and self._listener is None:
+            try:
+                await self._connect_listener()
+            except Exception as e:
+                logger.error(f"Failed to reconnect listener: {e}")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 30.0)
+                continue
+            for callbacks in self._listeners.values():
+                for callback in callbacks:
+                    self._spawn(callback(None))
+
+    def _spawn(self, coro: Awaitable[None]) -> None:
+        task = asyncio.ensure_future(coro)
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
+
     @property
     def is_connected(self) -> bool:
         return self._is_connected and self.pool is not None
-    
+
+    def metrics_snapshot(self) -> Dict[str, Any]:
+        """Query and pool metrics, empty when instrumentation is disabled"""
+        return self.instrumentation.snapshot() if self.instrumentation else {}
+
+    def metrics_prometheus(self) -> str:
+        """Query and pool metrics in Prometheus text format"""
+        return self.instrumentation.to_prometheus() if self.instrumentation else ""
+
+    def _acquire(self):
+        return self.supervisor.acquire(self.pool, self.instrumentation)
+
+    def _acquire_read(self, query: str):
+        """Replica connection for read-only queries outside transaction() and primary(), primary otherwise"""
+        if self.replicas is None or in_transaction.get() or on_primary.get() or not is_read_only(query):
+            return self._acquire()
+        return self.replicas.acquire(self._acquire)
+
+    @contextmanager
+    def primary(self):
+        """
+        Send reads in the block to the primary, for reads that must see the
+        latest writes, e.g. ones repopulating a cache right after invalidation.
+        Tasks created inside the block inherit it.
+        """
+        token = on_primary.set(True)
+        try:
+            yield
+        finally:
+            on_primary.reset(token)
+
+    async def _observe(self, query: str, awaitable: Awaitable[Any]) -> Any:
+        if self.instrumentation is None:
+            return await awaitable
+
+        started = time.perf_counter()
+        try:
+            result = await awaitable
+        except BaseException as e:
+            self.instrumentation.record_query(query, time.perf_counter() - started, error=e)
+            raise
+        self.instrumentation.record_query(query, time.perf_counter() - started, result)
+        return result
+
     @asynccontextmanager
     async def transaction(self):
         if not self.is_connected:
             raise RuntimeError("Database is not connected")
 
-        async with self.pool.acquire() as conn:
-            async with conn.transaction():
+        token = in_transaction.set(True)
+        try:
+            async with self._acquire() as conn:
+                async with conn.transaction():
+                    yield conn
+        finally:
+            in_transaction.reset(token)
+
+    @asynccontextmanager
+    async def background_connection(self):
+        """
+        Acquire connection for background jobs.
+        At most DB_BACKGROUND_MAX_CONNECTIONS are held at once so sweeps and
+        backfills never starve interactive queries of pool connections.
+        """
+        if not self.is_connected:
+            raise RuntimeError("Database is not connected")
+
+        async with self._background_slots:
+            async with self._acquire() as conn:
                 yield conn
 
     async def execute(self, query: str, *args, conn=None) -> str:
         """Execute query without returning results"""
         if conn:
-            return await conn.execute(query, *args)
+            return await self._observe(query, conn.execute(query, *args))
         
-        async with self.pool.acquire() as conn:
-            return await conn.execute(query, *args)
+        async with self._acquire() as conn:
+            return await self._observe(query, conn.execute(query, *args))
         
+    async def copy_records(
+            self,
+            table: str,
+            records: Iterable[Sequence],
+            columns: Sequence[str],
+            conn=None
+    ) -> str:
+        """Bulk load records into table using COPY"""
+        if conn:
+            return await self._observe(
+                f"COPY {table}", conn.copy_records_to_table(table, records=records, columns=columns)
+            )
+
+        async with self._acquire() as conn:
+            return await self._observe(
+                f"COPY {table}", conn.copy_records_to_table(table, records=records, columns=columns)
+            )
+
     async def fetch_one(self, query: str, *args, conn=None) -> Optional[Dict[str, Any]]:
         """Fetch single row"""
         if conn:
-            row = await conn.fetchrow(query, *args)
+            row = await self._observe(query, conn.fetchrow(query, *args))
             return dict(row) if row else None
 
-        async with self.pool.acquire() as conn:
-            row = await conn.fetchrow(query, *args)
+        async with self._acquire_read(query) as conn:
+            row = await self._observe(query, conn.fetchrow(query, *args))
             return dict(row) if row else None
         
     async def fetch_all(self, query: str, *args, conn=None) -> List[Dict[str, Any]]:
         """Fetch all rows"""
         if conn:
-            rows = await conn.fetch(query, *args)
+            rows = await self._observe(query, conn.fetch(query, *args))
             return [dict(row) for row in rows]
         
-        async with self.pool.acquire() as conn:
-            rows = await conn.fetch(query, *args)
+        async with self._acquire_read(query) as conn:
+            rows = await self._observe(query, conn.fetch(query, *args))
             return [dict(row) for row in rows]
         
     async def fetch_val(self, query: str, *args, conn=None) -> Any:
         """Fetch single value"""
         if conn:
-            return await conn.fetchval(query, *args)
-        async with self.pool.acquire() as conn:
-            return await conn.fetchval(query, *args)
\ No newline at end of file
+            return await self._observe(query, conn.fetchval(query, *args))
+        async with self._acquire_read(query) as conn:
+            return await self._observe(query, conn.fetchval(query, *args))
+
+    async def fetch_batch(self, query: str, batch: Type[T], *args, conn=None) -> T:
+        """
+        Fetch all rows into a columnar batch (e.g. SubscriptionBatch).
+        The query must select batch.model's columns in field order.
+        """
+        if conn:
+            return batch.from_rows(await self._observe(query, conn.fetch(query, *args)))
+
+        async with self._acquire_read(query) as conn:
+            return batch.from_rows(await self._observe(query, conn.fetch(query, *args)))
+
+    async def stream(
+            self,
+            query: str,
+            *args,
+            batch_size: int = 1000,
+            model: Optional[Type[T]] = None
+    ) -> AsyncIterator[Any]:
+        """
+        Stream rows through a server-side cursor.
+        Rows are fetched batch_size at a time, only when the consumer asks for
+        more, so memory stays flat regardless of result size. Rows are dicts, or
+        model(*row) when model is given (select its columns in field order).
+        Runs on a background connection; wrap in contextlib.aclosing when the
+        consumer may stop early so the cursor is released right away. Helpers
+        that stream should return this generator itself rather than iterate it
+        in a generator of their own, so that aclosing() reaches the cursor.
+        """
+        async with self.background_connection() as conn:
+            async with conn.transaction():
+                cursor = await conn.cursor(query, *args)
+                while True:
+                    rows = await cursor.fetch(batch_size)
+                    for row in rows:
+                        yield model(*row) if model else dict(row)
+                    if len(rows) < batch_size:
+                        break
+
+    async def fetch_model(self, name: str, model: Type[T], *args, conn=None) -> Optional[T]:
+        """Fetch single row of a registered statement decoded straight into model"""
+        if conn:
+            stmt = await statements.get(conn, name)
+            row = await self._observe(name, stmt.fetchrow(*args))
+            return model(*row) if row else None
+
+        async with self._acquire_read(statements.query(name)) as conn:
+            stmt = await statements.get(conn, name)
+            row = await self._observe(name, stmt.fetchrow(*args))
+            return model(*row) if row else None
+
+    async def fetch_models(self, name: str, model: Type[T], *args, conn=None) -> List[T]:
+        """Fetch all rows of a registered statement decoded straight into model"""
+        if conn:
+            stmt = await statements.get(conn, name)
+            return [model(*row) for row in await self._observe(name, stmt.fetch(*args))]
+
+        async with self._acquire_read(statements.query(name)) as conn:
+            stmt = await statements.get(conn, name)
+            return [model(*row) for row in await self._observe(name, stmt.fetch(*args))]
+
+    async def fetch_prepared_val(self, name: str, *args, conn=None) -> Any:
+        """Fetch single value of a registered statement"""
+        if conn:
+            stmt = await statements.get(conn, name)
+            return await self._observe(name, stmt.fetchval(*args))
+
+        async with self._acquire_read(statements.query(name)) as conn:
+            stmt = await statements.get(conn, name)
+            return await self._observe(name, stmt.fetchval(*args))
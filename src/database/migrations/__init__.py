@@ -0,0 +1,3 @@
+from .runner import Migration, MigrationError, MigrationRunner
+from .versions import MIGRATIONS
+from .plan_check import SAMPLES, HotQuery, check_query_plans, hot_queries
@@ -0,0 +1,64 @@
+"""
+Schema migrations.
+
+Run from the repository root with the DB_* settings in the environment:
+    python -m src.database.migrations upgrade
+    python -m src.database.migrations status
+    PYTHONPATH=src:src/database python -m src.database.migrations check-plans
+    PYTHONPATH=src:src/database python -m src.database.migrations maintain-partitions
+
+check-plans exits with status 1 when a hot query plans a sequential scan
+or finds no rows to take sample arguments from; it imports the repositories for their SQL, hence the PYTHONPATH. Run it
+against seeded data (python -m benchmarks.load --backend postgres --seed).
+
+maintain-partitions runs PartitionMaintainer once with the AppConfig
+settings, logging as LOG_* configure: creates upcoming monthly partitions and archives expired ones.
+Schedule it (e.g. daily) unless a long-lived process runs the maintainer.
+"""
+import argparse
+import asyncio
+import sys
+
+from src.config.config import get_settings
+from src.config.logging_config import setup_logging_from_config
+from src.database.manager import DatabaseManager
+from src.database.migrations import MIGRATIONS, MigrationRunner, check_query_plans
+
+
+async def run(command: str) -> int:
+    db = DatabaseManager(get_settings().db)
+    await db.connect()
+    try:
+        runner = MigrationRunner(db, MIGRATIONS)
+        if command == "upgrade":
+            for migration in await runner.upgrade():
+                print(f"applied {migration.version}: {migration.name}")
+        elif command == "maintain-partitions":
+            from services.partition_maintenance import PartitionMaintainer
+
+            setup_logging_from_config(get_settings().app)
+            await PartitionMaintainer.from_config(db, get_settings().app).run_once()
+        elif command == "status":
+            pending = {migration.version for migration in await runner.pending()}
+            for migration in runner.migrations:
+                state = "pending" if migration.version in pending else "applied"
+                print(f"{migration.version:>4}  {state:<8} {migration.name}")
+        else:
+            problems = await check_query_plans(db)
+            for problem in problems:
+                print(problem, file=sys.stderr)
+            return 1 if problems else 0
+    finally:
+        await db.disconnect()
+    return 0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=("upgrade", "status", "check-plans", "maintain-partitions"))
+    args = parser.parse_args()
+    sys.exit(asyncio.run(run(args.command)))
+
+
+if __name__ == "__main__":
+    main()
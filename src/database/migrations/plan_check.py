@@ -0,0 +1,145 @@
+import json
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+from src.config.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+
+@dataclass(frozen=True)
+class HotQuery:
+    """
+    Repository query that must be served by an index.
+    sample selects one row of realistic arguments from the seeded data.
+    """
+
+    name: str
+    query: str
+    sample: str
+
+
+# Hot query -> SQL selecting one row of realistic arguments for it. The
+# query text itself comes from the code running it, see hot_queries().
+SAMPLES: Dict[str, str] = {
+    "users.get_by_telegram_id": "SELECT telegram_id FROM users ORDER BY user_id DESC LIMIT 1",
+    "users.is_banned": "SELECT telegram_id FROM users ORDER BY user_id DESC LIMIT 1",
+    "users.get_by_telegram_ids":
+        "SELECT array_agg(telegram_id) FROM (SELECT telegram_id FROM users LIMIT 100) s",
+    "users.get_by_username": "SELECT username FROM users WHERE username IS NOT NULL LIMIT 1",
+    "users.recipients": "SELECT MAX(user_id) - 1000, 1000 FROM users",
+    "user_context.load": """
+        SELECT telegram_id, COALESCE(username, ''), COALESCE(first_name, ''), COALESCE(last_name, '')
+        FROM users ORDER BY user_id DESC LIMIT 1
+    """,
+    "subscriptions.get_active_paid": "SELECT telegram_id FROM subscriptions ORDER BY id DESC LIMIT 1",
+    "subscriptions.get_active_paid_for":
+        "SELECT array_agg(telegram_id) FROM (SELECT telegram_id FROM subscriptions LIMIT 100) s",
+    "subscriptions.get_free": "SELECT telegram_id FROM free_subscriptions ORDER BY id DESC LIMIT 1",
+    "subscriptions.deactivate": "SELECT telegram_id FROM subscriptions ORDER BY id DESC LIMIT 1",
+    "subscriptions.sweep": "SELECT 1000",
+    "subscriptions.flush_traffic": """
+        SELECT array_agg(telegram_id), array_agg(1::bigint)
+        FROM (SELECT telegram_id FROM subscriptions ORDER BY id DESC LIMIT 100) s
+    """,
+    "transactions.get_by_authority":
+        "SELECT authority, created_at FROM transactions ORDER BY created_at DESC LIMIT 1",
+    "transactions.settle": """
+        SELECT authority, 'completed', 1::bigint, INTERVAL '1 day'
+        FROM transactions ORDER BY created_at DESC LIMIT 1
+    """,
+    "transactions.get_user_transactions":
+        "SELECT telegram_id, 10 FROM transactions ORDER BY created_at DESC LIMIT 1",
+    "transactions.between": "SELECT MAX(created_at) - INTERVAL '1 hour', MAX(created_at) FROM transactions",
+    "revenue.get_daily": "SELECT MAX(day) - 7, MAX(day), 'plan_purchase' FROM revenue_daily",
+    "outbox.claim": "SELECT 100",
+    "traffic_usage.get_usage": """
+        SELECT telegram_id, recorded_at - INTERVAL '1 day', recorded_at
+        FROM traffic_usage ORDER BY recorded_at DESC LIMIT 1
+    """,
+}
+
+
+def hot_queries(db) -> List[HotQuery]:
+    """
+    SAMPLES paired with the SQL the application actually runs: statements
+    registered by the repositories, and the query constants of the others.
+    Needs src and src/database on sys.path, like the services.
+    """
+    from repositories.outbox_repository import OutboxRepository
+    from repositories.revenue_repository import RevenueRepository
+    from repositories.subscription_repository import SubscriptionRepository
+    from repositories.traffic_accumulator import TrafficAccumulator
+    from repositories.traffic_usage_repository import TrafficUsageRepository
+    from repositories.transaction_repository import TransactionRepository
+    from repositories.user_context_loader import UserContextLoader
+    from repositories.user_repository import UserRepository
+    from services.expiry_sweeper import ExpirySweeper
+
+    for repository in (UserRepository, SubscriptionRepository, UserContextLoader):
+        db.statements.register_many(repository.STATEMENTS)
+    constants = {
+        "users.get_by_telegram_ids": UserRepository.GET_BY_TELEGRAM_IDS_QUERY,
+        "users.get_by_username": UserRepository.GET_BY_USERNAME_QUERY,
+        "subscriptions.get_active_paid_for": SubscriptionRepository.ACTIVE_PAID_FOR_QUERY,
+        "subscriptions.deactivate": SubscriptionRepository.DEACTIVATE_QUERY,
+        "subscriptions.sweep": ExpirySweeper.SWEEP_QUERY,
+        "subscriptions.flush_traffic": TrafficAccumulator.FLUSH_QUERY,
+        "transactions.get_by_authority": TransactionRepository.GET_BY_AUTHORITY_QUERY,
+        "transactions.settle": TransactionRepository.SETTLE_QUERY,
+        "transactions.get_user_transactions": TransactionRepository.USER_TRANSACTIONS_QUERY,
+        "transactions.between": TransactionRepository.BETWEEN_QUERY,
+        "revenue.get_daily": RevenueRepository.DAILY_QUERY,
+        "outbox.claim": OutboxRepository.CLAIM_QUERY,
+        "traffic_usage.get_usage": TrafficUsageRepository.USAGE_QUERY,
+    }
+    return [
+        HotQuery(name, constants[name] if name in constants else db.statements.query(name), sample)
+        for name, sample in SAMPLES.items()
+    ]
+
+
+def _plan_nodes(node: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    yield node
+    for child in node.get("Plans", ()):
+        yield from _plan_nodes(child)
+
+
+async def explain(conn, query: str, *args) -> Dict[str, Any]:
+    """Top plan node of EXPLAIN (FORMAT JSON)"""
+    result = await conn.fetchval(f"EXPLAIN (FORMAT JSON) {query}", *args)
+    if isinstance(result, str):
+        result = json.loads(result)
+    return result[0]["Plan"]
+
+
+async def check_query_plans(db, queries: Optional[Sequence[HotQuery]] = None) -> List[str]:
+    """
+    EXPLAIN every hot query (hot_queries() by default) with sample arguments.
+    Returns one message per query whose plan has a sequential scan or that
+    has no sample data, empty when all of them use indexes. Sequential scans
+    are disabled for the check, so one in a plan means no index can serve the
+    query however small the seeded table is.
+    """
+    if queries is None:
+        queries = hot_queries(db)
+    problems = []
+    async with db.background_connection() as conn:
+        async with conn.transaction():
+            await conn.execute("SET LOCAL enable_seqscan = off")
+            for hot in queries:
+                args: Optional[Any] = await conn.fetchrow(hot.sample)
+                if args is None or any(value is None for value in args):
+                    problems.append(f"{hot.name}: no sample data, seed the tables it reads")
+                    continue
+
+                plan = await explain(conn, hot.query, *args)
+                scans = [
+                    node.get("Relation Name", "?")
+                    for node in _plan_nodes(plan)
+                    if node["Node Type"] == "Seq Scan"
+                ]
+                if scans:
+                    problems.append(f"{hot.name}: sequential scan on {', '.join(scans)}")
+                else:
+                    logger.info(f"{hot.name}: {plan['Node Type']}")
+    return problems
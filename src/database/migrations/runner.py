@@ -0,0 +1,152 @@
+import hashlib
+import re
+from dataclasses import dataclass
+from typing import Dict, List, Sequence
+from src.config.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+# pg_advisory_lock key, arbitrary but fixed so concurrent deploys serialize
+MIGRATION_LOCK_ID = 0x657A6C696E6B
+
+_CREATE_INDEX = re.compile(
+    r"CREATE\s+(?:UNIQUE\s+)?INDEX\s+CONCURRENTLY\s+(?:IF\s+NOT\s+EXISTS\s+)?(\w+)", re.IGNORECASE
+)
+
+
+class MigrationError(RuntimeError):
+    """Raised when applied migrations don't match the ones shipped with the code"""
+
+
+@dataclass(frozen=True)
+class Migration:
+    """
+    Versioned schema change.
+    Statements run in order; transactional migrations run in one transaction,
+    the others (CREATE INDEX CONCURRENTLY) statement by statement.
+    """
+
+    version: int
+    name: str
+    statements: Sequence[str]
+    transactional: bool = True
+
+    @property
+    def checksum(self) -> str:
+        text = "\n;\n".join(" ".join(statement.split()) for statement in self.statements)
+        return hashlib.sha256(text.encode()).hexdigest()
+
+    @property
+    def concurrent_indexes(self) -> List[str]:
+        """Names of the indexes built with CREATE INDEX CONCURRENTLY"""
+        return [
+            match.group(1).lower()
+            for statement in self.statements
+            for match in _CREATE_INDEX.finditer(statement)
+        ]
+
+
+class MigrationRunner:
+    """
+    Applies pending migrations on a background connection of DatabaseManager.
+    A session advisory lock makes concurrent runners wait for each other;
+    applied versions are recorded in schema_migrations with their checksum.
+    Run it before repositories are created, their statements are prepared on
+    every new pool connection and need the tables to exist.
+    """
+
+    CREATE_TABLE = """
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            checksum TEXT NOT NULL,
+            applied_at TIMESTAMP NOT NULL DEFAULT NOW()
+        )
+    """
+
+    def __init__(self, db, migrations: Sequence[Migration]):
+        versions = [migration.version for migration in migrations]
+        if len(set(versions)) != len(versions):
+            raise ValueError("Migration versions must be unique")
+        self.db = db
+        self.migrations = sorted(migrations, key=lambda migration: migration.version)
+
+    async def applied(self, conn) -> Dict[int, str]:
+        """Applied version -> checksum"""
+        await conn.execute(self.CREATE_TABLE)
+        rows = await conn.fetch("SELECT version, checksum FROM schema_migrations")
+        return {row["version"]: row["checksum"] for row in rows}
+
+    async def pending(self) -> List[Migration]:
+        async with self.db.background_connection() as conn:
+            applied = await self.applied(conn)
+        self._verify(applied)
+        return [migration for migration in self.migrations if migration.version not in applied]
+
+    async def upgrade(self) -> List[Migration]:
+        """Apply every pending migration, return the ones applied"""
+        done = []
+        async with self.db.background_connection() as conn:
+            await conn.execute("SELECT pg_advisory_lock($1)", MIGRATION_LOCK_ID)
+            try:
+                # Read after taking the lock, another runner may have just finished
+                applied = await self.applied(conn)
+                self._verify(applied)
+                for migration in self.migrations:
+                    if migration.version in applied:
+                        continue
+                    await self._apply(conn, migration)
+                    done.append(migration)
+            finally:
+                await conn.execute("SELECT pg_advisory_unlock($1)", MIGRATION_LOCK_ID)
+        return done
+
+    def _verify(self, applied: Dict[int, str]) -> None:
+        known = {migration.version: migration for migration in self.migrations}
+        for version, checksum in applied.items():
+            migration = known.get(version)
+            if migration is None:
+                raise MigrationError(f"Database has migration {version} which this code doesn't know")
+            if migration.checksum != checksum:
+                raise MigrationError(f"Migration {version} ({migration.name}) was changed after it was applied")
+
+    async def _apply(self, conn, migration: Migration) -> None:
+        logger.info(f"Applying migration {migration.version}: {migration.name}")
+        if migration.transactional:
+            async with conn.transaction():
+                for statement in migration.statements:
+                    await conn.execute(statement)
+                await self._record(conn, migration)
+            return
+
+        # A CONCURRENTLY build that failed half-way leaves an invalid index
+        # that IF NOT EXISTS would then skip
+        await self._drop_invalid_indexes(conn, migration.concurrent_indexes)
+        for statement in migration.statements:
+            await conn.execute(statement)
+        await self._record(conn, migration)
+
+    async def _record(self, conn, migration: Migration) -> None:
+        await conn.execute(
+            "INSERT INTO schema_migrations (version, name, checksum) VALUES ($1, $2, $3)",
+            migration.version, migration.name, migration.checksum
+        )
+
+    async def _drop_invalid_indexes(self, conn, names: Sequence[str]) -> None:
+        """
+        Drop the invalid ones among names. Only the migration's own indexes:
+        another session's CONCURRENTLY build is also invalid until it finishes.
+        """
+        if not names:
+            return
+        rows = await conn.fetch("""
+            SELECT c.relname FROM pg_index i
+            JOIN pg_class c ON c.oid = i.indexrelid
+            JOIN pg_namespace n ON n.oid = c.relnamespace
+            WHERE NOT i.indisvalid
+            AND n.nspname = current_schema()
+            AND c.relname = ANY($1::text[])
+        """, list(names))
+        for row in rows:
+            logger.warning(f"Dropping invalid index {row['relname']}")
+            await conn.execute(f'DROP INDEX CONCURRENTLY IF EXISTS "{row["relname"]}"')
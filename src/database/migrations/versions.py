@@ -0,0 +1,618 @@
+from src.database.migrations.runner import Migration
+
+# Tables use IF NOT EXISTS so databases created by hand before migrations
+# existed can adopt them; column order matches the models.
+INITIAL_SCHEMA = Migration(
+    1,
+    "initial schema",
+    (
+        """
+        CREATE TABLE IF NOT EXISTS users (
+            user_id BIGSERIAL PRIMARY KEY,
+            telegram_id BIGINT NOT NULL,
+            username TEXT,
+            first_name TEXT,
+            last_name TEXT,
+            is_banned BOOLEAN NOT NULL DEFAULT FALSE,
+            created_at TIMESTAMP NOT NULL DEFAULT NOW()
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS plans (
+            plan_id SERIAL PRIMARY KEY,
+            name TEXT NOT NULL UNIQUE,
+            price_toman BIGINT NOT NULL,
+            traffic_bytes BIGINT NOT NULL,
+            duration_days INTEGER NOT NULL
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS extra_traffic_plans (
+            extra_traffic_plan_id SERIAL PRIMARY KEY,
+            price_toman BIGINT NOT NULL,
+            traffic_bytes BIGINT NOT NULL
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS transactions (
+            transaction_id BIGSERIAL PRIMARY KEY,
+            telegram_id BIGINT NOT NULL,
+            transaction_type TEXT NOT NULL
+                CHECK (transaction_type IN ('plan_purchase', 'extra_traffic_purchase')),
+            status TEXT NOT NULL DEFAULT 'pending'
+                CHECK (status IN ('pending', 'completed', 'failed')),
+            plan_id INTEGER REFERENCES plans (plan_id),
+            extra_traffic_plan_id INTEGER REFERENCES extra_traffic_plans (extra_traffic_plan_id),
+            price_toman BIGINT NOT NULL,
+            authority TEXT NOT NULL,
+            ref_id BIGINT NOT NULL DEFAULT 0,
+            created_at TIMESTAMP NOT NULL DEFAULT NOW()
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS purchases (
+            purchase_id BIGSERIAL PRIMARY KEY,
+            telegram_id BIGINT NOT NULL,
+            transaction_id BIGINT NOT NULL,
+            price_toman BIGINT NOT NULL,
+            created_at TIMESTAMP NOT NULL DEFAULT NOW()
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS subscriptions (
+            id BIGSERIAL PRIMARY KEY,
+            telegram_id BIGINT NOT NULL,
+            purchase_id BIGINT REFERENCES purchases (purchase_id),
+            traffic_limit_bytes BIGINT NOT NULL,
+            traffic_used_bytes BIGINT NOT NULL DEFAULT 0,
+            extra_traffic_bytes BIGINT NOT NULL DEFAULT 0,
+            started_at TIMESTAMP NOT NULL DEFAULT NOW(),
+            expires_at TIMESTAMP NOT NULL,
+            is_active BOOLEAN NOT NULL DEFAULT TRUE
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS free_subscriptions (
+            id BIGSERIAL PRIMARY KEY,
+            telegram_id BIGINT NOT NULL,
+            traffic_limit_bytes BIGINT NOT NULL,
+            traffic_used_bytes BIGINT NOT NULL DEFAULT 0,
+            started_at TIMESTAMP NOT NULL DEFAULT NOW(),
+            expires_at TIMESTAMP NOT NULL
+        )
+        """,
+    ),
+)
+
+# PlanCatalog.CHANNEL, catalogs reload on any change to either plan table
+PLANS_CHANGED_NOTIFY = Migration(
+    2,
+    "notify plans_changed",
+    (
+        """
+        CREATE OR REPLACE FUNCTION notify_plans_changed() RETURNS trigger AS $$
+        BEGIN
+            PERFORM pg_notify('plans_changed', TG_TABLE_NAME);
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+        """,
+        "DROP TRIGGER IF EXISTS plans_changed ON plans",
+        """
+        CREATE TRIGGER plans_changed
+        AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON plans
+        FOR EACH STATEMENT EXECUTE FUNCTION notify_plans_changed()
+        """,
+        "DROP TRIGGER IF EXISTS plans_changed ON extra_traffic_plans",
+        """
+        CREATE TRIGGER plans_changed
+        AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON extra_traffic_plans
+        FOR EACH STATEMENT EXECUTE FUNCTION notify_plans_changed()
+        """,
+    ),
+)
+
+# One index per repository query shape. CONCURRENTLY so existing tables stay
+# writable while they build.
+HOT_PATH_INDEXES = Migration(
+    3,
+    "hot path indexes",
+    (
+        # ON CONFLICT (telegram_id) target; is_banned included so
+        # UserRepository.is_banned is an index-only scan
+        """
+        CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS users_telegram_id_key
+        ON users (telegram_id) INCLUDE (is_banned)
+        """,
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS users_username_idx ON users (username)",
+        # get_by_authority, get_pending_by_authorities, settle
+        """
+        CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS transactions_authority_key
+        ON transactions (authority)
+        """,
+        # get_user_transactions: WHERE telegram_id = $1 ORDER BY created_at DESC LIMIT n
+        """
+        CREATE INDEX CONCURRENTLY IF NOT EXISTS transactions_telegram_id_created_at_idx
+        ON transactions (telegram_id, created_at DESC)
+        """,
+        # get_transactions_batch / iter_transactions_between range scans
+        """
+        CREATE INDEX CONCURRENTLY IF NOT EXISTS transactions_created_at_idx
+        ON transactions (created_at)
+        """,
+        """
+        CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS purchases_transaction_id_key
+        ON purchases (transaction_id)
+        """,
+        # get_active_paid_subscription(s), add_extra_traffic, the deactivation in
+        # creat_subscription and TrafficAccumulator's paid update. NOW() can't be
+        # in an index predicate, expires_at is the second key instead.
+        """
+        CREATE INDEX CONCURRENTLY IF NOT EXISTS subscriptions_active_telegram_id_idx
+        ON subscriptions (telegram_id, expires_at DESC) WHERE is_active
+        """,
+        # ExpirySweeper walks active rows in id order; inactive ones pile up with
+        # every renewal and stay out of this index
+        """
+        CREATE INDEX CONCURRENTLY IF NOT EXISTS subscriptions_active_id_idx
+        ON subscriptions (id) WHERE is_active
+        """,
+        """
+        CREATE INDEX CONCURRENTLY IF NOT EXISTS free_subscriptions_telegram_id_idx
+        ON free_subscriptions (telegram_id, expires_at DESC)
+        """,
+    ),
+    transactional=False,
+)
+
+# Monthly range partitions on created_at. The existing table becomes the
+# partition for everything before next month; PartitionMaintainer creates
+# the monthly partitions after that. authority can't stay unique across
+# partitions without the partition key, settle's status = 'pending' guard
+# keeps callbacks idempotent.
+# Locking: the RENAME takes ACCESS EXCLUSIVE on the legacy table until
+# commit. Under that lock, adding the validated CHECK scans every legacy
+# row; it only spares ATTACH a second scan. ATTACH then builds, on the
+# legacy table, the (transaction_id, created_at) primary key index and
+# every partitioned index with no equivalent legacy index. All reads and
+# writes of transactions wait for the whole migration, run it in a
+# maintenance window sized to the table.
+PARTITION_TRANSACTIONS = Migration(
+    4,
+    "partition transactions by month",
+    (
+        """
+        DO $$
+        DECLARE
+            boundary TIMESTAMP := date_trunc('month', NOW()) + INTERVAL '1 month';
+            index_name TEXT;
+            month TIMESTAMP;
+        BEGIN
+            IF EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = 'transactions'::regclass) THEN
+                RETURN;
+            END IF;
+
+            ALTER TABLE transactions RENAME TO transactions_legacy;
+            FOR index_name IN
+                SELECT indexname FROM pg_indexes
+                WHERE tablename = 'transactions_legacy' AND schemaname = current_schema()
+            LOOP
+                EXECUTE format('ALTER INDEX %I RENAME TO %I', index_name, index_name || '_legacy');
+            END LOOP;
+
+            CREATE TABLE transactions (
+                LIKE transactions_legacy INCLUDING DEFAULTS INCLUDING CONSTRAINTS
+            ) PARTITION BY RANGE (created_at);
+            ALTER TABLE transactions ADD PRIMARY KEY (transaction_id, created_at);
+            ALTER TABLE transactions ADD FOREIGN KEY (plan_id) REFERENCES plans (plan_id);
+            ALTER TABLE transactions ADD FOREIGN KEY (extra_traffic_plan_id)
+                REFERENCES extra_traffic_plans (extra_traffic_plan_id);
+            ALTER SEQUENCE transactions_transaction_id_seq OWNED BY transactions.transaction_id;
+            CREATE INDEX transactions_authority_idx ON transactions (authority);
+            CREATE INDEX transactions_telegram_id_created_at_idx ON transactions (telegram_id, created_at DESC);
+            CREATE INDEX transactions_created_at_idx ON transactions (created_at);
+
+            EXECUTE format(
+                'ALTER TABLE transactions_legacy ADD CONSTRAINT transactions_legacy_range CHECK (created_at < %L)',
+                boundary
+            );
+            EXECUTE format(
+                'ALTER TABLE transactions ATTACH PARTITION transactions_legacy FOR VALUES FROM (MINVALUE) TO (%L)',
+                boundary
+            );
+
+            FOR month IN SELECT generate_series(boundary, boundary + INTERVAL '2 months', INTERVAL '1 month') LOOP
+                EXECUTE format(
+                    'CREATE TABLE %I PARTITION OF transactions FOR VALUES FROM (%L) TO (%L)',
+                    'transactions_' || to_char(month, '"y"YYYY"m"MM'), month, month + INTERVAL '1 month'
+                );
+            END LOOP;
+        END $$
+        """,
+    ),
+)
+
+# Append-only, one row per user per TrafficAccumulator flush
+TRAFFIC_USAGE_HISTORY = Migration(
+    5,
+    "traffic usage history",
+    (
+        """
+        CREATE TABLE IF NOT EXISTS traffic_usage (
+            telegram_id BIGINT NOT NULL,
+            used_bytes BIGINT NOT NULL,
+            recorded_at TIMESTAMP NOT NULL DEFAULT NOW()
+        ) PARTITION BY RANGE (recorded_at)
+        """,
+        """
+        CREATE INDEX IF NOT EXISTS traffic_usage_telegram_id_recorded_at_idx
+        ON traffic_usage (telegram_id, recorded_at)
+        """,
+        """
+        DO $$
+        DECLARE
+            month TIMESTAMP;
+        BEGIN
+            FOR month IN
+                SELECT generate_series(date_trunc('month', NOW()), date_trunc('month', NOW()) + INTERVAL '2 months', INTERVAL '1 month')
+            LOOP
+                EXECUTE format(
+                    'CREATE TABLE IF NOT EXISTS %I PARTITION OF traffic_usage FOR VALUES FROM (%L) TO (%L)',
+                    'traffic_usage_' || to_char(month, '"y"YYYY"m"MM'), month, month + INTERVAL '1 month'
+                );
+            END LOOP;
+        END $$
+        """,
+    ),
+)
+
+# QuotaIndexSync.CHANNEL. Fires on quota-defining changes only: the
+# TrafficAccumulator's traffic_used_bytes updates would notify per user per
+# flush, usage is picked up from traffic_usage instead (hence its
+# recorded_at index).
+QUOTA_CHANGED_NOTIFY = Migration(
+    6,
+    "notify quota_changed",
+    (
+        """
+        CREATE OR REPLACE FUNCTION notify_quota_changed() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP = 'DELETE' THEN
+                PERFORM pg_notify('quota_changed', OLD.telegram_id::text);
+            ELSE
+                PERFORM pg_notify('quota_changed', NEW.telegram_id::text);
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+        """,
+        "DROP TRIGGER IF EXISTS quota_changed ON subscriptions",
+        """
+        CREATE TRIGGER quota_changed
+        AFTER INSERT OR DELETE OR UPDATE OF is_active, traffic_limit_bytes, extra_traffic_bytes, expires_at
+        ON subscriptions
+        FOR EACH ROW EXECUTE FUNCTION notify_quota_changed()
+        """,
+        "DROP TRIGGER IF EXISTS quota_changed ON free_subscriptions",
+        """
+        CREATE TRIGGER quota_changed
+        AFTER INSERT OR DELETE OR UPDATE OF traffic_limit_bytes, expires_at
+        ON free_subscriptions
+        FOR EACH ROW EXECUTE FUNCTION notify_quota_changed()
+        """,
+        """
+        CREATE INDEX IF NOT EXISTS traffic_usage_recorded_at_idx
+        ON traffic_usage (recorded_at)
+        """,
+    ),
+)
+
+# BroadcastDispatcher progress, last_user_id is the resume point of the
+# keyset walk over users
+BROADCASTS = Migration(
+    7,
+    "broadcasts",
+    (
+        """
+        CREATE TABLE IF NOT EXISTS broadcasts (
+            broadcast_id BIGSERIAL PRIMARY KEY,
+            text TEXT NOT NULL,
+            parse_mode TEXT,
+            status TEXT NOT NULL DEFAULT 'pending'
+                CHECK (status IN ('pending', 'running', 'completed', 'cancelled')),
+            last_user_id BIGINT NOT NULL DEFAULT 0,
+            sent BIGINT NOT NULL DEFAULT 0,
+            failed BIGINT NOT NULL DEFAULT 0,
+            blocked BIGINT NOT NULL DEFAULT 0,
+            created_at TIMESTAMP NOT NULL DEFAULT NOW(),
+            updated_at TIMESTAMP NOT NULL DEFAULT NOW()
+        )
+        """,
+    ),
+)
+
+# Per-day, per-plan revenue kept current by a trigger on every path into or
+# out of 'completed' (settle, update_status, COPY). Each (day, plan) is
+# spread over 16 shard rows by transaction_id so concurrent settlements don't
+# queue on one row lock; readers sum the shards. Rows outlive archived
+# transaction partitions: DETACH/DROP doesn't fire the trigger.
+REVENUE_ROLLUPS = Migration(
+    8,
+    "revenue rollups",
+    (
+        """
+        CREATE TABLE IF NOT EXISTS revenue_daily (
+            day DATE NOT NULL,
+            transaction_type TEXT NOT NULL,
+            -- plan_id or extra_traffic_plan_id, 0 for neither
+            plan_id INTEGER NOT NULL,
+            shard SMALLINT NOT NULL,
+            purchases BIGINT NOT NULL DEFAULT 0,
+            revenue_toman BIGINT NOT NULL DEFAULT 0,
+            traffic_bytes BIGINT NOT NULL DEFAULT 0,
+            PRIMARY KEY (day, transaction_type, plan_id, shard)
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS rollup_backfills (
+            name TEXT PRIMARY KEY,
+            next_day DATE NOT NULL,
+            until_day DATE NOT NULL,
+            updated_at TIMESTAMP NOT NULL DEFAULT NOW()
+        )
+        """,
+        """
+        CREATE OR REPLACE FUNCTION rollup_revenue() RETURNS trigger AS $$
+        DECLARE
+            tx transactions%ROWTYPE;
+            direction INTEGER;
+            traffic BIGINT;
+        BEGIN
+            IF TG_OP = 'INSERT' AND NEW.status = 'completed' THEN
+                tx := NEW; direction := 1;
+            ELSIF TG_OP = 'DELETE' AND OLD.status = 'completed' THEN
+                tx := OLD; direction := -1;
+            ELSIF TG_OP = 'UPDATE' AND NEW.status = 'completed' AND OLD.status <> 'completed' THEN
+                tx := NEW; direction := 1;
+            ELSIF TG_OP = 'UPDATE' AND OLD.status = 'completed' AND NEW.status <> 'completed' THEN
+                tx := OLD; direction := -1;
+            ELSE
+                RETURN NULL;
+            END IF;
+
+            IF tx.plan_id IS NOT NULL THEN
+                SELECT traffic_bytes INTO traffic FROM plans WHERE plan_id = tx.plan_id;
+            ELSIF tx.extra_traffic_plan_id IS NOT NULL THEN
+                SELECT traffic_bytes INTO traffic FROM extra_traffic_plans
+                WHERE extra_traffic_plan_id = tx.extra_traffic_plan_id;
+            END IF;
+
+            INSERT INTO revenue_daily AS r (
+                day, transaction_type, plan_id, shard, purchases, revenue_toman, traffic_bytes
+            )
+            VALUES (
+                tx.created_at::date,
+                tx.transaction_type,
+                COALESCE(tx.plan_id, tx.extra_traffic_plan_id, 0),
+                tx.transaction_id % 16,
+                direction,
+                direction * tx.price_toman,
+                direction * COALESCE(traffic, 0)
+            )
+            ON CONFLICT (day, transaction_type, plan_id, shard) DO UPDATE SET
+                purchases = r.purchases + EXCLUDED.purchases,
+                revenue_toman = r.revenue_toman + EXCLUDED.revenue_toman,
+                traffic_bytes = r.traffic_bytes + EXCLUDED.traffic_bytes;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+        """,
+        "DROP TRIGGER IF EXISTS rollup_revenue ON transactions",
+        """
+        CREATE TRIGGER rollup_revenue
+        AFTER INSERT OR DELETE OR UPDATE OF status ON transactions
+        FOR EACH ROW EXECUTE FUNCTION rollup_revenue()
+        """,
+    ),
+)
+
+# Events written in the transaction of the change they describe, drained by
+# OutboxDispatcher. The statement-level trigger wakes dispatchers once per
+# committing transaction; NOTIFY is delivered only on commit, so a woken
+# dispatcher always finds the rows. Events that keep failing move to
+# outbox_dead instead of holding back the user's later events.
+OUTBOX = Migration(
+    9,
+    "outbox",
+    (
+        """
+        CREATE TABLE IF NOT EXISTS outbox (
+            event_id BIGSERIAL PRIMARY KEY,
+            telegram_id BIGINT NOT NULL,
+            event_type TEXT NOT NULL,
+            payload JSONB NOT NULL DEFAULT '{}',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            available_at TIMESTAMP NOT NULL DEFAULT NOW(),
+            created_at TIMESTAMP NOT NULL DEFAULT NOW(),
+            last_error TEXT
+        )
+        """,
+        """
+        CREATE INDEX IF NOT EXISTS outbox_telegram_id_event_id_idx
+        ON outbox (telegram_id, event_id)
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS outbox_dead (
+            event_id BIGINT PRIMARY KEY,
+            telegram_id BIGINT NOT NULL,
+            event_type TEXT NOT NULL,
+            payload JSONB NOT NULL,
+            attempts INTEGER NOT NULL,
+            created_at TIMESTAMP NOT NULL,
+            last_error TEXT,
+            failed_at TIMESTAMP NOT NULL DEFAULT NOW()
+        )
+        """,
+        """
+        CREATE OR REPLACE FUNCTION notify_outbox() RETURNS trigger AS $$
+        BEGIN
+            PERFORM pg_notify('outbox', '');
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+        """,
+        "DROP TRIGGER IF EXISTS outbox_notify ON outbox",
+        """
+        CREATE TRIGGER outbox_notify
+        AFTER INSERT ON outbox
+        FOR EACH STATEMENT EXECUTE FUNCTION notify_outbox()
+        """,
+    ),
+)
+
+# Catch rows beyond the last monthly partition so inserts keep working when
+# PartitionMaintainer falls behind; ensure_partitions moves them out into
+# the month's partition when it creates it.
+DEFAULT_PARTITIONS = Migration(
+    10,
+    "default partitions",
+    (
+        "CREATE TABLE IF NOT EXISTS transactions_default PARTITION OF transactions DEFAULT",
+        "CREATE TABLE IF NOT EXISTS traffic_usage_default PARTITION OF traffic_usage DEFAULT",
+    ),
+)
+
+# Partitions PartitionMaintainer detached for archiving, recorded in the
+# DETACH's transaction: the only tables it will ever dump and drop
+PARTITION_ARCHIVES = Migration(
+    11,
+    "partition archives",
+    (
+        """
+        CREATE TABLE IF NOT EXISTS partition_archives (
+            partition_name TEXT PRIMARY KEY,
+            parent_table TEXT NOT NULL,
+            detached_at TIMESTAMP NOT NULL DEFAULT NOW()
+        )
+        """,
+    ),
+)
+
+# Revenue is attributed to the day a transaction completed, not the day it
+# was created, and the traffic sold is kept on the transaction so plan edits
+# don't rewrite history. stamp_transaction fills both: traffic_bytes from the
+# plan on insert (or completion, for older pending rows), completed_at on
+# every move into 'completed'. Completed rows are backfilled with their
+# created_at, the day revenue_daily already has them under, so existing
+# rollups stay valid; their traffic comes from the current plans, run
+# RevenueRollups.backfill() if plans were edited since. The backfill
+# rewrites every completed row and the index build blocks writes to
+# transactions, plan a window for large tables.
+REVENUE_BY_COMPLETION = Migration(
+    12,
+    "revenue by completion day",
+    (
+        """
+        ALTER TABLE transactions
+            ADD COLUMN IF NOT EXISTS completed_at TIMESTAMP,
+            ADD COLUMN IF NOT EXISTS traffic_bytes BIGINT
+        """,
+        """
+        UPDATE transactions t
+        SET completed_at = t.created_at,
+            traffic_bytes = COALESCE(
+                (SELECT traffic_bytes FROM plans WHERE plan_id = t.plan_id),
+                (SELECT traffic_bytes FROM extra_traffic_plans
+                 WHERE extra_traffic_plan_id = t.extra_traffic_plan_id),
+                0
+            )
+        WHERE t.status = 'completed' AND t.completed_at IS NULL
+        """,
+        """
+        CREATE INDEX IF NOT EXISTS transactions_completed_at_idx
+        ON transactions (completed_at) WHERE completed_at IS NOT NULL
+        """,
+        """
+        CREATE OR REPLACE FUNCTION stamp_transaction() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP = 'INSERT' THEN
+                IF NEW.status = 'completed' AND NEW.completed_at IS NULL THEN
+                    NEW.completed_at := NOW();
+                END IF;
+            ELSIF NEW.status = 'completed' AND OLD.status <> 'completed' THEN
+                NEW.completed_at := NOW();
+            END IF;
+
+            IF NEW.traffic_bytes IS NULL THEN
+                IF NEW.plan_id IS NOT NULL THEN
+                    SELECT traffic_bytes INTO NEW.traffic_bytes FROM plans WHERE plan_id = NEW.plan_id;
+                ELSIF NEW.extra_traffic_plan_id IS NOT NULL THEN
+                    SELECT traffic_bytes INTO NEW.traffic_bytes FROM extra_traffic_plans
+                    WHERE extra_traffic_plan_id = NEW.extra_traffic_plan_id;
+                END IF;
+            END IF;
+            RETURN NEW;
+        END;
+        $$ LANGUAGE plpgsql
+        """,
+        "DROP TRIGGER IF EXISTS stamp_transaction ON transactions",
+        """
+        CREATE TRIGGER stamp_transaction
+        BEFORE INSERT OR UPDATE OF status ON transactions
+        FOR EACH ROW EXECUTE FUNCTION stamp_transaction()
+        """,
+        """
+        CREATE OR REPLACE FUNCTION rollup_revenue() RETURNS trigger AS $$
+        DECLARE
+            tx transactions%ROWTYPE;
+            direction INTEGER;
+        BEGIN
+            IF TG_OP = 'INSERT' AND NEW.status = 'completed' THEN
+                tx := NEW; direction := 1;
+            ELSIF TG_OP = 'DELETE' AND OLD.status = 'completed' THEN
+                tx := OLD; direction := -1;
+            ELSIF TG_OP = 'UPDATE' AND NEW.status = 'completed' AND OLD.status <> 'completed' THEN
+                tx := NEW; direction := 1;
+            ELSIF TG_OP = 'UPDATE' AND OLD.status = 'completed' AND NEW.status <> 'completed' THEN
+                tx := OLD; direction := -1;
+            ELSE
+                RETURN NULL;
+            END IF;
+
+            INSERT INTO revenue_daily AS r (
+                day, transaction_type, plan_id, shard, purchases, revenue_toman, traffic_bytes
+            )
+            VALUES (
+                tx.completed_at::date,
+                tx.transaction_type,
+                COALESCE(tx.plan_id, tx.extra_traffic_plan_id, 0),
+                tx.transaction_id % 16,
+                direction,
+                direction * tx.price_toman,
+                direction * COALESCE(tx.traffic_bytes, 0)
+            )
+            ON CONFLICT (day, transaction_type, plan_id, shard) DO UPDATE SET
+                purchases = r.purchases + EXCLUDED.purchases,
+                revenue_toman = r.revenue_toman + EXCLUDED.revenue_toman,
+                traffic_bytes = r.traffic_bytes + EXCLUDED.traffic_bytes;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+        """,
+    ),
+)
+
+MIGRATIONS = (
+    INITIAL_SCHEMA,
+    PLANS_CHANGED_NOTIFY,
+    HOT_PATH_INDEXES,
+    PARTITION_TRANSACTIONS,
+    TRAFFIC_USAGE_HISTORY,
+    QUOTA_CHANGED_NOTIFY,
+    BROADCASTS,
+    REVENUE_ROLLUPS,
+    OUTBOX,
+    DEFAULT_PARTITIONS,
+    PARTITION_ARCHIVES,
+    REVENUE_BY_COMPLETION,
+)
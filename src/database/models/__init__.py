@@ -1,5 +1,11 @@
 from .user import User
-from .plan import Plan
+from .plan import Plan, ExtraTrafficPlan
 from .purchase import Purchase
 from .subscription import Subscription, FreeSubscription
-from .transaction import Transaction
\ No newline at end of file
+from .transaction import Transaction
+from .traffic_usage import TrafficUsage
+from .user_context import UserContext
+from .broadcast import Broadcast
+from .revenue import RevenueRollup
+from .outbox import OutboxEvent
+from .batch import SubscriptionBatch, TransactionBatch
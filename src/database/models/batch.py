@@ -0,0 +1,150 @@
+from array import array
+from dataclasses import fields
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+from .subscription import Subscription
+from .transaction import Transaction
+
+
+@lru_cache(maxsize=None)
+def _numpy():
+    """NumPy or None when not installed, imported on first use so importing models stays cheap"""
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+
+def _utc_naive(value: Optional[datetime]) -> Optional[datetime]:
+    if value is not None and value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+class ColumnBatch:
+    """
+    Columnar result set: one array per model field instead of one object per row.
+    Integer columns are int64 and timestamps datetime64[us] (naive UTC) when
+    NumPy is installed; without it they fall back to array('q') and lists.
+    """
+
+    model: type = None
+    int_columns: Sequence[str] = ()
+    bool_columns: Sequence[str] = ()
+    time_columns: Sequence[str] = ()
+
+    def __init__(self, columns: Dict[str, Any], length: int):
+        self.columns = columns
+        self._length = length
+
+    @classmethod
+    def column_names(cls) -> List[str]:
+        return [field.name for field in fields(cls.model)]
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Sequence[Any]]) -> "ColumnBatch":
+        """Build from rows whose values are in model field order (asyncpg Records or tuples)"""
+        rows = list(rows)
+        names = cls.column_names()
+        values = list(zip(*rows)) if rows else [() for _ in names]
+        columns = {name: cls._to_column(name, column) for name, column in zip(names, values)}
+        return cls(columns, len(rows))
+
+    @classmethod
+    def _to_column(cls, name: str, values: Sequence[Any]) -> Any:
+        np = _numpy()
+        if name in cls.int_columns:
+            values = [0 if value is None else value for value in values]
+            return np.array(values, dtype=np.int64) if np is not None else array("q", values)
+        if name in cls.bool_columns:
+            return np.array(values, dtype=bool) if np is not None else [bool(value) for value in values]
+        if name in cls.time_columns:
+            values = [_utc_naive(value) for value in values]
+            if np is not None:
+                return np.array(
+                    [np.datetime64("NaT") if value is None else value for value in values],
+                    dtype="datetime64[us]"
+                )
+            return values
+        return list(values)
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __getitem__(self, index: int):
+        """Materialize a single row as a model"""
+        np = _numpy()
+        values = []
+        for name in self.column_names():
+            value = self.columns[name][index]
+            if np is not None and isinstance(value, np.generic):
+                value = value.item()
+            values.append(value)
+        return self.model(*values)
+
+    def __iter__(self):
+        for index in range(self._length):
+            yield self[index]
+
+
+class SubscriptionBatch(ColumnBatch):
+    model = Subscription
+    int_columns = (
+        "id", "telegram_id", "purchase_id",
+        "traffic_limit_bytes", "traffic_used_bytes", "extra_traffic_bytes"
+    )
+    bool_columns = ("is_active",)
+    time_columns = ("started_at", "expires_at")
+
+    @property
+    def total_traffic_bytes(self):
+        """Limit + extra traffic for every row"""
+        np = _numpy()
+        limit = self.columns["traffic_limit_bytes"]
+        extra = self.columns["extra_traffic_bytes"]
+        if np is not None:
+            return limit + extra
+        return array("q", (a + b for a, b in zip(limit, extra)))
+
+    @property
+    def remaining_traffic_bytes(self):
+        """Remaining traffic for every row, never negative"""
+        np = _numpy()
+        total = self.total_traffic_bytes
+        used = self.columns["traffic_used_bytes"]
+        if np is not None:
+            return np.maximum(total - used, 0)
+        return array("q", (max(0, a - b) for a, b in zip(total, used)))
+
+    def is_expired(self, now: Optional[datetime] = None):
+        """Expiry flag for every row, now defaults to the current UTC time"""
+        np = _numpy()
+        now = _utc_naive(now) if now else datetime.now(timezone.utc).replace(tzinfo=None)
+        expires_at = self.columns["expires_at"]
+        if np is not None:
+            return np.datetime64(now, "us") > expires_at
+        return [value is not None and now > value for value in expires_at]
+
+
+class TransactionBatch(ColumnBatch):
+    model = Transaction
+    int_columns = ("transaction_id", "telegram_id", "price_toman", "ref_id", "traffic_bytes")
+    time_columns = ("created_at", "completed_at")
+
+    def completed_mask(self):
+        """Completed flag for every row"""
+        np = _numpy()
+        statuses = self.columns["status"]
+        if np is not None:
+            return np.array(statuses, dtype=object) == "completed"
+        return [status == "completed" for status in statuses]
+
+    def revenue_toman(self) -> int:
+        """Sum of price_toman over completed transactions"""
+        np = _numpy()
+        prices = self.columns["price_toman"]
+        if np is not None:
+            return int(prices[self.completed_mask()].sum())
+        return sum(price for price, done in zip(prices, self.completed_mask()) if done)
@@ -0,0 +1,17 @@
+from dataclasses import dataclass
+from typing import Optional
+from datetime import datetime
+
+@dataclass(slots=True)
+class Broadcast:
+    broadcast_id: Optional[int] = None
+    text: str = ""
+    parse_mode: Optional[str] = None
+    status: str = "pending"  # 'pending', 'running', 'completed' or 'cancelled'
+    # Every recipient with user_id <= last_user_id has been handled
+    last_user_id: int = 0
+    sent: int = 0
+    failed: int = 0
+    blocked: int = 0
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
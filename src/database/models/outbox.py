@@ -0,0 +1,16 @@
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional
+from datetime import datetime
+
+@dataclass(slots=True)
+class OutboxEvent:
+    event_id: Optional[int] = None
+    telegram_id: int = 0
+    event_type: str = ""
+    payload: Dict[str, Any] = field(default_factory=dict)
+    # Failed deliveries so far
+    attempts: int = 0
+    # Not claimed before this, pushed back after each failure
+    available_at: Optional[datetime] = None
+    created_at: Optional[datetime] = None
+    last_error: Optional[str] = None
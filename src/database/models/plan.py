@@ -1,7 +1,7 @@
 from dataclasses import dataclass
 from typing import Optional
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class Plan:
     plan_id: Optional[int] = None
     name: str = ""
@@ -14,7 +14,7 @@ class Plan:
         """Get traffic in GB"""
         return self.traffic_bytes / (1024 ** 3)
 
-@dataclass    
+@dataclass(frozen=True, slots=True)
 class ExtraTrafficPlan():
     extra_traffic_plan_id: Optional[int] = None
     price_toman: int = 0
@@ -2,7 +2,7 @@ from dataclasses import dataclass
 from typing import Optional
 from datetime import datetime
 
-@dataclass
+@dataclass(slots=True)
 class Purchase:
     purchase_id: Optional[int] = None
     telegram_id: int = 0
@@ -0,0 +1,14 @@
+from dataclasses import dataclass
+from typing import Optional
+from datetime import date
+
+@dataclass(slots=True)
+class RevenueRollup:
+    # None in totals over a range of days
+    day: Optional[date] = None
+    transaction_type: Optional[str] = None
+    # plan_id or extra_traffic_plan_id, 0 for neither; None in totals over plans
+    plan_id: Optional[int] = None
+    purchases: int = 0
+    revenue_toman: int = 0
+    traffic_bytes: int = 0
@@ -2,7 +2,7 @@ from dataclasses import dataclass
 from typing import Optional
 from datetime import datetime
 
-@dataclass
+@dataclass(slots=True)
 class Subscription:
     id: Optional[int] = None
     telegram_id: int = 0
@@ -29,7 +29,7 @@ class Subscription:
         """Check if subscription is expired."""
         return datetime.now() > self.expires_at
 
-@dataclass
+@dataclass(slots=True)
 class FreeSubscription:
     id: Optional[int] = None
     telegram_id: int = 0
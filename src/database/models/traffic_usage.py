@@ -0,0 +1,9 @@
+from dataclasses import dataclass
+from typing import Optional
+from datetime import datetime
+
+@dataclass(slots=True)
+class TrafficUsage:
+    telegram_id: int = 0
+    used_bytes: int = 0
+    recorded_at: Optional[datetime] = None
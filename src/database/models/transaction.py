@@ -2,7 +2,7 @@ from dataclasses import dataclass
 from typing import Optional
 from datetime import datetime
 
-@dataclass
+@dataclass(slots=True)
 class Transaction:
     transaction_id: Optional[int] = None
     telegram_id: int = 0
@@ -13,4 +13,8 @@ class Transaction:
     price_toman: int = 0
     authority: str = ""
     ref_id: int = 0
-    created_at: Optional[datetime] = None
\ No newline at end of file
+    created_at: Optional[datetime] = None
+    # Set when the transaction moves to 'completed', revenue is attributed to this day
+    completed_at: Optional[datetime] = None
+    # Traffic of the plan bought, as sold
+    traffic_bytes: Optional[int] = None
\ No newline at end of file
@@ -0,0 +1,15 @@
+from dataclasses import dataclass
+from typing import Optional
+from .user import User
+from .subscription import Subscription, FreeSubscription
+
+@dataclass(slots=True)
+class UserContext:
+    """Everything the per-update hot path needs about the sender"""
+    user: User
+    subscription: Optional[Subscription] = None
+    free_subscription: Optional[FreeSubscription] = None
+
+    @property
+    def is_banned(self) -> bool:
+        return self.user.is_banned
@@ -0,0 +1,329 @@
+import asyncio
+import random
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Optional, TypeVar
+from src.config.logging_config import get_logger
+from src.database.routing import CONNECTION_ERRORS
+
+logger = get_logger(__name__)
+
+T = TypeVar("T")
+
+
+class DatabaseUnavailableError(RuntimeError):
+    """Raised without touching the pool while the circuit breaker is open"""
+
+
+async def retry_with_backoff(
+        operation: Callable[[], Awaitable[T]],
+        retries: int,
+        base_delay: float = 0.5,
+        max_delay: float = 30.0
+) -> T:
+    """Run operation, retrying failures with full-jitter exponential backoff"""
+    for attempt in range(1, retries + 1):
+        try:
+            return await operation()
+        except Exception as e:
+            if attempt == retries:
+                raise
+            delay = random.uniform(0, min(max_delay, base_delay * 2 ** attempt))
+            logger.warning(f"Attempt {attempt}/{retries} failed: {e}, retrying in {delay:.2f}s")
+            await asyncio.sleep(delay)
+
+
+class CircuitBreaker:
+    """
+    Closed -> open after failure_threshold consecutive connection failures.
+    While open, callers fail fast; after reset_timeout one trial request is let
+    through (half-open) and its outcome closes or re-opens the breaker.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 10.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+
+    def check(self) -> None:
+        """Raise DatabaseUnavailableError unless a request may go through"""
+        if self.state == self.CLOSED:
+            return
+        if self.state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+            self.state = self.HALF_OPEN
+            return
+        raise DatabaseUnavailableError("Database circuit breaker is open")
+
+    def record_success(self) -> None:
+        if self.state != self.CLOSED:
+            logger.info("Database circuit breaker closed")
+        self.state = self.CLOSED
+        self._failures = 0
+
+    def abandon_trial(self) -> None:
+        """The half-open trial ended without reaching the server, let the next request try"""
+        if self.state == self.HALF_OPEN:
+            self.state = self.OPEN
+            self._opened_at = time.monotonic() - self.reset_timeout
+
+    def record_failure(self) -> None:
+        self._failures += 1
+        if self.state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                logger.error(f"Database circuit breaker opened after {self._failures} failures")
+            self.state = self.OPEN
+            self._opened_at = time.monotonic()
+
+
+class ResizableLimiter:
+    """Semaphore whose capacity can change at runtime"""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.in_use = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+
+    async def acquire(self) -> None:
+        if self.in_use < self.limit and not self._waiters:
+            self.in_use += 1
+            return
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await waiter
+        except BaseException:
+            if waiter.done() and not waiter.cancelled():
+                # Slot was handed over just as we were cancelled
+                self.release()
+            else:
+                self._waiters.remove(waiter)
+            raise
+
+    @property
+    def waiting(self) -> int:
+        return len(self._waiters)
+
+    def release(self) -> None:
+        self.in_use -= 1
+        self._wake()
+
+    def resize(self, limit: int) -> None:
+        self.limit = limit
+        self._wake()
+
+    def _wake(self) -> None:
+        while self._waiters and self.in_use < self.limit:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self.in_use += 1
+                waiter.set_result(None)
+
+
+class _SupervisedAcquire:
+    """pool.acquire() behind the circuit breaker and the adaptive limiter"""
+
+    __slots__ = ("_supervisor", "_pool", "_instrumentation", "_acquire")
+
+    def __init__(self, supervisor: "PoolSupervisor", pool, instrumentation):
+        self._supervisor = supervisor
+        self._pool = pool
+        self._instrumentation = instrumentation
+        self._acquire = None
+
+    async def __aenter__(self):
+        supervisor = self._supervisor
+        supervisor.breaker.check()
+
+        started = time.perf_counter()
+        admitted = False
+        try:
+            # Inside the try: a check() that let a half-open trial through must
+            # settle it even when the wait for a slot is cancelled
+            await supervisor.limiter.acquire()
+            admitted = True
+            self._acquire = self._pool.acquire()
+            conn = await self._acquire.__aenter__()
+        except BaseException as e:
+            if admitted:
+                supervisor.limiter.release()
+            if isinstance(e, CONNECTION_ERRORS):
+                supervisor.breaker.record_failure()
+            else:
+                # Limiter or pool timeout, or cancellation, says nothing about the server
+                supervisor.breaker.abandon_trial()
+            raise
+
+        wait = time.perf_counter() - started
+        supervisor.observe_wait(wait)
+        if self._instrumentation is not None:
+            self._instrumentation.pool_wait.observe(wait)
+        return conn
+
+    async def __aexit__(self, exc_type, exc, tb):
+        supervisor = self._supervisor
+        try:
+            return await self._acquire.__aexit__(exc_type, exc, tb)
+        finally:
+            supervisor.limiter.release()
+            # Anything else, a query error included, means the server answered;
+            # otherwise a half-open trial would never settle and the breaker stay shut
+            if isinstance(exc, CONNECTION_ERRORS):
+                supervisor.breaker.record_failure()
+            else:
+                supervisor.breaker.record_success()
+
+
+class PoolSupervisor:
+    """
+    Keeps the pool usable: parallel warm-up, a health prober recycling broken
+    connections, a circuit breaker, and an admission limit between min_size and
+    max_size adapted to the observed acquire wait. The asyncpg pool itself is
+    created at max_size; connections above the limit idle out via
+    max_inactive_connection_lifetime.
+    """
+
+    def __init__(
+            self,
+            min_size: int,
+            max_size: int,
+            initial_size: int,
+            breaker: CircuitBreaker,
+            health_interval: float = 10.0,
+            resize_interval: float = 1.0,
+            wait_target: float = 0.01,
+            probe_timeout: float = 5.0
+    ):
+        self.min_size = min_size
+        self.max_size = max_size
+        self.breaker = breaker
+        self.limiter = ResizableLimiter(max(min_size, min(initial_size, max_size)))
+        self.health_interval = health_interval
+        self.resize_interval = resize_interval
+        self.wait_target = wait_target
+        self.probe_timeout = probe_timeout
+        self.wait_ewma = 0.0
+        self._peak_in_use = 0
+        self._tasks: list = []
+
+    @property
+    def size(self) -> int:
+        return self.limiter.limit
+
+    def acquire(self, pool, instrumentation=None) -> _SupervisedAcquire:
+        return _SupervisedAcquire(self, pool, instrumentation)
+
+    def observe_wait(self, wait: float) -> None:
+        self.wait_ewma = 0.8 * self.wait_ewma + 0.2 * wait
+        if self.limiter.in_use > self._peak_in_use:
+            self._peak_in_use = self.limiter.in_use
+
+    async def warm_up(self, pool, size: int) -> None:
+        """Open up to size connections in parallel so the first requests don't pay for them"""
+        size = min(size, self.max_size)
+        if size <= 0:
+            return
+
+        started = time.perf_counter()
+        connections = await asyncio.gather(
+            *(pool.acquire() for _ in range(size)), return_exceptions=True
+        )
+        opened = 0
+        for conn in connections:
+            if isinstance(conn, BaseException):
+                logger.warning(f"Warm-up connection failed: {conn}")
+                continue
+            opened += 1
+            await pool.release(conn)
+        logger.info(
+            "Database pool warmed up",
+            connections=opened,
+            duration_ms=round((time.perf_counter() - started) * 1000, 2)
+        )
+
+    def start(self, pool) -> None:
+        self._tasks = [
+            asyncio.create_task(self._probe_loop(pool)),
+            asyncio.create_task(self._resize_loop()),
+        ]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._tasks = []
+
+    async def probe(self, pool) -> bool:
+        """
+        Check a pooled connection; on a connection error recycle all of them.
+        Skipped while every admitted slot is taken or no connection frees up
+        within probe_timeout: a saturated pool is busy, not broken, and the
+        callers' own queries keep feeding the breaker meanwhile.
+        """
+        if self.limiter.in_use >= self.limiter.limit:
+            return True
+        try:
+            acquired = pool.acquire(timeout=self.probe_timeout)
+            conn = await acquired.__aenter__()
+        except asyncio.TimeoutError:
+            logger.debug("Database health probe skipped, no idle connection")
+            return True
+        except CONNECTION_ERRORS as e:
+            return await self._probe_failed(pool, e)
+
+        try:
+            await conn.fetchval("SELECT 1", timeout=self.probe_timeout)
+        except BaseException as e:
+            # Released on any exception, a query timeout or cancellation included
+            await acquired.__aexit__(type(e), e, e.__traceback__)
+            if isinstance(e, CONNECTION_ERRORS):
+                return await self._probe_failed(pool, e)
+            raise
+        await acquired.__aexit__(None, None, None)
+        self.breaker.record_success()
+        return True
+
+    async def _probe_failed(self, pool, error: BaseException) -> bool:
+        logger.warning(f"Database health probe failed: {error}")
+        self.breaker.record_failure()
+        await pool.expire_connections()
+        return False
+
+    async def _probe_loop(self, pool) -> None:
+        while True:
+            await asyncio.sleep(self.health_interval)
+            try:
+                await self.probe(pool)
+            except Exception as e:
+                logger.error(f"Database health probe errored: {e}")
+
+    def resize(self) -> None:
+        """Grow while callers queue for connections, shrink while the pool sits mostly idle"""
+        current = self.limiter.limit
+        limit = current
+        if self.wait_ewma > self.wait_target and current < self.max_size:
+            limit = min(self.max_size, current + max(1, current // 4))
+        elif self.wait_ewma < self.wait_target / 4 and self._peak_in_use < current // 2 and current > self.min_size:
+            limit = current - 1
+
+        if limit != current:
+            logger.debug(f"Database pool limit {current} -> {limit}")
+            self.limiter.resize(limit)
+        # Decay so a quiet period is noticed even without new acquires
+        self.wait_ewma *= 0.5
+        self._peak_in_use = self.limiter.in_use
+
+    async def _resize_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.resize_interval)
+            self.resize()
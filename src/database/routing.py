@@ -0,0 +1,174 @@
+import asyncio
+import re
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence
+import asyncpg
+from src.config.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+# Set while DatabaseManager.transaction() is open, everything in it stays on the primary
+in_transaction: ContextVar[bool] = ContextVar("in_transaction", default=False)
+# Set inside DatabaseManager.primary(), reads that must not see replication lag
+on_primary: ContextVar[bool] = ContextVar("on_primary", default=False)
+
+_READ_ONLY = re.compile(r"^\s*SELECT\b", re.IGNORECASE)
+_LOCKING = re.compile(r"\bFOR\s+(NO\s+KEY\s+)?(UPDATE|SHARE|KEY\s+SHARE)\b", re.IGNORECASE)
+_read_only_cache: Dict[str, bool] = {}
+
+CONNECTION_ERRORS = (
+    OSError,
+    asyncio.TimeoutError,
+    asyncpg.PostgresConnectionError,
+    asyncpg.ConnectionDoesNotExistError,
+)
+
+
+def is_read_only(query: str) -> bool:
+    """Plain SELECT without row locks; INSERT/UPDATE ... RETURNING and CTEs stay on the primary"""
+    result = _read_only_cache.get(query)
+    if result is None:
+        result = bool(_READ_ONLY.match(query)) and not _LOCKING.search(query)
+        _read_only_cache[query] = result
+    return result
+
+
+class Replica:
+    __slots__ = ("dsn", "pool", "outstanding", "healthy", "lag")
+
+    def __init__(self, dsn: str):
+        self.dsn = dsn
+        self.pool = None
+        self.outstanding = 0
+        self.healthy = False
+        self.lag = 0.0
+
+
+class ReplicaRouter:
+    """
+    Routes read-only queries to replicas.
+    Picks the healthy replica with the fewest outstanding requests whose
+    replication lag is within max_lag; callers fall back to the primary
+    when there is none.
+    """
+
+    LAG_QUERY = """
+        SELECT CASE
+            WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+            ELSE COALESCE(EXTRACT(EPOCH FROM NOW() - pg_last_xact_replay_timestamp()), 0)
+        END
+    """
+
+    def __init__(
+            self,
+            dsns: Sequence[str],
+            max_lag: float = 5.0,
+            health_interval: float = 5.0,
+            pool_factory: Callable[..., Awaitable[Any]] = asyncpg.create_pool,
+            **pool_kwargs
+    ):
+        self.replicas: List[Replica] = [Replica(dsn) for dsn in dsns]
+        self.max_lag = max_lag
+        self.health_interval = health_interval
+        self._pool_factory = pool_factory
+        self._pool_kwargs = pool_kwargs
+        self._health_task: Optional[asyncio.Task] = None
+
+    async def connect(self) -> None:
+        """Create replica pools; unreachable replicas are retried by the health check"""
+        for replica in self.replicas:
+            await self._connect_replica(replica)
+        await self.check_health()
+        self._health_task = asyncio.create_task(self._health_loop())
+
+    async def close(self) -> None:
+        if self._health_task is not None:
+            self._health_task.cancel()
+            try:
+                await self._health_task
+            except asyncio.CancelledError:
+                pass
+            self._health_task = None
+        for replica in self.replicas:
+            if replica.pool is not None:
+                await replica.pool.close()
+                replica.pool = None
+            replica.healthy = False
+
+    async def _connect_replica(self, replica: Replica) -> None:
+        try:
+            replica.pool = await self._pool_factory(dsn=replica.dsn, **self._pool_kwargs)
+        except Exception as e:
+            replica.healthy = False
+            logger.error(f"Failed to connect to replica: {e}")
+
+    async def check_health(self) -> None:
+        """Refresh health and replication lag of every replica"""
+        for replica in self.replicas:
+            if replica.pool is None:
+                await self._connect_replica(replica)
+                if replica.pool is None:
+                    continue
+            try:
+                async with replica.pool.acquire() as conn:
+                    replica.lag = float(await conn.fetchval(self.LAG_QUERY))
+                if not replica.healthy:
+                    logger.info(f"Replica is healthy, lag {replica.lag:.2f}s")
+                replica.healthy = True
+            except Exception as e:
+                if replica.healthy:
+                    logger.warning(f"Replica health check failed: {e}")
+                replica.healthy = False
+
+    async def _health_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.health_interval)
+            await self.check_health()
+
+    def pick(self) -> Optional[Replica]:
+        """Least-outstanding healthy replica within the lag budget"""
+        best = None
+        for replica in self.replicas:
+            if not replica.healthy or replica.lag > self.max_lag:
+                continue
+            if best is None or replica.outstanding < best.outstanding:
+                best = replica
+        return best
+
+    @asynccontextmanager
+    async def acquire(self, fallback: Callable[[], Any]):
+        """Connection from the best replica, or from fallback() (the primary)"""
+        replica = self.pick()
+        if replica is None:
+            async with fallback() as conn:
+                yield conn
+            return
+
+        replica.outstanding += 1
+        try:
+            try:
+                acquired = replica.pool.acquire()
+                conn = await acquired.__aenter__()
+            except CONNECTION_ERRORS as e:
+                replica.healthy = False
+                logger.warning(f"Replica unavailable, using primary: {e}")
+                async with fallback() as conn:
+                    yield conn
+                return
+
+            try:
+                yield conn
+            except CONNECTION_ERRORS as e:
+                # Next health check decides when it comes back
+                replica.healthy = False
+                logger.warning(f"Replica connection failed: {e}")
+                await acquired.__aexit__(type(e), e, e.__traceback__)
+                raise
+            except BaseException as e:
+                await acquired.__aexit__(type(e), e, e.__traceback__)
+                raise
+            else:
+                await acquired.__aexit__(None, None, None)
+        finally:
+            replica.outstanding -= 1
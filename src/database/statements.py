@@ -0,0 +1,69 @@
+import asyncpg
+from asyncpg.prepared_stmt import PreparedStatement
+from dataclasses import fields
+from typing import Dict
+from src.config.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+
+def columns(model: type, alias: str = "") -> str:
+    """
+    Column list in model field order.
+    Queries selecting these columns can be decoded with model(*record).
+    """
+    prefix = f"{alias}." if alias else ""
+    return ", ".join(f"{prefix}{field.name}" for field in fields(model))
+
+
+class RegistryConnection(asyncpg.Connection):
+    """Connection holding the registry statements prepared on it"""
+    __slots__ = ("_registry_statements",)
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._registry_statements: Dict[str, PreparedStatement] = {}
+
+
+class StatementRegistry:
+    """Queries declared once by repositories and prepared on every pool connection"""
+
+    def __init__(self):
+        self._queries: Dict[str, str] = {}
+
+    def register(self, name: str, query: str) -> str:
+        """Declare a named query, return the name used to execute it"""
+        existing = self._queries.get(name)
+        if existing is not None and existing != query:
+            raise ValueError(f"Statement '{name}' is already registered with a different query")
+        self._queries[name] = query
+        return name
+
+    def query(self, name: str) -> str:
+        """Query text of a registered statement"""
+        return self._queries[name]
+
+    def register_many(self, queries: Dict[str, str]) -> None:
+        """Declare several named queries"""
+        for name, query in queries.items():
+            self.register(name, query)
+
+    async def prepare_all(self, conn: RegistryConnection) -> None:
+        """Prepare every registered query on connection (pool init hook)"""
+        for name, query in self._queries.items():
+            conn._registry_statements[name] = await conn.prepare(query)
+
+    async def get(self, conn: RegistryConnection, name: str) -> PreparedStatement:
+        """Get statement prepared on connection, preparing late registrations on demand"""
+        stmt = conn._registry_statements.get(name)
+        if stmt is None:
+            try:
+                query = self._queries[name]
+            except KeyError:
+                raise KeyError(f"Unknown statement '{name}'") from None
+            stmt = await conn.prepare(query)
+            conn._registry_statements[name] = stmt
+        return stmt
+
+
+statements = StatementRegistry()
@@ -0,0 +1,59 @@
+from models import Broadcast
+from database.manager import DatabaseManager
+from database.statements import columns
+from typing import Dict, Any, List, Optional
+
+class BroadcastRepository:
+    """Broadcast progress operations"""
+
+    def __init__(self, db: DatabaseManager):
+        self.db = db
+
+    def _row_to_model(self, row: Dict[str, Any]) -> Broadcast:
+        return Broadcast(**row)
+
+    async def create(self, text: str, parse_mode: Optional[str] = None) -> Broadcast:
+        query = f"""
+            INSERT INTO broadcasts (text, parse_mode)
+            VALUES ($1, $2)
+            RETURNING {columns(Broadcast)}
+        """
+        return self._row_to_model(await self.db.fetch_one(query, text, parse_mode))
+
+    async def get(self, broadcast_id: int) -> Optional[Broadcast]:
+        query = f"SELECT {columns(Broadcast)} FROM broadcasts WHERE broadcast_id = $1"
+        # Progress is written on the primary, a replica may not have the latest checkpoint
+        async with self.db.transaction() as conn:
+            row = await self.db.fetch_one(query, broadcast_id, conn=conn)
+        return self._row_to_model(row) if row else None
+
+    async def get_unfinished(self) -> List[Broadcast]:
+        """Broadcasts pending or interrupted while running, oldest first"""
+        query = f"""
+            SELECT {columns(Broadcast)} FROM broadcasts
+            WHERE status IN ('pending', 'running')
+            ORDER BY broadcast_id
+        """
+        async with self.db.transaction() as conn:
+            rows = await self.db.fetch_all(query, conn=conn)
+        return [self._row_to_model(row) for row in rows]
+
+    async def checkpoint(
+            self,
+            broadcast_id: int,
+            last_user_id: int,
+            sent: int,
+            failed: int,
+            blocked: int
+    ) -> None:
+        """Record progress, every recipient up to last_user_id is handled"""
+        query = """
+            UPDATE broadcasts
+            SET last_user_id = $2, sent = $3, failed = $4, blocked = $5, updated_at = NOW()
+            WHERE broadcast_id = $1
+        """
+        await self.db.execute(query, broadcast_id, last_user_id, sent, failed, blocked)
+
+    async def set_status(self, broadcast_id: int, status: str) -> None:
+        query = "UPDATE broadcasts SET status = $2, updated_at = NOW() WHERE broadcast_id = $1"
+        await self.db.execute(query, broadcast_id, status)
@@ -0,0 +1,103 @@
+import json
+from models import OutboxEvent
+from database.manager import DatabaseManager
+from typing import Dict, Any, List, Sequence
+
+SUBSCRIPTION_CREATED = "subscription.created"
+SUBSCRIPTION_TRAFFIC_ADDED = "subscription.traffic_added"
+TRANSACTION_COMPLETED = "transaction.completed"
+SUBSCRIPTION_DEACTIVATED = "subscription.deactivated"
+
+class OutboxRepository:
+    """
+    Outbox event operations.
+    Events are added on the connection of the transaction making the change
+    they describe, so they commit or roll back with it. Events of one
+    telegram_id are delivered in event_id order: add() serializes writers of
+    the same user until commit, so their event_ids are also in commit order,
+    and claim() only hands out the oldest event of each user.
+    """
+
+    CHANNEL = "outbox"
+
+    CLAIM_QUERY = """
+        SELECT * FROM outbox o
+        WHERE o.available_at <= NOW()
+        AND NOT EXISTS (
+            SELECT 1 FROM outbox earlier
+            WHERE earlier.telegram_id = o.telegram_id
+            AND earlier.event_id < o.event_id
+        )
+        ORDER BY o.event_id
+        LIMIT $1
+        FOR UPDATE SKIP LOCKED
+    """
+
+    def __init__(self, db: DatabaseManager):
+        self.db = db
+
+    def _row_to_model(self, row: Dict[str, Any]) -> OutboxEvent:
+        event = OutboxEvent(**row)
+        if isinstance(event.payload, str):
+            event.payload = json.loads(event.payload)
+        return event
+
+    async def add(self, telegram_id: int, event_type: str, payload: Dict[str, Any], conn) -> int:
+        """Add event inside the caller's transaction, returns its event_id"""
+        # Transaction-scoped lock on telegram_id, released at commit. Keys
+        # share pg_advisory_lock's space with MIGRATION_LOCK_ID, far above
+        # any telegram_id.
+        query = """
+            INSERT INTO outbox (telegram_id, event_type, payload)
+            SELECT $1, $2, $3::jsonb FROM pg_advisory_xact_lock($1)
+            RETURNING event_id
+        """
+        return await self.db.fetch_val(
+            query, telegram_id, event_type, json.dumps(payload, default=str), conn=conn
+        )
+
+    async def claim(self, limit: int, conn) -> List[OutboxEvent]:
+        """
+        Lock up to limit due events, at most one per telegram_id, oldest first.
+        Rows locked by other dispatchers are skipped; an event whose
+        predecessor is locked or not yet due isn't eligible at all.
+        conn must be in a transaction, the locks last until it ends.
+        """
+        rows = await self.db.fetch_all(self.CLAIM_QUERY, limit, conn=conn)
+        return [self._row_to_model(row) for row in rows]
+
+    async def complete(self, event_ids: Sequence[int], conn) -> None:
+        """Remove delivered events"""
+        await self.db.execute(
+            "DELETE FROM outbox WHERE event_id = ANY($1::bigint[])", list(event_ids), conn=conn
+        )
+
+    async def retry(self, event_id: int, error: str, delay: float, conn) -> None:
+        """Count a failed delivery and make the event due again after delay seconds"""
+        query = """
+            UPDATE outbox
+            SET attempts = attempts + 1,
+                available_at = NOW() + $3 * INTERVAL '1 second',
+                last_error = $2
+            WHERE event_id = $1
+        """
+        await self.db.execute(query, event_id, error, delay, conn=conn)
+
+    async def bury(self, event_id: int, error: str, conn) -> None:
+        """Move event to outbox_dead, unblocking later events of its user"""
+        query = """
+            WITH dead AS (
+                DELETE FROM outbox WHERE event_id = $1 RETURNING *
+            )
+            INSERT INTO outbox_dead (
+                event_id, telegram_id, event_type, payload, attempts, created_at, last_error
+            )
+            SELECT event_id, telegram_id, event_type, payload, attempts + 1, created_at, $2
+            FROM dead
+        """
+        await self.db.execute(query, event_id, error, conn=conn)
+
+    async def count_pending(self) -> int:
+        """Events not yet delivered, e.g. for monitoring dispatcher lag"""
+        async with self.db.transaction() as conn:
+            return await self.db.fetch_val("SELECT COUNT(*) FROM outbox", conn=conn)
@@ -0,0 +1,99 @@
+import asyncio
+from dataclasses import dataclass, field
+from types import MappingProxyType
+from typing import Mapping, Optional, Tuple
+from models import Plan, ExtraTrafficPlan
+from database.manager import DatabaseManager
+from database.statements import columns
+from config.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+@dataclass(frozen=True)
+class _CatalogIndexes:
+    plans_by_price: Tuple[Plan, ...] = ()
+    plans_by_id: Mapping[int, Plan] = field(default_factory=lambda: MappingProxyType({}))
+    plans_by_name: Mapping[str, Plan] = field(default_factory=lambda: MappingProxyType({}))
+    extra_plans_by_price: Tuple[ExtraTrafficPlan, ...] = ()
+    extra_plans_by_id: Mapping[int, ExtraTrafficPlan] = field(default_factory=lambda: MappingProxyType({}))
+
+class PlanCatalog:
+    """
+    In-memory plan catalog.
+    Plans are loaded once and the indexes are swapped as a whole whenever
+    Postgres sends NOTIFY on CHANNEL, so lookups never touch the database.
+    """
+
+    CHANNEL = "plans_changed"
+
+    STATEMENTS = {
+        "plans.get_all": f"SELECT {columns(Plan)} FROM plans ORDER BY price_toman ASC",
+        "extra_traffic_plans.get_all": f"""
+            SELECT {columns(ExtraTrafficPlan)} FROM extra_traffic_plans ORDER BY price_toman ASC
+        """,
+    }
+
+    def __init__(self, db: DatabaseManager):
+        self.db = db
+        self.db.statements.register_many(self.STATEMENTS)
+        self._indexes = _CatalogIndexes()
+        self._refresh_lock = asyncio.Lock()
+        self._refresh_pending = False
+
+    async def start(self) -> None:
+        """Load the catalog and subscribe to change notifications"""
+        # Subscribe first so a change racing the initial load isn't missed
+        await self.db.listen(self.CHANNEL, self._on_plans_changed)
+        await self.refresh()
+
+    async def refresh(self) -> None:
+        """Reload plans and swap the indexes"""
+        # A replica may not have replayed the change a NOTIFY announced yet
+        with self.db.primary():
+            plans = tuple(await self.db.fetch_models("plans.get_all", Plan))
+            extra_plans = tuple(
+                await self.db.fetch_models("extra_traffic_plans.get_all", ExtraTrafficPlan)
+            )
+
+        self._indexes = _CatalogIndexes(
+            plans_by_price=plans,
+            plans_by_id=MappingProxyType({plan.plan_id: plan for plan in plans}),
+            plans_by_name=MappingProxyType({plan.name: plan for plan in plans}),
+            extra_plans_by_price=extra_plans,
+            extra_plans_by_id=MappingProxyType(
+                {plan.extra_traffic_plan_id: plan for plan in extra_plans}
+            ),
+        )
+        logger.info(f"Plan catalog loaded: {len(plans)} plans, {len(extra_plans)} extra traffic plans")
+
+    async def _on_plans_changed(self, payload: Optional[str]) -> None:
+        # Coalesce bursts of notifications into a single reload
+        if self._refresh_lock.locked():
+            self._refresh_pending = True
+            return
+
+        async with self._refresh_lock:
+            self._refresh_pending = True
+            while self._refresh_pending:
+                self._refresh_pending = False
+                try:
+                    await self.refresh()
+                except Exception as e:
+                    logger.error(f"Failed to refresh plan catalog: {e}")
+
+    def get_all_plans(self) -> Tuple[Plan, ...]:
+        """Get all plans sorted by price"""
+        return self._indexes.plans_by_price
+
+    def get_plan_by_id(self, plan_id: int) -> Optional[Plan]:
+        return self._indexes.plans_by_id.get(plan_id)
+
+    def get_plan_by_name(self, name: str) -> Optional[Plan]:
+        return self._indexes.plans_by_name.get(name)
+
+    def get_all_extra_traffic_plans(self) -> Tuple[ExtraTrafficPlan, ...]:
+        """Get all extra traffic plans sorted by price"""
+        return self._indexes.extra_plans_by_price
+
+    def get_extra_traffic_plan_by_id(self, extra_traffic_plan_id: int) -> Optional[ExtraTrafficPlan]:
+        return self._indexes.extra_plans_by_id.get(extra_traffic_plan_id)
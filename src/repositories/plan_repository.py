@@ -1,31 +1,59 @@
 from typing import List
 from models import Plan
 from database.manager import DatabaseManager
+from database.statements import columns
+from cache import Cache, CachedRepositoryMixin
+from repositories.single_flight import SingleFlight
 from typing import Optional, Dict, Any
 
-class PlanRepository:
-    """Plan database operations"""
+class PlanRepository(CachedRepositoryMixin):
+    """
+    Plan database operations.
+    With a cache, start() subscribes to the plans_changed notification so
+    the cached plan list is dropped whenever plans are edited.
+    """
+
+    CHANNEL = "plans_changed"
+
+    CACHE_MODELS = {"plans": Plan}
+
+    STATEMENTS = {
+        "plans.get_all": f"SELECT {columns(Plan)} FROM plans ORDER BY price_toman ASC",
+        "plans.get_by_id": f"SELECT {columns(Plan)} FROM plans WHERE plan_id = $1",
+        "plans.get_by_name": f"SELECT {columns(Plan)} FROM plans WHERE name = $1",
+    }
     
-    def __init__(self, db: DatabaseManager):
+    def __init__(self, db: DatabaseManager, cache: Optional[Cache] = None):
         self.db = db
+        self.cache = cache
+        if cache is not None:
+            cache.register_many(self.CACHE_MODELS)
+        self.db.statements.register_many(self.STATEMENTS)
+        self._flight = SingleFlight()
+
+    async def start(self) -> None:
+        """Invalidate cached plans on every change notification"""
+        if self.cache is not None:
+            await self.db.listen(self.CHANNEL, self._on_plans_changed)
+
+    async def _on_plans_changed(self, payload: Optional[str]) -> None:
+        # Also on listener reconnects (payload None), a change may have been missed
+        await self._invalidate("plans", "all")
     
     def _row_to_model(self, row: Dict[str, Any]) -> Plan:
         return Plan(**row)
     
     async def get_all_plans(self) -> List[Plan]:
         """Get all available plans"""
-        query = "SELECT * FROM plans ORDER BY price_toman ASC"
-        rows = await self.db.fetch_all(query)
-        return [self._row_to_model(row) for row in rows]
+        return await self._cached(
+            "plans", "all",
+            lambda: self._flight.do("all", lambda: self.db.fetch_models("plans.get_all", Plan))
+        )
     
     async def get_plan_by_id(self, plan_id: int) -> Optional[Plan]:
         """Get plan by ID"""
-        query = "SELECT * FROM plans WHERE plan_id = $1"
-        row = await self.db.fetch_one(query, plan_id)
-        return self._row_to_model(row) if row else None
+        return await self.db.fetch_model("plans.get_by_id", Plan, plan_id)
     
     async def get_plan_by_name(self, name: str) -> Optional[Plan]:
         """Get plan by name"""
-        query = "SELECT * FROM plans WHERE name = $1"
-        row = await self.db.fetch_one(query, name)
-        return self._row_to_model(row) if row else None
+        return await self.db.fetch_model("plans.get_by_name", Plan, name)
@@ -0,0 +1,30 @@
+from models import Purchase
+from database.manager import DatabaseManager
+from typing import Dict, Any
+
+class PurchaseRepository:
+    """Purchase database operations"""
+
+    def __init__(self, db: DatabaseManager):
+        self.db = db
+
+    def _row_to_model(self, row: Dict[str, Any]) -> Purchase:
+        return Purchase(**row)
+
+    async def create_purchase(
+            self,
+            telegram_id: int,
+            transaction_id: int,
+            price_toman: int,
+            conn=None
+    ) -> Purchase:
+        """Record purchase of a completed transaction"""
+        query = """
+            INSERT INTO purchases (telegram_id, transaction_id, price_toman)
+            VALUES ($1, $2, $3)
+            RETURNING *
+        """
+        row = await self.db.fetch_one(
+            query, telegram_id, transaction_id, price_toman, conn=conn
+        )
+        return self._row_to_model(row)
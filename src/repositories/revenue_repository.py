@@ -0,0 +1,96 @@
+from models import RevenueRollup
+from database.manager import DatabaseManager
+from datetime import date
+from typing import Dict, Any, Optional, List
+
+class RevenueRepository:
+    """
+    Dashboard reads of the revenue_daily rollups maintained by the
+    rollup_revenue trigger. Ranges are [day_from, day_to); every query sums
+    the per-row shards and touches at most one row per day, type, plan and
+    shard instead of the transactions behind them.
+    """
+
+    DAILY_QUERY = """
+        SELECT day, transaction_type, plan_id,
+            SUM(purchases)::bigint AS purchases,
+            SUM(revenue_toman)::bigint AS revenue_toman,
+            SUM(traffic_bytes)::bigint AS traffic_bytes
+        FROM revenue_daily
+        WHERE day >= $1 AND day < $2
+        AND ($3::text IS NULL OR transaction_type = $3)
+        GROUP BY day, transaction_type, plan_id
+        HAVING SUM(purchases) <> 0
+        ORDER BY day, transaction_type, plan_id
+    """
+
+    def __init__(self, db: DatabaseManager):
+        self.db = db
+
+    def _row_to_model(self, row: Dict[str, Any]) -> RevenueRollup:
+        return RevenueRollup(**row)
+
+    async def get_daily(
+            self,
+            day_from: date,
+            day_to: date,
+            transaction_type: Optional[str] = None
+    ) -> List[RevenueRollup]:
+        """Purchases, revenue and traffic sold per day and plan"""
+        rows = await self.db.fetch_all(self.DAILY_QUERY, day_from, day_to, transaction_type)
+        return [self._row_to_model(row) for row in rows]
+
+    async def get_by_plan(self, day_from: date, day_to: date) -> List[RevenueRollup]:
+        """Totals per plan over the range, best selling first"""
+        query = """
+            SELECT NULL::date AS day, transaction_type, plan_id,
+                SUM(purchases)::bigint AS purchases,
+                SUM(revenue_toman)::bigint AS revenue_toman,
+                SUM(traffic_bytes)::bigint AS traffic_bytes
+            FROM revenue_daily
+            WHERE day >= $1 AND day < $2
+            GROUP BY transaction_type, plan_id
+            HAVING SUM(purchases) <> 0
+            ORDER BY revenue_toman DESC
+        """
+        rows = await self.db.fetch_all(query, day_from, day_to)
+        return [self._row_to_model(row) for row in rows]
+
+    async def get_totals_by_day(
+            self,
+            day_from: date,
+            day_to: date,
+            transaction_type: Optional[str] = None
+    ) -> List[RevenueRollup]:
+        """Totals per day over all plans, e.g. for a revenue chart"""
+        query = """
+            SELECT day, $3::text AS transaction_type, NULL::int AS plan_id,
+                SUM(purchases)::bigint AS purchases,
+                SUM(revenue_toman)::bigint AS revenue_toman,
+                SUM(traffic_bytes)::bigint AS traffic_bytes
+            FROM revenue_daily
+            WHERE day >= $1 AND day < $2
+            AND ($3::text IS NULL OR transaction_type = $3)
+            GROUP BY day
+            ORDER BY day
+        """
+        rows = await self.db.fetch_all(query, day_from, day_to, transaction_type)
+        return [self._row_to_model(row) for row in rows]
+
+    async def get_total(
+            self,
+            day_from: date,
+            day_to: date,
+            transaction_type: Optional[str] = None
+    ) -> RevenueRollup:
+        """Totals over the whole range"""
+        query = """
+            SELECT NULL::date AS day, $3::text AS transaction_type, NULL::int AS plan_id,
+                COALESCE(SUM(purchases), 0)::bigint AS purchases,
+                COALESCE(SUM(revenue_toman), 0)::bigint AS revenue_toman,
+                COALESCE(SUM(traffic_bytes), 0)::bigint AS traffic_bytes
+            FROM revenue_daily
+            WHERE day >= $1 AND day < $2
+            AND ($3::text IS NULL OR transaction_type = $3)
+        """
+        return self._row_to_model(await self.db.fetch_one(query, day_from, day_to, transaction_type))
@@ -0,0 +1,93 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Generic, Hashable, List, Optional, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls for the same key into one in-flight call.
+    Every caller awaiting the key gets the same result (or exception);
+    a cancelled caller doesn't cancel the shared call.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+
+    async def do(self, key: Hashable, call: Callable[[], Awaitable[V]]) -> V:
+        future = self._inflight.get(key)
+        if future is None:
+            future = asyncio.ensure_future(call())
+            self._inflight[key] = future
+            future.add_done_callback(lambda done: self._forget(key, done))
+        return await asyncio.shield(future)
+
+    def _forget(self, key: Hashable, future: asyncio.Future) -> None:
+        if self._inflight.get(key) is future:
+            del self._inflight[key]
+        if not future.cancelled():
+            # Mark as retrieved even if every caller was cancelled
+            future.exception()
+
+class BatchLoader(Generic[K, V]):
+    """
+    DataLoader-style micro-batching.
+    Distinct keys requested within window seconds are loaded with a single
+    batch_call(keys) -> {key: value}; keys missing from the result resolve to None.
+    """
+
+    def __init__(
+            self,
+            batch_call: Callable[[List[K]], Awaitable[Dict[K, V]]],
+            window: float = 0.002,
+            max_batch_size: int = 1000
+    ):
+        self.batch_call = batch_call
+        self.window = window
+        self.max_batch_size = max_batch_size
+        self._pending: Dict[K, asyncio.Future] = {}
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._running: set = set()
+
+    async def load(self, key: K) -> Optional[V]:
+        future = self._pending.get(key)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = loop.create_future()
+            self._pending[key] = future
+            if len(self._pending) >= self.max_batch_size:
+                self._dispatch()
+            elif self._timer is None:
+                self._timer = loop.call_later(self.window, self._dispatch)
+        return await asyncio.shield(future)
+
+    def _dispatch(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, {}
+        if batch:
+            task = asyncio.ensure_future(self._run(batch))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+    async def _run(self, batch: Dict[K, asyncio.Future]) -> None:
+        try:
+            results = await self.batch_call(list(batch.keys()))
+        except Exception as e:
+            for future in batch.values():
+                if not future.done():
+                    future.set_exception(e)
+                    # Mark as retrieved even if every caller was cancelled
+                    future.exception()
+            return
+        except BaseException:
+            # Cancelled, e.g. on loop shutdown: don't leave callers waiting forever
+            for future in batch.values():
+                if not future.done():
+                    future.cancel()
+            raise
+
+        for key, future in batch.items():
+            if not future.done():
+                future.set_result(results.get(key))
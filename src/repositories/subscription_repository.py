@@ -1,13 +1,54 @@
-from models import Subscription, FreeSubscription
+from models import Subscription, FreeSubscription, SubscriptionBatch
 from datetime import datetime, timedelta, time
-from typing import Optional, Tuple, Dict, Any
+from typing import Optional, Tuple, Dict, Any, List, Sequence, AsyncIterator
 from database.manager import DatabaseManager
+from database.statements import columns
+from repositories.single_flight import SingleFlight, BatchLoader
+from repositories.outbox_repository import OutboxRepository, SUBSCRIPTION_CREATED, SUBSCRIPTION_TRAFFIC_ADDED
 
 class SubscriptionRepository:
     """Subscription database operations"""
 
-    def __init__(self, db: DatabaseManager):
+    STATEMENTS = {
+        "subscriptions.get_active_paid": f"""
+            SELECT {columns(Subscription)} FROM subscriptions 
+            WHERE telegram_id = $1 
+            AND is_active = TRUE 
+            AND expires_at > NOW()
+            ORDER BY expires_at DESC
+            LIMIT 1
+        """,
+        "subscriptions.get_free": f"""
+            SELECT {columns(FreeSubscription)} FROM free_subscriptions
+            WHERE telegram_id = $1
+            AND expires_at > NOW()
+            ORDER BY expires_at DESC
+            LIMIT 1
+        """,
+    }
+
+    DEACTIVATE_QUERY = "UPDATE subscriptions SET is_active = FALSE WHERE telegram_id = $1 AND is_active = TRUE"
+
+    ACTIVE_PAID_FOR_QUERY = """
+        SELECT DISTINCT ON (telegram_id) * FROM subscriptions
+        WHERE telegram_id = ANY($1::bigint[])
+        AND is_active = TRUE
+        AND expires_at > NOW()
+        ORDER BY telegram_id, expires_at DESC
+    """
+
+    def __init__(self, db: DatabaseManager, batch_window: Optional[float] = None):
+        """
+        Concurrent identical lookups always share one query; with batch_window
+        (seconds) distinct telegram_ids are also gathered into one ANY() query.
+        """
         self.db = db
+        self.db.statements.register_many(self.STATEMENTS)
+        self.outbox = OutboxRepository(db)
+        self._flight = SingleFlight()
+        self._active_loader = None
+        if batch_window is not None:
+            self._active_loader = BatchLoader(self.get_active_paid_subscriptions_for, batch_window)
 
     def _row_to_model(self, row: Dict[str, Any]) -> Subscription:
         return Subscription(**row)
@@ -20,60 +61,141 @@ class SubscriptionRepository:
             telegram_id: int,
             purchase_id: int,
             traffic_limit_bytes: int,
-            duration_days: int
+            duration_days: int,
+            conn=None
     ) -> Subscription:
         """
         Create new paid subscription.
         Deavtivate old subscription if it's existed.
+        Runs inside the caller's transaction when conn is given, together
+        with its subscription.created outbox event.
+        """
+        if conn is None:
+            async with self.db.transaction() as conn:
+                return await self.creat_subscription(
+                    telegram_id, purchase_id, traffic_limit_bytes, duration_days, conn=conn
+                )
+
+        await self.db.execute(self.DEACTIVATE_QUERY, telegram_id, conn=conn)
+
+        query = """
+            INSERT INTO subscriptions (
+                telegram_id, purchase_id, traffic_limit_bytes,
+                expires_at)
+            VALUES ($1, $2, $3, NOW() + INTERVAL '1 day' * $4)
+            RETURNING *
         """
-        async with self.db.transaction() as conn:
-            await conn.execute("UPDATE subscriptions SET is_active = FALSE WHERE telegram_id = $1",
-            telegram_id, conn=conn)
-            
-            query = """
-                INSERT INTO subscription (
-                    telegram_id, purchase_id, traffic_limit_bytes,
-                    expires_at)
-                VALUES ($1, $2, $3, NOW() + INTERVAL '1 day' * $4)
-                RETURNING *
-            """
-            row = await conn.fetch_one(
-                query, telegram_id, purchase_id,
-                traffic_limit_bytes, duration_days,
-                conn=conn
-            )
-            return self._row_to_model(row)
+        row = await self.db.fetch_one(
+            query, telegram_id, purchase_id,
+            traffic_limit_bytes, duration_days,
+            conn=conn
+        )
+        subscription = self._row_to_model(row)
+        await self.outbox.add(
+            telegram_id,
+            SUBSCRIPTION_CREATED,
+            {
+                "subscription_id": subscription.id,
+                "purchase_id": purchase_id,
+                "traffic_limit_bytes": subscription.traffic_limit_bytes,
+                "expires_at": subscription.expires_at,
+            },
+            conn
+        )
+        return subscription
     
     async def get_active_paid_subscription(
         self, 
         telegram_id: int
     ) -> Optional[Subscription]:
         """Get user's active paid subscription"""
-        query = """
-            SELECT * FROM subscriptions 
-            WHERE telegram_id = $1 
-            AND is_active = TRUE 
-            AND expires_at > NOW()
-            ORDER BY expires_at DESC
-            LIMIT 1
-        """
-        row = await self.db.fetch_one(query, telegram_id)
-        return self._row_to_model(row) if row else None
+        if self._active_loader is not None:
+            return await self._active_loader.load(telegram_id)
+        return await self._flight.do(
+            telegram_id,
+            lambda: self.db.fetch_model("subscriptions.get_active_paid", Subscription, telegram_id)
+        )
     
+    async def get_free_subscription(self, telegram_id: int) -> Optional[FreeSubscription]:
+        """Get user's unexpired free subscription"""
+        return await self._flight.do(
+            ("free", telegram_id),
+            lambda: self.db.fetch_model("subscriptions.get_free", FreeSubscription, telegram_id)
+        )
+
+    async def get_active_paid_subscriptions_for(
+        self,
+        telegram_ids: Sequence[int]
+    ) -> Dict[int, Subscription]:
+        """Get active paid subscriptions of many users keyed by telegram_id"""
+        rows = await self.db.fetch_all(self.ACTIVE_PAID_FOR_QUERY, list(telegram_ids))
+        return {row["telegram_id"]: self._row_to_model(row) for row in rows}
+
     async def add_extra_traffic(
         self,
         telegram_id: int,
-        extra_traffic_bytes: int
+        extra_traffic_bytes: int,
+        conn=None
     ) -> Optional[Subscription]:
-        """Add extra traffic to paid subscription"""
+        """
+        Add extra traffic to paid subscription.
+        Falls back to the latest unexpired subscription and reactivates it, as
+        the expiry sweeper deactivates subscriptions that ran out of traffic.
+        Runs inside the caller's transaction when conn is given, together
+        with its subscription.traffic_added outbox event.
+        """
+        if conn is None:
+            async with self.db.transaction() as conn:
+                return await self.add_extra_traffic(telegram_id, extra_traffic_bytes, conn=conn)
+
         query = """
-            UPDATE subscriptions
-            SET traffic_limit_bytes = traffic_limit_bytes + $2
-            WHERE telegram_id = $1
-            AND is_active = TRUE
-            AND expires_at > NOW()
-            RETURNING *
+            UPDATE subscriptions s
+            SET traffic_limit_bytes = s.traffic_limit_bytes + $2,
+                is_active = TRUE
+            FROM (
+                SELECT id FROM subscriptions
+                WHERE telegram_id = $1
+                AND expires_at > NOW()
+                ORDER BY is_active DESC, expires_at DESC
+                LIMIT 1
+                FOR UPDATE
+            ) latest
+            WHERE s.id = latest.id
+            RETURNING s.*
         """
-        row = await self.db.fetch_one(query, telegram_id, extra_traffic_bytes)
-        return self._row_to_model(row) if row else None
-    
+        row = await self.db.fetch_one(query, telegram_id, extra_traffic_bytes, conn=conn)
+        if row is None:
+            return None
+        subscription = self._row_to_model(row)
+        await self.outbox.add(
+            telegram_id,
+            SUBSCRIPTION_TRAFFIC_ADDED,
+            {
+                "subscription_id": subscription.id,
+                "extra_traffic_bytes": extra_traffic_bytes,
+                "traffic_limit_bytes": subscription.traffic_limit_bytes,
+            },
+            conn
+        )
+        return subscription
+
+    async def get_active_subscriptions_batch(self) -> SubscriptionBatch:
+        """Get all active paid subscriptions as a columnar batch for reports"""
+        query = f"""
+            SELECT {columns(Subscription)} FROM subscriptions
+            WHERE is_active = TRUE
+            ORDER BY id
+        """
+        return await self.db.fetch_batch(query, SubscriptionBatch)
+
+    def iter_active_subscriptions(
+        self,
+        batch_size: int = 1000
+    ) -> AsyncIterator[Subscription]:
+        """Stream all active paid subscriptions, e.g. to recompute usage"""
+        query = f"""
+            SELECT {columns(Subscription)} FROM subscriptions
+            WHERE is_active = TRUE
+            ORDER BY id
+        """
+        return self.db.stream(query, batch_size=batch_size, model=Subscription)
@@ -0,0 +1,150 @@
+import asyncio
+from itertools import islice
+from typing import Dict, Optional
+from database.manager import DatabaseManager
+from config.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+class TrafficAccumulator:
+    """
+    Write-behind accounting for subscription traffic usage.
+    Usage reports are coalesced per telegram_id in memory and flushed
+    as one set-based UPDATE on a timer or when enough users are pending.
+    The deltas are then appended to the traffic_usage history in a separate
+    statement, so a failing history insert (e.g. a partition problem) never
+    stops usage accounting; history that couldn't be written is retried
+    with the next flush, for at most max_pending_history users (the oldest
+    are dropped and counted in dropped_history beyond that).
+    """
+
+    # Paid subscription wins; users without one are billed on their free subscription
+    FLUSH_QUERY = """
+        WITH deltas AS (
+            SELECT * FROM unnest($1::bigint[], $2::bigint[]) AS d(telegram_id, used_bytes)
+        ),
+        paid AS (
+            UPDATE subscriptions s
+            SET traffic_used_bytes = s.traffic_used_bytes + d.used_bytes
+            FROM deltas d
+            WHERE s.telegram_id = d.telegram_id
+            AND s.is_active = TRUE
+            AND s.expires_at > NOW()
+            RETURNING s.telegram_id
+        )
+        UPDATE free_subscriptions f
+        SET traffic_used_bytes = f.traffic_used_bytes + d.used_bytes
+        FROM deltas d
+        WHERE f.telegram_id = d.telegram_id
+        AND f.expires_at > NOW()
+        AND d.telegram_id NOT IN (SELECT telegram_id FROM paid)
+    """
+
+    HISTORY_QUERY = """
+        INSERT INTO traffic_usage (telegram_id, used_bytes)
+        SELECT * FROM unnest($1::bigint[], $2::bigint[])
+    """
+
+    def __init__(
+            self,
+            db: DatabaseManager,
+            flush_interval: float = 5.0,
+            max_pending: int = 10_000,
+            max_pending_history: int = 100_000
+    ):
+        self.db = db
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.max_pending_history = max_pending_history
+        self.dropped_history = 0
+        self._pending: Dict[int, int] = {}
+        # Flushed to subscriptions but not yet to traffic_usage
+        self._pending_history: Dict[int, int] = {}
+        self._flush_lock = asyncio.Lock()
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self.db.add_shutdown_hook(self.stop)
+
+    @property
+    def pending_users(self) -> int:
+        return len(self._pending)
+
+    def record(self, telegram_id: int, used_bytes: int) -> None:
+        """Add a usage delta for user"""
+        if used_bytes <= 0:
+            return
+        self._pending[telegram_id] = self._pending.get(telegram_id, 0) + used_bytes
+        if len(self._pending) >= self.max_pending:
+            self._wakeup.set()
+
+    async def flush(self) -> int:
+        """Write pending deltas to the database, return number of users flushed"""
+        async with self._flush_lock:
+            # History left over from a failed flush is retried even when no
+            # new usage came in, stop() included
+            if not self._pending and not self._pending_history:
+                return 0
+
+            batch, self._pending = self._pending, {}
+            if batch:
+                try:
+                    await self.db.execute(
+                        self.FLUSH_QUERY, list(batch.keys()), list(batch.values())
+                    )
+                except Exception as e:
+                    # Put the deltas back so they are retried on the next flush
+                    for telegram_id, used_bytes in batch.items():
+                        self._pending[telegram_id] = self._pending.get(telegram_id, 0) + used_bytes
+                    logger.error(f"Failed to flush traffic usage for {len(batch)} users: {e}")
+                    raise
+
+            history, self._pending_history = self._pending_history, {}
+            for telegram_id, used_bytes in batch.items():
+                history[telegram_id] = history.get(telegram_id, 0) + used_bytes
+            try:
+                await self.db.execute(
+                    self.HISTORY_QUERY, list(history.keys()), list(history.values())
+                )
+            except Exception as e:
+                logger.error(f"Failed to record traffic usage history for {len(history)} users: {e}")
+                self._keep_history(history)
+            return len(batch)
+
+    def _keep_history(self, history: Dict[int, int]) -> None:
+        """Keep unwritten history for the next flush, oldest users beyond max_pending_history dropped"""
+        excess = len(history) - self.max_pending_history
+        if excess > 0:
+            for telegram_id in list(islice(history, excess)):
+                del history[telegram_id]
+            self.dropped_history += excess
+            logger.warning(f"Traffic usage history buffer full, dropped {excess} users")
+        self._pending_history = history
+
+    async def start(self) -> None:
+        """Start periodic flushing"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop periodic flushing and write everything still pending"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except Exception:
+                # Already logged, deltas are kept for the next round
+                pass
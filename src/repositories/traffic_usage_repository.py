@@ -0,0 +1,51 @@
+from models import TrafficUsage
+from database.manager import DatabaseManager
+from database.statements import columns
+from datetime import datetime
+from typing import Dict, Any, Optional, List
+
+class TrafficUsageRepository:
+    """
+    Reads of the append-only traffic_usage history written by TrafficAccumulator.
+    The table is partitioned by month on recorded_at, every query takes a
+    lower bound so only the partitions in range are scanned.
+    """
+
+    USAGE_QUERY = f"""
+        SELECT {columns(TrafficUsage)} FROM traffic_usage
+        WHERE telegram_id = $1
+        AND recorded_at >= $2
+        AND recorded_at < COALESCE($3::timestamp, 'infinity')
+        ORDER BY recorded_at
+    """
+
+    def __init__(self, db: DatabaseManager):
+        self.db = db
+
+    def _row_to_model(self, row: Dict[str, Any]) -> TrafficUsage:
+        return TrafficUsage(**row)
+
+    async def get_usage(
+            self,
+            telegram_id: int,
+            since: datetime,
+            until: Optional[datetime] = None
+    ) -> List[TrafficUsage]:
+        """Usage records of user in [since, until), oldest first"""
+        rows = await self.db.fetch_all(self.USAGE_QUERY, telegram_id, since, until)
+        return [self._row_to_model(row) for row in rows]
+
+    async def get_total_usage(
+            self,
+            telegram_id: int,
+            since: datetime,
+            until: Optional[datetime] = None
+    ) -> int:
+        """Bytes used by user in [since, until)"""
+        query = """
+            SELECT COALESCE(SUM(used_bytes), 0) FROM traffic_usage
+            WHERE telegram_id = $1
+            AND recorded_at >= $2
+            AND recorded_at < COALESCE($3::timestamp, 'infinity')
+        """
+        return await self.db.fetch_val(query, telegram_id, since, until)
@@ -1,12 +1,48 @@
-from models import Transaction
+from models import Transaction, TransactionBatch
 from database.manager import DatabaseManager
-from typing import Dict, Any, Optional, List
+from database.statements import columns
+from repositories.outbox_repository import OutboxRepository, TRANSACTION_COMPLETED
+from datetime import datetime, timedelta
+from typing import Dict, Any, Optional, List, Sequence, Tuple, AsyncIterator
 
 class TransactionRepository:
-    """Transaction database operations"""
+    """
+    Transaction database operations.
+    transactions is partitioned by month on created_at, so lookups take a
+    created_at bound wherever one is known to scan only matching partitions.
+    Pending transactions are only looked for within pending_window, Zarinpal
+    authorities are long expired after that.
+    """
 
-    def __init__(self, db: DatabaseManager):
+    GET_BY_AUTHORITY_QUERY = "SELECT * FROM transactions WHERE authority = $1 AND created_at >= $2"
+
+    SETTLE_QUERY = """
+        UPDATE transactions
+        SET status = $2, ref_id = $3
+        WHERE authority = $1
+        AND status = 'pending'
+        AND created_at >= NOW() - $4::interval
+        RETURNING *
+    """
+
+    USER_TRANSACTIONS_QUERY = """
+        SELECT * FROM transactions
+        WHERE telegram_id = $1
+        ORDER BY created_at DESC
+        LIMIT $2
+    """
+
+    BETWEEN_QUERY = f"""
+        SELECT {columns(Transaction)} FROM transactions
+        WHERE created_at >= $1
+        AND created_at < $2
+        ORDER BY created_at
+    """
+
+    def __init__(self, db: DatabaseManager, pending_window: timedelta = timedelta(days=1)):
         self.db = db
+        self.pending_window = pending_window
+        self.outbox = OutboxRepository(db)
 
     def _row_to_model(self, row: Dict[str, Any]) -> Transaction:
         return Transaction(**row)
@@ -34,53 +70,180 @@ class TransactionRepository:
         )
         return self._row_to_model(row)
     
-    async def get_by_authority(self, authority: str) -> Optional[Transaction]:
-        """Get transaction by authority code"""
-        query = "SELECT * FROM transactions WHERE authority = $1"
-        row = await self.db.fetch_one(query, authority)
-        return self._row_to_model(row) if row else None        
+    async def create_transactions_many(
+            self,
+            transactions: Sequence[Tuple[int, str, int, str, Optional[int], Optional[int]]]
+    ) -> int:
+        """
+        Bulk insert pending transactions with COPY.
+        Each item is (telegram_id, transaction_type, price_toman, authority,
+        plan_id, extra_traffic_plan_id). Returns number of rows inserted.
+        """
+        if not transactions:
+            return 0
+        result = await self.db.copy_records(
+            "transactions",
+            transactions,
+            columns=(
+                "telegram_id", "transaction_type", "price_toman",
+                "authority", "plan_id", "extra_traffic_plan_id"
+            )
+        )
+        return int(result.split()[-1])
+
+    async def get_by_authority(
+            self,
+            authority: str,
+            created_after: Optional[datetime] = None
+    ) -> Optional[Transaction]:
+        """Get transaction by authority code, created_after limits the partitions searched"""
+        if created_after is None:
+            query = "SELECT * FROM transactions WHERE authority = $1"
+            row = await self.db.fetch_one(query, authority)
+        else:
+            row = await self.db.fetch_one(self.GET_BY_AUTHORITY_QUERY, authority, created_after)
+        return self._row_to_model(row) if row else None
     
+    async def get_pending_by_authorities(
+            self,
+            authorities: Sequence[str]
+    ) -> List[Transaction]:
+        """Get pending transactions for many authority codes"""
+        query = """
+            SELECT * FROM transactions
+            WHERE authority = ANY($1::text[])
+            AND status = 'pending'
+            AND created_at >= NOW() - $2::interval
+        """
+        rows = await self.db.fetch_all(query, list(authorities), self.pending_window)
+        return [self._row_to_model(row) for row in rows]
+
+    async def settle(
+            self,
+            authority: str,
+            status: str,
+            ref_id: int = 0,
+            conn=None
+    ) -> Optional[Transaction]:
+        """
+        Move pending transaction to its final status.
+        Returns None when it was already settled, which makes callbacks idempotent.
+        Completing also adds a transaction.completed outbox event, in the
+        caller's transaction when conn is given.
+        """
+        if conn is None and status == "completed":
+            async with self.db.transaction() as conn:
+                return await self.settle(authority, status, ref_id, conn=conn)
+
+        row = await self.db.fetch_one(
+            self.SETTLE_QUERY, authority, status, ref_id, self.pending_window, conn=conn
+        )
+        if row is None:
+            return None
+        transaction = self._row_to_model(row)
+        if status == "completed":
+            await self.outbox.add(
+                transaction.telegram_id,
+                TRANSACTION_COMPLETED,
+                {
+                    "transaction_id": transaction.transaction_id,
+                    "transaction_type": transaction.transaction_type,
+                    "plan_id": transaction.plan_id,
+                    "extra_traffic_plan_id": transaction.extra_traffic_plan_id,
+                    "price_toman": transaction.price_toman,
+                    "ref_id": transaction.ref_id,
+                },
+                conn
+            )
+        return transaction
+
     async def update_status(
         self, 
         transaction_id: int, 
-        status: str
+        status: str,
+        created_at: Optional[datetime] = None
     ) -> Optional[Transaction]:
-        """Update transaction status"""
-        query = """
-            UPDATE transactions 
-            SET status = $1 
-            WHERE transaction_id = $2
-            RETURNING *
-        """
-        row = await self.db.fetch_one(query, status, transaction_id)
+        """Update transaction status, created_at (from the model) pins the partition"""
+        if created_at is None:
+            query = """
+                UPDATE transactions 
+                SET status = $1 
+                WHERE transaction_id = $2
+                RETURNING *
+            """
+            row = await self.db.fetch_one(query, status, transaction_id)
+        else:
+            query = """
+                UPDATE transactions
+                SET status = $1
+                WHERE transaction_id = $2
+                AND created_at = $3
+                RETURNING *
+            """
+            row = await self.db.fetch_one(query, status, transaction_id, created_at)
         return self._row_to_model(row) if row else None
     
     async def update_ref_id(
         self, 
         transaction_id: int, 
-        ref_id: int
+        ref_id: int,
+        created_at: Optional[datetime] = None
     ) -> Optional[Transaction]:
-        """Update transaction ref_id"""
-        query = """
-            UPDATE transactions 
-            SET ref_id = $1 
-            WHERE transaction_id = $2
-            RETURNING *
-        """
-        row = await self.db.fetch_one(query, ref_id, transaction_id)
+        """Update transaction ref_id, created_at (from the model) pins the partition"""
+        if created_at is None:
+            query = """
+                UPDATE transactions 
+                SET ref_id = $1 
+                WHERE transaction_id = $2
+                RETURNING *
+            """
+            row = await self.db.fetch_one(query, ref_id, transaction_id)
+        else:
+            query = """
+                UPDATE transactions
+                SET ref_id = $1
+                WHERE transaction_id = $2
+                AND created_at = $3
+                RETURNING *
+            """
+            row = await self.db.fetch_one(query, ref_id, transaction_id, created_at)
         return self._row_to_model(row) if row else None
     
     async def get_user_transactions(
         self, 
         telegram_id: int,
-        limit: int = 10
+        limit: int = 10,
+        since: Optional[datetime] = None
     ) -> List[Transaction]:
-        """Get user's transaction history"""
-        query = """
-            SELECT * FROM transactions 
-            WHERE telegram_id = $1 
-            ORDER BY created_at DESC 
-            LIMIT $2
-        """
-        rows = await self.db.fetch_all(query, telegram_id, limit)
-        return [self._row_to_model(row) for row in rows]
\ No newline at end of file
+        """Get user's transaction history, since limits the partitions searched"""
+        if since is None:
+            rows = await self.db.fetch_all(self.USER_TRANSACTIONS_QUERY, telegram_id, limit)
+        else:
+            query = """
+                SELECT * FROM transactions
+                WHERE telegram_id = $1
+                AND created_at >= $3
+                ORDER BY created_at DESC
+                LIMIT $2
+            """
+            rows = await self.db.fetch_all(query, telegram_id, limit, since)
+        return [self._row_to_model(row) for row in rows]
+
+    async def get_transactions_batch(
+        self,
+        created_from: datetime,
+        created_to: datetime
+    ) -> TransactionBatch:
+        """Get transactions created in [created_from, created_to) as a columnar batch"""
+        return await self.db.fetch_batch(self.BETWEEN_QUERY, TransactionBatch, created_from, created_to)
+
+    def iter_transactions_between(
+        self,
+        created_from: datetime,
+        created_to: datetime,
+        batch_size: int = 1000
+    ) -> AsyncIterator[Transaction]:
+        """Stream transactions created in [created_from, created_to), e.g. for exports"""
+        return self.db.stream(
+            self.BETWEEN_QUERY, created_from, created_to, batch_size=batch_size, model=Transaction
+        )
@@ -0,0 +1,112 @@
+from dataclasses import fields
+from typing import Optional, Any
+from models import User, Subscription, FreeSubscription, UserContext
+from database.manager import DatabaseManager
+from database.statements import columns
+from cache import Cache, CachedRepositoryMixin
+
+_USER_END = len(fields(User))
+_SUBSCRIPTION_END = _USER_END + len(fields(Subscription))
+
+
+def _decode(*values: Any) -> UserContext:
+    """One row: user columns, then the paid and the free subscription's (all NULL when absent)"""
+    subscription = values[_USER_END:_SUBSCRIPTION_END]
+    free_subscription = values[_SUBSCRIPTION_END:]
+    return UserContext(
+        User(*values[:_USER_END]),
+        Subscription(*subscription) if subscription[0] is not None else None,
+        FreeSubscription(*free_subscription) if free_subscription[0] is not None else None,
+    )
+
+
+class UserContextLoader(CachedRepositoryMixin):
+    """
+    Per-update user state in one round-trip.
+    Replaces UserRepository.upsert_user + is_banned,
+    SubscriptionRepository.get_active_paid_subscription and
+    get_free_subscription with a single statement on a single connection.
+    """
+
+    CACHE_MODELS = {"users": User}
+
+    STATEMENTS = {
+        # The upsert only runs for new users or a changed profile, an unchanged
+        # one (almost every update) is a plain index read: no row lock, no
+        # dead tuple, no WAL. existing and upserted see the same snapshot, so
+        # account is the written row when there was a write, else the stored one.
+        "user_context.load": f"""
+            WITH existing AS (
+                SELECT {columns(User)} FROM users WHERE telegram_id = $1
+            ),
+            upserted AS (
+                INSERT INTO users (telegram_id, username, first_name, last_name)
+                SELECT $1::bigint, $2::text, $3::text, $4::text
+                WHERE NOT EXISTS (
+                    SELECT 1 FROM existing
+                    WHERE username IS NOT DISTINCT FROM $2::text
+                    AND first_name IS NOT DISTINCT FROM $3::text
+                    AND last_name IS NOT DISTINCT FROM $4::text
+                )
+                ON CONFLICT (telegram_id)
+                DO UPDATE SET
+                    username = EXCLUDED.username,
+                    first_name = EXCLUDED.first_name,
+                    last_name = EXCLUDED.last_name
+                RETURNING {columns(User)}
+            ),
+            account AS (
+                SELECT * FROM upserted
+                UNION ALL
+                SELECT * FROM existing WHERE NOT EXISTS (SELECT 1 FROM upserted)
+            )
+            SELECT
+                {columns(User, "account")},
+                {columns(Subscription, "paid")},
+                {columns(FreeSubscription, "free")}
+            FROM account
+            LEFT JOIN LATERAL (
+                SELECT {columns(Subscription)} FROM subscriptions
+                WHERE telegram_id = $1
+                AND is_active = TRUE
+                AND expires_at > NOW()
+                ORDER BY expires_at DESC
+                LIMIT 1
+            ) paid ON TRUE
+            LEFT JOIN LATERAL (
+                SELECT {columns(FreeSubscription)} FROM free_subscriptions
+                WHERE telegram_id = $1
+                AND expires_at > NOW()
+                ORDER BY expires_at DESC
+                LIMIT 1
+            ) free ON TRUE
+        """,
+    }
+
+    def __init__(self, db: DatabaseManager, cache: Optional[Cache] = None):
+        """
+        With cache (the one given to UserRepository) the loaded user and ban
+        flag are written through, so later get_by_telegram_id/is_banned calls
+        in the same update hit it.
+        """
+        self.db = db
+        self.cache = cache
+        if cache is not None:
+            cache.register_many(self.CACHE_MODELS)
+        self.db.statements.register_many(self.STATEMENTS)
+
+    async def load(
+            self,
+            telegram_id: int,
+            username: Optional[str] = None,
+            first_name: Optional[str] = None,
+            last_name: Optional[str] = None,
+            conn=None
+    ) -> UserContext:
+        """Create or update user and load its ban flag and subscriptions"""
+        context = await self.db.fetch_model(
+            "user_context.load", _decode, telegram_id, username, first_name, last_name, conn=conn
+        )
+        await self._cache_put("users", telegram_id, context.user)
+        await self._cache_put("users.banned", telegram_id, context.user.is_banned)
+        return context
@@ -1,12 +1,61 @@
-from typing import Optional, Any
+from typing import Optional, Any, Dict, List, Sequence, Tuple, AsyncIterator
 from models import User
 from database.manager import DatabaseManager
+from database.statements import columns
+from cache import Cache, CachedRepositoryMixin
+from repositories.single_flight import SingleFlight, BatchLoader
 
-class UserRepository:
+class UserRepository(CachedRepositoryMixin):
     """User database operations"""
 
-    def __init__(self, db: DatabaseManager):
+    STATEMENTS = {
+        "users.upsert": f"""
+            INSERT INTO users (telegram_id, username, first_name, last_name)
+            VALUES ($1, $2, $3, $4)
+            ON CONFLICT (telegram_id) 
+            DO UPDATE SET
+                username = EXCLUDED.username,
+                first_name = EXCLUDED.first_name,
+                last_name = EXCLUDED.last_name
+            RETURNING {columns(User)}
+        """,
+        "users.get_by_telegram_id": f"SELECT {columns(User)} FROM users WHERE telegram_id = $1",
+        "users.is_banned": "SELECT is_banned FROM users WHERE telegram_id = $1",
+        "users.recipients": """
+            SELECT user_id, telegram_id FROM users
+            WHERE user_id > $1
+            AND is_banned = FALSE
+            ORDER BY user_id
+            LIMIT $2
+        """,
+    }
+
+    CACHE_MODELS = {"users": User}
+
+    GET_BY_TELEGRAM_IDS_QUERY = "SELECT * FROM users WHERE telegram_id = ANY($1::bigint[])"
+    GET_BY_USERNAME_QUERY = "SELECT * FROM users WHERE username = $1"
+
+    def __init__(
+            self,
+            db: DatabaseManager,
+            cache: Optional[Cache] = None,
+            batch_window: Optional[float] = None
+    ):
+        """
+        Concurrent identical lookups always share one query; with batch_window
+        (seconds) distinct telegram_ids are also gathered into one ANY() query.
+        """
         self.db = db
+        self.cache = cache
+        if cache is not None:
+            cache.register_many(self.CACHE_MODELS)
+        self.db.statements.register_many(self.STATEMENTS)
+        self._flight = SingleFlight()
+        self._user_loader = None
+        self._ban_loader = None
+        if batch_window is not None:
+            self._user_loader = BatchLoader(self._load_users, batch_window)
+            self._ban_loader = BatchLoader(self._load_ban_flags, batch_window)
 
     def _row_to_model(self, row: dict[str, Any]) -> User:
         return User(**row)
@@ -19,45 +68,122 @@ class UserRepository:
             last_name: Optional[str] = None
     ) -> User:
         """Create or update user"""
+        user = await self.db.fetch_model(
+            "users.upsert", User, telegram_id, username, first_name, last_name
+        )
+        # Write through, this also replaces a negative entry for a new user
+        await self._cache_put("users", telegram_id, user)
+        return user
+    
+    async def upsert_users_many(
+            self,
+            users: Sequence[Tuple[int, Optional[str], Optional[str], Optional[str]]]
+    ) -> List[User]:
+        """
+        Create or update many users in one statement.
+        Each item is (telegram_id, username, first_name, last_name).
+        """
+        # ON CONFLICT can't touch the same row twice, keep the last profile per user
+        latest = {user[0]: user for user in users}
+        if not latest:
+            return []
+
+        telegram_ids, usernames, first_names, last_names = zip(*latest.values())
         query = """
             INSERT INTO users (telegram_id, username, first_name, last_name)
-            VALUES ($1, $2, $3, $4)
-            ON CONFLICT (telegram_id) 
+            SELECT * FROM unnest($1::bigint[], $2::text[], $3::text[], $4::text[])
+            ON CONFLICT (telegram_id)
             DO UPDATE SET
                 username = EXCLUDED.username,
                 first_name = EXCLUDED.first_name,
                 last_name = EXCLUDED.last_name
             RETURNING *
         """
-        row = await self.db.fetch_one(query, telegram_id, username, first_name, last_name)
-        return self._row_to_model(row)
-    
+        rows = await self.db.fetch_all(
+            query, list(telegram_ids), list(usernames), list(first_names), list(last_names)
+        )
+        await self._invalidate("users", *latest.keys())
+        return [self._row_to_model(row) for row in rows]
+
     async def get_by_telegram_id(self, telegram_id: int) -> Optional[User]:
         """Get user by telegram_id"""
-        query = "SELECT * FROM users WHERE telegram_id = $1"
-        row = await self.db.fetch_one(query, telegram_id)
-        return self._row_to_model(row)
+        return await self._cached("users", telegram_id, lambda: self._load_user(telegram_id))
+
+    async def _load_user(self, telegram_id: int) -> Optional[User]:
+        if self._user_loader is not None:
+            return await self._user_loader.load(telegram_id)
+        return await self._flight.do(
+            ("user", telegram_id),
+            lambda: self.db.fetch_model("users.get_by_telegram_id", User, telegram_id)
+        )
+
+    async def _load_users(self, telegram_ids: List[int]) -> Dict[int, User]:
+        return {user.telegram_id: user for user in await self.get_by_telegram_ids(telegram_ids)}
     
+    async def get_by_telegram_ids(self, telegram_ids: Sequence[int]) -> List[User]:
+        """Get users by telegram_ids, unknown ids are skipped"""
+        rows = await self.db.fetch_all(self.GET_BY_TELEGRAM_IDS_QUERY, list(telegram_ids))
+        return [self._row_to_model(row) for row in rows]
+
+    def iter_all_users(self, batch_size: int = 1000) -> AsyncIterator[User]:
+        """Stream all users without loading the table into memory"""
+        query = f"SELECT {columns(User)} FROM users ORDER BY user_id"
+        return self.db.stream(query, batch_size=batch_size, model=User)
+
+    async def get_recipients(self, after_user_id: int, limit: int = 1000) -> List[Tuple[int, int]]:
+        """
+        Next page of non-banned users as (user_id, telegram_id), keyset
+        paginated on the primary key: pass the last user_id of the previous page
+        """
+        return await self.db.fetch_models(
+            "users.recipients", lambda user_id, telegram_id: (user_id, telegram_id), after_user_id, limit
+        )
+
     async def get_by_username(self, username: str) -> Optional[User]:
         """Get user by username"""
-        query = "SELECT * FROM users WHERE username = $1"
-        row = await self.db.fetch_one(query, username)
+        row = await self.db.fetch_one(self.GET_BY_USERNAME_QUERY, username)
         return self._row_to_model(row)
     
     async def is_banned(self, telegram_id: int) -> bool:
         """Check if user is banned"""
-        query = "SELECT is_banned FROM users WHERE telegram_id = $1"
-        result = await self.db.fetch_val(query, telegram_id)
+        return await self._cached("users.banned", telegram_id, lambda: self._load_is_banned(telegram_id))
+
+    async def _load_is_banned(self, telegram_id: int) -> bool:
+        if self._ban_loader is not None:
+            result = await self._ban_loader.load(telegram_id)
+        else:
+            result = await self._flight.do(
+                ("is_banned", telegram_id),
+                lambda: self.db.fetch_prepared_val("users.is_banned", telegram_id)
+            )
         return result if result is not None else False
+
+    async def _load_ban_flags(self, telegram_ids: List[int]) -> Dict[int, bool]:
+        query = "SELECT telegram_id, is_banned FROM users WHERE telegram_id = ANY($1::bigint[])"
+        rows = await self.db.fetch_all(query, telegram_ids)
+        return {row["telegram_id"]: row["is_banned"] for row in rows}
     
     async def ban_user(self, telegram_id: int) -> bool:
         """"ban user"""
         query = "UPDATE users SET is_banned = TRUE WHERE telegram_id = $1"
         result = await self.db.execute(query, telegram_id)
+        await self._invalidate_ban_status(telegram_id)
         return "UPDATE 1" in result
     
     async def unban_user(self, telegram_id: int) -> bool:
         """unban user"""
         query = "UPDATE users SET is_banned = FALSE WHERE telegram_id = $1"
         result = await self.db.execute(query, telegram_id)
+        await self._invalidate_ban_status(telegram_id)
         return "UPDATE 1" in result
+
+    async def ban_users_many(self, telegram_ids: Sequence[int]) -> int:
+        """Ban many users, return number of users updated"""
+        query = "UPDATE users SET is_banned = TRUE WHERE telegram_id = ANY($1::bigint[])"
+        result = await self.db.execute(query, list(telegram_ids))
+        await self._invalidate_ban_status(*telegram_ids)
+        return int(result.split()[-1])
+
+    async def _invalidate_ban_status(self, *telegram_ids: int) -> None:
+        await self._invalidate("users.banned", *telegram_ids)
+        await self._invalidate("users", *telegram_ids)
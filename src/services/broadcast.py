@@ -0,0 +1,213 @@
+import asyncio
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, List, Optional
+import httpx
+from models import Broadcast
+from database.manager import DatabaseManager
+from repositories.broadcast_repository import BroadcastRepository
+from repositories.user_repository import UserRepository
+from services.rate_limiter import InMemoryRateLimiter
+from services.telegram_bot import TelegramBotClient, TelegramError
+from config.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+# Key of the single bucket in the global limiter
+_GLOBAL = 0
+# Bot API codes for a recipient that can't be reached: bot blocked, user deactivated
+_BLOCKED_CODES = (403,)
+
+
+@dataclass
+class _Counters:
+    sent: int = 0
+    failed: int = 0
+    blocked: int = 0
+
+
+class _Progress:
+    """Highest user_id such that every recipient up to it has been handled"""
+
+    def __init__(self, last_user_id: int):
+        self.last_user_id = last_user_id
+        self._entries: deque = deque()
+
+    def add(self, user_id: int) -> list:
+        entry = [user_id, False]
+        self._entries.append(entry)
+        return entry
+
+    def complete(self, entry: list) -> None:
+        entry[1] = True
+        entries = self._entries
+        while entries and entries[0][1]:
+            self.last_user_id = entries.popleft()[0]
+
+
+class BroadcastDispatcher:
+    """
+    Sends a broadcast to every non-banned user.
+    Recipients are streamed from users in keyset pages on user_id and
+    handed to concurrency senders. Each send waits for a token from the
+    per-chat bucket and then the global one (Telegram allows ~30 messages per
+    second per bot and about one per second per chat); a 429 pauses every
+    sender for its retry_after. Progress is checkpointed every
+    checkpoint_interval seconds as the highest user_id with all recipients
+    before it handled, so an interrupted broadcast resumes from there and
+    re-sends at most the messages in flight at the time.
+    """
+
+    def __init__(
+            self,
+            db: DatabaseManager,
+            bot: TelegramBotClient,
+            concurrency: int = 100,
+            global_rate: float = 25.0,
+            per_chat_rate: float = 1.0,
+            batch_size: int = 1000,
+            checkpoint_interval: float = 5.0,
+            max_attempts: int = 3
+    ):
+        self.db = db
+        self.bot = bot
+        self.concurrency = concurrency
+        self.batch_size = batch_size
+        self.checkpoint_interval = checkpoint_interval
+        self.max_attempts = max_attempts
+        self.broadcasts = BroadcastRepository(db)
+        self.users = UserRepository(db)
+        # Bursts of at most one second's worth of messages
+        burst = max(1, int(global_rate))
+        self._global = InMemoryRateLimiter(burst, burst / global_rate)
+        self._per_chat = InMemoryRateLimiter(1, 1 / per_chat_rate)
+        self._paused_until = 0.0
+
+    @classmethod
+    def from_config(cls, db: DatabaseManager, bot: TelegramBotClient, config: Any) -> "BroadcastDispatcher":
+        return cls(
+            db,
+            bot,
+            concurrency=config.BROADCAST_CONCURRENCY,
+            global_rate=config.BROADCAST_GLOBAL_RATE,
+            per_chat_rate=config.BROADCAST_PER_CHAT_RATE,
+            batch_size=config.BROADCAST_BATCH_SIZE
+        )
+
+    async def create(self, text: str, parse_mode: Optional[str] = None) -> Broadcast:
+        return await self.broadcasts.create(text, parse_mode)
+
+    async def resume_unfinished(self) -> List[Broadcast]:
+        """Run every pending or interrupted broadcast to completion, oldest first"""
+        return [await self.run(broadcast.broadcast_id) for broadcast in await self.broadcasts.get_unfinished()]
+
+    async def run(self, broadcast_id: int) -> Broadcast:
+        """
+        Send broadcast_id, continuing from its last checkpoint.
+        Cancelling stops sending and leaves it 'running' with a final checkpoint.
+        """
+        broadcast = await self.broadcasts.get(broadcast_id)
+        if broadcast is None:
+            raise ValueError(f"Unknown broadcast: {broadcast_id}")
+        if broadcast.status in ("completed", "cancelled"):
+            return broadcast
+
+        await self.broadcasts.set_status(broadcast_id, "running")
+        progress = _Progress(broadcast.last_user_id)
+        counters = _Counters(broadcast.sent, broadcast.failed, broadcast.blocked)
+        recipients: asyncio.Queue = asyncio.Queue(self.batch_size)
+        started = time.perf_counter()
+        logger.info(f"Broadcast {broadcast_id} starting after user_id {broadcast.last_user_id}")
+
+        async def produce() -> None:
+            after = broadcast.last_user_id
+            while True:
+                page = await self.users.get_recipients(after, self.batch_size)
+                for user_id, telegram_id in page:
+                    await recipients.put((progress.add(user_id), telegram_id))
+                if len(page) < self.batch_size:
+                    break
+                after = page[-1][0]
+            for _ in range(self.concurrency):
+                await recipients.put(None)
+
+        async def send() -> None:
+            while (item := await recipients.get()) is not None:
+                entry, telegram_id = item
+                outcome = await self._deliver(telegram_id, broadcast.text, broadcast.parse_mode)
+                setattr(counters, outcome, getattr(counters, outcome) + 1)
+                progress.complete(entry)
+
+        async def checkpoints() -> None:
+            while True:
+                await asyncio.sleep(self.checkpoint_interval)
+                await self._checkpoint(broadcast_id, progress, counters)
+
+        workers = [asyncio.create_task(produce())]
+        workers += [asyncio.create_task(send()) for _ in range(self.concurrency)]
+        checkpointer = asyncio.create_task(checkpoints())
+        try:
+            await asyncio.gather(*workers)
+        finally:
+            for task in (*workers, checkpointer):
+                task.cancel()
+            # Also on cancellation, so a resume doesn't re-send what went out
+            await asyncio.shield(self._checkpoint(broadcast_id, progress, counters))
+
+        await self.broadcasts.set_status(broadcast_id, "completed")
+        elapsed = time.perf_counter() - started
+        logger.info(
+            f"Broadcast {broadcast_id} completed in {elapsed:.0f}s: "
+            f"{counters.sent} sent, {counters.blocked} blocked, {counters.failed} failed"
+        )
+        return await self.broadcasts.get(broadcast_id)
+
+    async def _checkpoint(self, broadcast_id: int, progress: _Progress, counters: _Counters) -> None:
+        try:
+            await self.broadcasts.checkpoint(
+                broadcast_id, progress.last_user_id, counters.sent, counters.failed, counters.blocked
+            )
+        except Exception as e:
+            logger.error(f"Failed to checkpoint broadcast {broadcast_id}: {e}")
+
+    async def _deliver(self, telegram_id: int, text: str, parse_mode: Optional[str]) -> str:
+        """Send one message, returns the counter to bump: sent, blocked or failed"""
+        attempts = 0
+        while True:
+            await self._throttle(telegram_id)
+            try:
+                await self.bot.send_message(telegram_id, text, parse_mode)
+                return "sent"
+            except TelegramError as e:
+                if e.retry_after:
+                    # Flood limit hit anyway, every sender backs off; not a failed attempt
+                    self._paused_until = max(self._paused_until, time.monotonic() + e.retry_after)
+                    continue
+                if e.code in _BLOCKED_CODES:
+                    return "blocked"
+                if not e.transient:
+                    logger.warning(f"Broadcast to {telegram_id} failed: {e}")
+                    return "failed"
+                error: Exception = e
+            except httpx.HTTPError as e:
+                error = e
+            # Transport failure or a 5xx from Telegram or a proxy in front of it
+            attempts += 1
+            if attempts >= self.max_attempts:
+                logger.warning(f"Broadcast to {telegram_id} failed: {error}")
+                return "failed"
+            await asyncio.sleep(0.5 * 2 ** (attempts - 1))
+
+    async def _throttle(self, telegram_id: int) -> None:
+        """Wait for a per-chat token and a global one, taking both at once"""
+        while True:
+            now = time.monotonic()
+            wait = self._paused_until - now
+            if wait <= 0:
+                wait = self._per_chat.retry_after(telegram_id, now) or self._global.retry_after(_GLOBAL, now)
+                if wait <= 0:
+                    self._per_chat.try_acquire(telegram_id, now)
+                    self._global.try_acquire(_GLOBAL, now)
+                    return
+            await asyncio.sleep(wait)
@@ -0,0 +1,110 @@
+import asyncio
+import time
+from collections import deque
+from typing import Any, Deque, Optional
+from database.manager import DatabaseManager
+from repositories.outbox_repository import SUBSCRIPTION_DEACTIVATED
+from config.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+class ExpirySweeper:
+    """
+    Background job deactivating expired and over-quota paid subscriptions.
+    Each batch is a single UPDATE ... RETURNING over at most batch_size rows,
+    run on a background connection so interactive queries keep their pool.
+    The same statement adds a subscription.deactivated outbox event per row
+    (payload: subscription_id and reason, 'expired' or 'quota_exceeded'),
+    so a user is never deactivated without being notified; the events take
+    the per-user outbox locks in telegram_id order, like OutboxRepository.add.
+    """
+
+    SWEEP_QUERY = f"""
+        WITH due AS (
+            SELECT id FROM subscriptions
+            WHERE is_active = TRUE
+            AND (
+                expires_at <= NOW()
+                OR traffic_used_bytes >= traffic_limit_bytes + extra_traffic_bytes
+            )
+            ORDER BY id
+            LIMIT $1
+            FOR UPDATE SKIP LOCKED
+        ),
+        deactivated AS (
+            UPDATE subscriptions s
+            SET is_active = FALSE
+            FROM due
+            WHERE s.id = due.id
+            RETURNING s.id, s.telegram_id,
+                CASE WHEN s.expires_at <= NOW() THEN 'expired' ELSE 'quota_exceeded' END AS reason
+        ),
+        events AS (
+            INSERT INTO outbox (telegram_id, event_type, payload)
+            SELECT d.telegram_id, '{SUBSCRIPTION_DEACTIVATED}',
+                jsonb_build_object('subscription_id', d.id, 'reason', d.reason)
+            FROM (SELECT * FROM deactivated ORDER BY telegram_id) d,
+            LATERAL pg_advisory_xact_lock(d.telegram_id)
+        )
+        SELECT id, telegram_id, reason FROM deactivated
+    """
+
+    def __init__(
+            self,
+            db: DatabaseManager,
+            interval: float = 60.0,
+            batch_size: int = 500
+    ):
+        self.db = db
+        self.interval = interval
+        self.batch_size = batch_size
+        self.batch_latencies: Deque[float] = deque(maxlen=1000)
+        self._task: Optional[asyncio.Task] = None
+
+    @classmethod
+    def from_config(cls, db: DatabaseManager, config: Any) -> "ExpirySweeper":
+        return cls(
+            db,
+            interval=config.SWEEP_INTERVAL_SECONDS,
+            batch_size=config.SWEEP_BATCH_SIZE
+        )
+
+    async def sweep_once(self) -> int:
+        """Deactivate everything currently due, return number of subscriptions"""
+        total = 0
+        while True:
+            started = time.perf_counter()
+            async with self.db.background_connection() as conn:
+                rows = await conn.fetch(self.SWEEP_QUERY, self.batch_size)
+            latency = time.perf_counter() - started
+            self.batch_latencies.append(latency)
+            logger.info(
+                "Sweep batch finished",
+                deactivated=len(rows),
+                latency_ms=round(latency * 1000, 2)
+            )
+
+            total += len(rows)
+            if len(rows) < self.batch_size:
+                return total
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.sweep_once()
+            except Exception as e:
+                logger.error(f"Expiry sweep failed: {e}")
+            await asyncio.sleep(self.interval)
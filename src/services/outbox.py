@@ -0,0 +1,144 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from models import OutboxEvent
+from database.manager import DatabaseManager
+from repositories.outbox_repository import OutboxRepository
+from config.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+Handler = Callable[[OutboxEvent], Awaitable[None]]
+
+
+class OutboxDispatcher:
+    """
+    Delivers outbox events to the handlers registered for their event_type.
+    Each worker claims a batch with FOR UPDATE SKIP LOCKED on a background
+    connection, runs the handlers concurrently (the batch holds at most one
+    event per user), then deletes the delivered events and reschedules the
+    failed ones with exponential backoff in the same transaction. Workers in
+    this and other processes never get the same event, and a user's next
+    event isn't claimed before the previous one is gone.
+
+    Workers sleep until NOTIFY on the outbox channel, sent once per
+    committing transaction that added events; idle_timeout only bounds the
+    wait for events backed off after a failure. Delivery is at least once:
+    if the claiming transaction doesn't commit, its events are delivered
+    again, so handlers must be idempotent.
+    """
+
+    def __init__(
+            self,
+            db: DatabaseManager,
+            workers: int = 2,
+            batch_size: int = 100,
+            max_attempts: int = 10,
+            retry_base_delay: float = 1.0,
+            retry_max_delay: float = 300.0,
+            handler_timeout: float = 30.0,
+            idle_timeout: float = 30.0
+    ):
+        """
+        workers: concurrent claim loops, each holds a background connection
+        while it has a batch, so at most DB_BACKGROUND_MAX_CONNECTIONS run at once.
+        max_attempts: failed deliveries before an event moves to outbox_dead.
+        """
+        self.db = db
+        self.workers = workers
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.retry_base_delay = retry_base_delay
+        self.retry_max_delay = retry_max_delay
+        self.handler_timeout = handler_timeout
+        self.idle_timeout = idle_timeout
+        self.outbox = OutboxRepository(db)
+        self._handlers: Dict[str, Handler] = {}
+        self._wakeup = asyncio.Event()
+        self._tasks: List[asyncio.Task] = []
+
+    @classmethod
+    def from_config(cls, db: DatabaseManager, config: Any) -> "OutboxDispatcher":
+        return cls(
+            db,
+            workers=config.OUTBOX_WORKERS,
+            batch_size=config.OUTBOX_BATCH_SIZE,
+            max_attempts=config.OUTBOX_MAX_ATTEMPTS
+        )
+
+    def register(self, event_type: str, handler: Handler) -> None:
+        """Deliver events of event_type to handler, one handler per type"""
+        self._handlers[event_type] = handler
+
+    async def start(self) -> None:
+        """Drain what's already there, then follow new events in the background"""
+        await self.db.listen(self.outbox.CHANNEL, self._on_notify)
+        if not self._tasks:
+            self._tasks = [asyncio.create_task(self._run()) for _ in range(self.workers)]
+
+    async def stop(self) -> None:
+        """Cancel workers, a batch in flight rolls back and is delivered again later"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def dispatch_once(self) -> int:
+        """Claim and deliver one batch, returns the number of events claimed"""
+        async with self.db.background_connection() as conn:
+            async with conn.transaction():
+                events = await self.outbox.claim(self.batch_size, conn)
+                if not events:
+                    return 0
+                results = await asyncio.gather(
+                    *(self._deliver(event) for event in events), return_exceptions=True
+                )
+                delivered = []
+                for event, result in zip(events, results):
+                    if isinstance(result, BaseException):
+                        await self._failed(event, result, conn)
+                    else:
+                        delivered.append(event.event_id)
+                if delivered:
+                    await self.outbox.complete(delivered, conn)
+        return len(events)
+
+    async def _deliver(self, event: OutboxEvent) -> None:
+        handler = self._handlers.get(event.event_type)
+        if handler is None:
+            raise LookupError(f"No handler for {event.event_type}")
+        await asyncio.wait_for(handler(event), self.handler_timeout)
+
+    async def _failed(self, event: OutboxEvent, error: BaseException, conn) -> None:
+        message = f"{type(error).__name__}: {error}"
+        if event.attempts + 1 >= self.max_attempts:
+            logger.error(
+                f"Outbox event {event.event_id} ({event.event_type}) failed {event.attempts + 1} times, "
+                f"moved to outbox_dead: {message}"
+            )
+            await self.outbox.bury(event.event_id, message, conn)
+            return
+        delay = min(self.retry_max_delay, self.retry_base_delay * 2 ** event.attempts)
+        logger.warning(
+            f"Outbox event {event.event_id} ({event.event_type}) failed, retrying in {delay:.0f}s: {message}"
+        )
+        await self.outbox.retry(event.event_id, message, delay, conn)
+
+    async def _on_notify(self, payload: Optional[str]) -> None:
+        # None after a listener reconnect, events may have been added meanwhile
+        self._wakeup.set()
+
+    async def _run(self) -> None:
+        while True:
+            # Cleared before claiming, so a NOTIFY during the batch triggers another pass
+            self._wakeup.clear()
+            try:
+                claimed = await self.dispatch_once()
+            except Exception as e:
+                logger.error(f"Outbox dispatch failed: {e}")
+                claimed = 0
+            if claimed >= self.batch_size:
+                continue
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.idle_timeout)
+            except asyncio.TimeoutError:
+                pass
@@ -0,0 +1,295 @@
+import asyncio
+import gzip
+import os
+import re
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Any, List, Optional, Sequence
+from database.manager import DatabaseManager
+from config.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+_BOUND = re.compile(r"FROM \((.+?)\) TO \((.+?)\)")
+
+
+def month_start(value: datetime, months: int = 0) -> datetime:
+    """First instant of value's month shifted by months"""
+    index = value.year * 12 + value.month - 1 + months
+    return datetime(index // 12, index % 12 + 1, 1)
+
+
+def _parse_bound(value: str) -> Optional[datetime]:
+    if value in ("MINVALUE", "MAXVALUE"):
+        return None
+    return datetime.fromisoformat(value.strip("'"))
+
+
+@dataclass(frozen=True)
+class PartitionedTable:
+    """Table range-partitioned by month on key, named {name}_yYYYYmMM"""
+    name: str
+    key: str
+    months_ahead: int = 3
+    # None keeps every partition
+    retention_months: Optional[int] = None
+
+
+@dataclass
+class Partition:
+    name: str
+    # None for MINVALUE / MAXVALUE
+    lower: Optional[datetime]
+    upper: Optional[datetime]
+
+
+class PartitionMaintainer:
+    """
+    Background job for monthly partitioned tables.
+    Creates partitions months_ahead in advance so inserts never hit a missing
+    range, and archives partitions entirely older than retention_months:
+    detach, COPY to {archive_dir}/{partition}.csv.gz, drop. Old rows leave
+    without a DELETE or vacuum over the live table. Detached partitions are
+    recorded in partition_archives, only those are ever dumped and dropped;
+    tables detached by hand are left alone.
+
+    Run exactly one per database: start() in one long-lived process, or
+    run_once() from a scheduler via
+    `python -m src.database.migrations maintain-partitions`. Rows arriving
+    for a month without a partition land in the DEFAULT partition and are
+    moved when the month's partition is created.
+    """
+
+    def __init__(
+            self,
+            db: DatabaseManager,
+            tables: Sequence[PartitionedTable],
+            archive_dir: str = "archive",
+            interval: float = 6 * 3600.0
+    ):
+        self.db = db
+        self.tables = tables
+        self.archive_dir = Path(archive_dir)
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+
+    @classmethod
+    def from_config(cls, db: DatabaseManager, config: Any) -> "PartitionMaintainer":
+        """Maintainer for transactions and traffic_usage from AppConfig"""
+        return cls(
+            db,
+            (
+                PartitionedTable(
+                    "transactions",
+                    "created_at",
+                    config.PARTITION_MONTHS_AHEAD,
+                    config.TRANSACTIONS_RETENTION_MONTHS or None
+                ),
+                PartitionedTable(
+                    "traffic_usage",
+                    "recorded_at",
+                    config.PARTITION_MONTHS_AHEAD,
+                    config.TRAFFIC_USAGE_RETENTION_MONTHS or None
+                ),
+            ),
+            archive_dir=config.ARCHIVE_DIR,
+            interval=config.PARTITION_MAINTENANCE_INTERVAL_SECONDS
+        )
+
+    async def partitions(self, table: str, conn=None) -> List[Partition]:
+        """Attached range partitions of table ordered by lower bound"""
+        query = """
+            SELECT c.relname, pg_get_expr(c.relpartbound, c.oid) AS bound
+            FROM pg_inherits i
+            JOIN pg_class c ON c.oid = i.inhrelid
+            WHERE i.inhparent = $1::regclass
+        """
+        rows = await self.db.fetch_all(query, table, conn=conn)
+        partitions = []
+        for row in rows:
+            match = _BOUND.search(row["bound"])
+            if match is None:
+                # DEFAULT partition
+                continue
+            partitions.append(
+                Partition(row["relname"], _parse_bound(match.group(1)), _parse_bound(match.group(2)))
+            )
+        partitions.sort(key=lambda partition: partition.lower or datetime.min)
+        return partitions
+
+    async def ensure_partitions(self, table: PartitionedTable, now: Optional[datetime] = None) -> List[str]:
+        """Create missing partitions from this month to months_ahead, return their names"""
+        now = now or datetime.now()
+        created = []
+        # Catalog reads and DDL on one primary connection, never a lagging replica
+        async with self.db.background_connection() as conn:
+            existing = await self.partitions(table.name, conn=conn)
+            for offset in range(table.months_ahead + 1):
+                lower, upper = month_start(now, offset), month_start(now, offset + 1)
+                # The pre-partitioning table covers everything up to some month boundary
+                if any(_overlaps(partition, lower, upper) for partition in existing):
+                    continue
+                name = f"{table.name}_y{lower.year}m{lower.month:02d}"
+                async with conn.transaction():
+                    moved = await self._create_partition(table, name, lower, upper, conn)
+                created.append(name)
+                logger.info(f"Created partition {name}, {moved} rows moved from the default partition")
+        return created
+
+    async def _create_partition(
+            self,
+            table: PartitionedTable,
+            name: str,
+            lower: datetime,
+            upper: datetime,
+            conn
+    ) -> int:
+        """Create name for [lower, upper), taking over its rows from the DEFAULT partition"""
+        bounds = f"FOR VALUES FROM ('{lower.isoformat()}') TO ('{upper.isoformat()}')"
+        default = await conn.fetchval(
+            """
+            SELECT c.relname FROM pg_partitioned_table p
+            JOIN pg_class c ON c.oid = p.partdefid
+            WHERE p.partrelid = $1::regclass
+            """,
+            table.name
+        )
+        if default is not None:
+            # Holds inserts into the default partition until commit, so no row
+            # for this month slips in between the move and the attach
+            await conn.execute(f'LOCK TABLE "{default}" IN ACCESS EXCLUSIVE MODE')
+            stray = await conn.fetchval(
+                f'SELECT EXISTS (SELECT 1 FROM "{default}" WHERE "{table.key}" >= $1 AND "{table.key}" < $2)',
+                lower, upper
+            )
+            if stray:
+                logger.warning(f"{default} has rows for {name}, partition maintenance fell behind")
+                await conn.execute(
+                    f'CREATE TABLE "{name}" (LIKE "{table.name}" INCLUDING DEFAULTS INCLUDING CONSTRAINTS)'
+                )
+                result = await conn.execute(
+                    f"""
+                    WITH moved AS (
+                        DELETE FROM "{default}"
+                        WHERE "{table.key}" >= $1 AND "{table.key}" < $2
+                        RETURNING *
+                    )
+                    INSERT INTO "{name}" SELECT * FROM moved
+                    """,
+                    lower, upper
+                )
+                await conn.execute(f'ALTER TABLE "{table.name}" ATTACH PARTITION "{name}" {bounds}')
+                return int(result.split()[-1])
+
+        await conn.execute(f'CREATE TABLE IF NOT EXISTS "{name}" PARTITION OF "{table.name}" {bounds}')
+        return 0
+
+    async def archive_expired(self, table: PartitionedTable, now: Optional[datetime] = None) -> List[Path]:
+        """Archive partitions whose whole range is older than retention_months, return the files"""
+        if table.retention_months is None:
+            return []
+        cutoff = month_start(now or datetime.now(), -table.retention_months)
+        archived = []
+        async with self.db.background_connection() as conn:
+            for partition in await self.partitions(table.name, conn=conn):
+                if partition.upper is None or partition.upper > cutoff:
+                    continue
+                async with conn.transaction():
+                    await conn.execute(
+                        """
+                        INSERT INTO partition_archives (partition_name, parent_table) VALUES ($1, $2)
+                        ON CONFLICT (partition_name) DO NOTHING
+                        """,
+                        partition.name, table.name
+                    )
+                    await conn.execute(f'ALTER TABLE "{table.name}" DETACH PARTITION "{partition.name}"')
+                logger.info(f"Detached partition {partition.name}")
+
+            # Includes partitions detached by an earlier run that died before dropping them
+            for name in await self._detached(table.name, conn):
+                archived.append(await self._archive(name, conn))
+        return archived
+
+    async def _detached(self, table: str, conn) -> List[str]:
+        """Partitions of table this maintainer detached and hasn't dropped yet"""
+        query = """
+            SELECT a.partition_name, c.relispartition
+            FROM partition_archives a
+            LEFT JOIN pg_class c
+                ON c.relname = a.partition_name
+                AND c.relnamespace = current_schema()::regnamespace
+            WHERE a.parent_table = $1
+            ORDER BY a.detached_at
+        """
+        names = []
+        for row in await self.db.fetch_all(query, table, conn=conn):
+            name = row["partition_name"]
+            if row["relispartition"] is None:
+                logger.warning(f"Detached partition {name} no longer exists, forgetting it")
+                await conn.execute("DELETE FROM partition_archives WHERE partition_name = $1", name)
+            elif row["relispartition"]:
+                logger.warning(f"{name} was re-attached after being detached, not archiving it")
+                await conn.execute("DELETE FROM partition_archives WHERE partition_name = $1", name)
+            else:
+                names.append(name)
+        return names
+
+    async def _archive(self, name: str, conn) -> Path:
+        """Dump a detached partition to gzip CSV, then drop it"""
+        self.archive_dir.mkdir(parents=True, exist_ok=True)
+        path = self.archive_dir / f"{name}.csv.gz"
+        partial = path.with_name(path.name + ".partial")
+
+        with gzip.open(partial, "wb") as out:
+            async def write(chunk: bytes) -> None:
+                # Compression and disk I/O stay off the event loop
+                await asyncio.to_thread(out.write, chunk)
+
+            await conn.copy_from_table(name, output=write, format="csv", header=True)
+        await asyncio.to_thread(_fsync, partial)
+        # Only a complete dump replaces the file and allows the drop
+        os.replace(partial, path)
+        async with conn.transaction():
+            await conn.execute(f'DROP TABLE "{name}"')
+            await conn.execute("DELETE FROM partition_archives WHERE partition_name = $1", name)
+
+        logger.info(f"Archived partition {name} to {path}")
+        return path
+
+    async def run_once(self) -> None:
+        for table in self.tables:
+            await self.ensure_partitions(table)
+            await self.archive_expired(table)
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.run_once()
+            except Exception as e:
+                logger.error(f"Partition maintenance failed: {e}")
+            await asyncio.sleep(self.interval)
+
+
+def _overlaps(partition: Partition, lower: datetime, upper: datetime) -> bool:
+    starts_before_end = partition.lower is None or partition.lower < upper
+    ends_after_start = partition.upper is None or partition.upper > lower
+    return starts_before_end and ends_after_start
+
+
+def _fsync(path: Path) -> None:
+    with open(path, "rb") as f:
+        os.fsync(f.fileno())
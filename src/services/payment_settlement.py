@@ -0,0 +1,127 @@
+import asyncio
+from dataclasses import dataclass
+from typing import List, Optional, Sequence
+from models import Transaction, Subscription, Purchase
+from database.manager import DatabaseManager
+from repositories.plan_catalog import PlanCatalog
+from repositories.purchase_repository import PurchaseRepository
+from repositories.subscription_repository import SubscriptionRepository
+from repositories.transaction_repository import TransactionRepository
+from services.zarinpal import ZarinpalClient
+from config.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+TOMAN_TO_RIAL = 10
+
+@dataclass
+class SettlementResult:
+    authority: str
+    status: str  # 'completed', 'failed', 'already_settled', 'not_pending' or 'error'
+    transaction: Optional[Transaction] = None
+    subscription: Optional[Subscription] = None
+
+class PaymentSettlement:
+    """
+    Verifies pending payments against Zarinpal and settles them.
+    Verification calls run concurrently; each settlement is one database
+    transaction guarded by UPDATE ... WHERE status = 'pending', so duplicate
+    callbacks for the same authority are settled exactly once.
+    """
+
+    def __init__(
+            self,
+            db: DatabaseManager,
+            zarinpal: ZarinpalClient,
+            catalog: PlanCatalog
+    ):
+        self.db = db
+        self.zarinpal = zarinpal
+        self.catalog = catalog
+        self.transactions = TransactionRepository(db)
+        self.purchases = PurchaseRepository(db)
+        self.subscriptions = SubscriptionRepository(db)
+
+    async def settle(self, authority: str) -> SettlementResult:
+        """Verify and settle a single payment callback"""
+        return (await self.settle_many([authority]))[0]
+
+    async def settle_many(self, authorities: Sequence[str]) -> List[SettlementResult]:
+        """Verify and settle a batch of authorities, results keep input order"""
+        pending = {
+            tx.authority: tx
+            for tx in await self.transactions.get_pending_by_authorities(authorities)
+        }
+        return await asyncio.gather(
+            *(self._settle_one(authority, pending.get(authority)) for authority in authorities)
+        )
+
+    async def _settle_one(
+            self,
+            authority: str,
+            transaction: Optional[Transaction]
+    ) -> SettlementResult:
+        if transaction is None:
+            return SettlementResult(authority, "not_pending")
+
+        try:
+            verification = await self.zarinpal.verify(
+                authority, transaction.price_toman * TOMAN_TO_RIAL
+            )
+            if not (verification.is_paid or verification.is_failed):
+                # Gateway couldn't tell, the user may well have paid
+                logger.warning(f"Inconclusive verification of {authority}: code {verification.code}")
+                return SettlementResult(authority, "error", transaction)
+
+            async with self.db.transaction() as conn:
+                if verification.is_failed:
+                    settled = await self.transactions.settle(authority, "failed", conn=conn)
+                    return SettlementResult(
+                        authority, "failed" if settled else "already_settled", settled
+                    )
+
+                settled = await self.transactions.settle(
+                    authority, "completed", verification.ref_id or 0, conn=conn
+                )
+                if settled is None:
+                    return SettlementResult(authority, "already_settled")
+
+                purchase = await self.purchases.create_purchase(
+                    settled.telegram_id, settled.transaction_id, settled.price_toman, conn=conn
+                )
+                subscription = await self._apply_purchase(settled, purchase, conn)
+                return SettlementResult(authority, "completed", settled, subscription)
+        except Exception as e:
+            # Transaction stays pending and is picked up by the next run
+            logger.error(f"Failed to settle payment {authority}: {e}")
+            return SettlementResult(authority, "error", transaction)
+
+    async def _apply_purchase(
+            self,
+            transaction: Transaction,
+            purchase: Purchase,
+            conn
+    ) -> Optional[Subscription]:
+        if transaction.transaction_type == "plan_purchase":
+            plan = self.catalog.get_plan_by_id(transaction.plan_id)
+            if plan is None:
+                raise ValueError(f"Unknown plan {transaction.plan_id}")
+            return await self.subscriptions.creat_subscription(
+                transaction.telegram_id, purchase.purchase_id,
+                plan.traffic_bytes, plan.duration_days,
+                conn=conn
+            )
+
+        if transaction.transaction_type == "extra_traffic_purchase":
+            extra_plan = self.catalog.get_extra_traffic_plan_by_id(transaction.extra_traffic_plan_id)
+            if extra_plan is None:
+                raise ValueError(f"Unknown extra traffic plan {transaction.extra_traffic_plan_id}")
+            subscription = await self.subscriptions.add_extra_traffic(
+                transaction.telegram_id, extra_plan.traffic_bytes, conn=conn
+            )
+            if subscription is None:
+                # Rolls the settlement back, the payment stays pending for a refund
+                raise ValueError(f"No subscription to add extra traffic to for {transaction.telegram_id}")
+            return subscription
+
+        raise ValueError(f"Unknown transaction type {transaction.transaction_type}")
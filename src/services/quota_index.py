@@ -0,0 +1,199 @@
+from array import array
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Iterator, Optional
+
+# Slot markers in the key array, telegram ids are positive
+_EMPTY = 0
+_DELETED = -1
+_MAX_LOAD = 0.7
+_GOLDEN = 0x9E3779B97F4A7C15
+_MASK64 = 0xFFFFFFFFFFFFFFFF
+_EPOCH = datetime(1970, 1, 1)
+
+NONE = 0
+FREE = 1
+PAID = 2
+
+
+def to_seconds(value: datetime) -> int:
+    """Naive timestamp (as stored in Postgres) as whole seconds since the epoch"""
+    return int((value - _EPOCH).total_seconds())
+
+
+@dataclass(slots=True)
+class Quota:
+    telegram_id: int
+    expires_at: datetime
+    total_traffic_bytes: int
+    traffic_used_bytes: int
+    # FREE or PAID
+    kind: int
+
+    @property
+    def remaining_traffic_bytes(self) -> int:
+        return max(0, self.total_traffic_bytes - self.traffic_used_bytes)
+
+
+class QuotaIndex:
+    """
+    Effective quota per telegram_id in flat arrays.
+    Open addressing with linear probing over an array('q') of keys, values in
+    parallel arrays (expires_at as epoch seconds, total and used bytes, kind),
+    so an entry costs ~25 bytes per slot instead of a dict entry plus a
+    model object. Lookups are O(1) and allocate nothing.
+    Not thread-safe; meant for a single event loop.
+    """
+
+    def __init__(self, capacity: int = 1024):
+        size = 8
+        while size * _MAX_LOAD < capacity:
+            size <<= 1
+        self._allocate(size)
+
+    def _allocate(self, size: int) -> None:
+        self._mask = size - 1
+        self._shift = 64 - (size.bit_length() - 1)
+        self._keys = array("q", [_EMPTY]) * size
+        self._expires = array("q", [0]) * size
+        self._total = array("q", [0]) * size
+        self._used = array("q", [0]) * size
+        self._kinds = array("b", [NONE]) * size
+        self._count = 0
+        # Live entries plus tombstones, drives resizing
+        self._filled = 0
+
+    def _home(self, telegram_id: int) -> int:
+        return ((telegram_id * _GOLDEN) & _MASK64) >> self._shift
+
+    def _find(self, telegram_id: int) -> int:
+        # 0 and -1 are the slot markers, would match empty slots and tombstones
+        if telegram_id <= 0:
+            return -1
+        keys, mask = self._keys, self._mask
+        slot = self._home(telegram_id)
+        while True:
+            key = keys[slot]
+            if key == telegram_id:
+                return slot
+            if key == _EMPTY:
+                return -1
+            slot = (slot + 1) & mask
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __contains__(self, telegram_id: int) -> bool:
+        return self._find(telegram_id) >= 0
+
+    @property
+    def capacity(self) -> int:
+        return self._mask + 1
+
+    def memory_bytes(self) -> int:
+        """Bytes held by the arrays"""
+        return sum(
+            values.buffer_info()[1] * values.itemsize
+            for values in (self._keys, self._expires, self._total, self._used, self._kinds)
+        )
+
+    def put(
+            self,
+            telegram_id: int,
+            expires_at: datetime,
+            total_traffic_bytes: int,
+            traffic_used_bytes: int,
+            kind: int = PAID
+    ) -> None:
+        """Insert or replace the quota of telegram_id"""
+        if telegram_id <= 0:
+            raise ValueError(f"Invalid telegram_id: {telegram_id}")
+        self._put(telegram_id, to_seconds(expires_at), total_traffic_bytes, traffic_used_bytes, kind)
+
+    def _put(self, telegram_id: int, expires: int, total: int, used: int, kind: int) -> None:
+        if (self._filled + 1) > self.capacity * _MAX_LOAD:
+            self._resize(self.capacity * 2 if self._count * 2 > self._filled else self.capacity)
+
+        keys, mask = self._keys, self._mask
+        slot = self._home(telegram_id)
+        reusable = -1
+        while True:
+            key = keys[slot]
+            if key == telegram_id:
+                break
+            if key == _EMPTY:
+                if reusable >= 0:
+                    slot = reusable
+                else:
+                    self._filled += 1
+                self._count += 1
+                keys[slot] = telegram_id
+                break
+            if key == _DELETED and reusable < 0:
+                reusable = slot
+            slot = (slot + 1) & mask
+
+        self._expires[slot] = expires
+        self._total[slot] = total
+        self._used[slot] = used
+        self._kinds[slot] = kind
+
+    def remove(self, telegram_id: int) -> bool:
+        slot = self._find(telegram_id)
+        if slot < 0:
+            return False
+        self._keys[slot] = _DELETED
+        self._kinds[slot] = NONE
+        self._count -= 1
+        return True
+
+    def _resize(self, size: int) -> None:
+        """Rehash live entries into size slots, also clears tombstones"""
+        entries = list(self._entries())
+        self._allocate(size)
+        for entry in entries:
+            self._put(*entry)
+
+    def _entries(self) -> Iterator[tuple]:
+        for slot, key in enumerate(self._keys):
+            if key > 0:
+                yield key, self._expires[slot], self._total[slot], self._used[slot], self._kinds[slot]
+
+    def replace_with(self, other: "QuotaIndex") -> None:
+        """Take over other's contents, e.g. after loading a fresh snapshot into it"""
+        self._mask, self._shift = other._mask, other._shift
+        self._keys, self._expires = other._keys, other._expires
+        self._total, self._used, self._kinds = other._total, other._used, other._kinds
+        self._count, self._filled = other._count, other._filled
+
+    # ----- lookups -----
+
+    def get(self, telegram_id: int) -> Optional[Quota]:
+        slot = self._find(telegram_id)
+        if slot < 0:
+            return None
+        return Quota(
+            telegram_id,
+            _EPOCH + timedelta(seconds=self._expires[slot]),
+            self._total[slot],
+            self._used[slot],
+            self._kinds[slot],
+        )
+
+    def remaining_bytes(self, telegram_id: int, now: Optional[int] = None) -> int:
+        """Bytes telegram_id may still pass, 0 when unknown or expired. now is epoch seconds"""
+        slot = self._find(telegram_id)
+        if slot < 0:
+            return 0
+        if self._expires[slot] <= (now if now is not None else to_seconds(datetime.now())):
+            return 0
+        return max(0, self._total[slot] - self._used[slot])
+
+    def allowed(self, telegram_id: int, now: Optional[int] = None) -> bool:
+        """May telegram_id still pass traffic"""
+        return self.remaining_bytes(telegram_id, now) > 0
+
+    def expires_at(self, telegram_id: int) -> int:
+        """Expiry as epoch seconds, 0 when unknown"""
+        slot = self._find(telegram_id)
+        return self._expires[slot] if slot >= 0 else 0
@@ -0,0 +1,231 @@
+import asyncio
+from datetime import datetime, timedelta
+from typing import Any, List, Optional, Set
+from database.manager import DatabaseManager
+from services.quota_index import QuotaIndex, FREE, PAID, to_seconds
+from config.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+
+class QuotaIndexSync:
+    """
+    Keeps a QuotaIndex current with Postgres.
+    Loads a full snapshot of effective quotas (the active paid subscription,
+    else the unexpired free one), then re-reads single users when they are
+    dirty: on NOTIFY from the quota_changed triggers (new, renewed,
+    deactivated subscriptions, extra traffic), and when they show up in
+    traffic_usage since the last poll (TrafficAccumulator flushes). Re-reads
+    fetch absolute values, so seeing a user twice is harmless. All reads go
+    to the primary, a lagging replica would undo a notified change.
+    """
+
+    CHANNEL = "quota_changed"
+
+    SNAPSHOT_QUERY = f"""
+        SELECT DISTINCT ON (telegram_id) * FROM (
+            SELECT telegram_id, expires_at, traffic_limit_bytes + extra_traffic_bytes,
+                traffic_used_bytes, {PAID} AS kind
+            FROM subscriptions
+            WHERE is_active = TRUE AND expires_at > NOW()
+            UNION ALL
+            SELECT telegram_id, expires_at, traffic_limit_bytes, traffic_used_bytes, {FREE}
+            FROM free_subscriptions
+            WHERE expires_at > NOW()
+        ) quotas
+        ORDER BY telegram_id, kind DESC, expires_at DESC
+    """
+
+    USERS_QUERY = f"""
+        SELECT u.telegram_id, q.*
+        FROM unnest($1::bigint[]) AS u (telegram_id)
+        CROSS JOIN LATERAL (
+            (
+                SELECT expires_at, traffic_limit_bytes + extra_traffic_bytes,
+                    traffic_used_bytes, {PAID} AS kind
+                FROM subscriptions
+                WHERE telegram_id = u.telegram_id AND is_active = TRUE AND expires_at > NOW()
+                ORDER BY expires_at DESC
+                LIMIT 1
+            )
+            UNION ALL
+            (
+                SELECT expires_at, traffic_limit_bytes, traffic_used_bytes, {FREE}
+                FROM free_subscriptions
+                WHERE telegram_id = u.telegram_id AND expires_at > NOW()
+                ORDER BY expires_at DESC
+                LIMIT 1
+            )
+            ORDER BY kind DESC
+            LIMIT 1
+        ) q
+    """
+
+    def __init__(
+            self,
+            db: DatabaseManager,
+            index: Optional[QuotaIndex] = None,
+            interval: float = 5.0,
+            usage_overlap: float = 10.0,
+            batch_size: int = 1000
+    ):
+        """
+        interval: seconds between traffic_usage polls.
+        usage_overlap: seconds each poll reaches back, covers flush
+        transactions that commit after the previous poll with an older
+        recorded_at.
+        """
+        self.db = db
+        self.index = index if index is not None else QuotaIndex()
+        self.interval = interval
+        self.usage_overlap = timedelta(seconds=usage_overlap)
+        self.batch_size = batch_size
+        self._dirty: Set[int] = set()
+        self._reload_pending = False
+        self._usage_since: Optional[datetime] = None
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    @classmethod
+    def from_config(cls, db: DatabaseManager, config: Any, index: Optional[QuotaIndex] = None) -> "QuotaIndexSync":
+        return cls(
+            db,
+            index,
+            interval=config.QUOTA_SYNC_INTERVAL_SECONDS,
+            usage_overlap=config.QUOTA_USAGE_OVERLAP_SECONDS
+        )
+
+    async def start(self) -> None:
+        """Load the snapshot, then follow changes in the background"""
+        # Subscribe first so a change racing the snapshot isn't missed
+        await self.db.listen(self.CHANNEL, self._on_quota_changed)
+        await self.reload()
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def reload(self) -> None:
+        """Build a fresh index from a full snapshot and swap it in"""
+        fresh = QuotaIndex(max(1024, len(self.index)))
+        async with self.db.background_connection() as conn:
+            started = await conn.fetchval("SELECT LOCALTIMESTAMP")
+            async with conn.transaction():
+                async for row in conn.cursor(self.SNAPSHOT_QUERY, prefetch=self.batch_size * 10):
+                    fresh.put(*row)
+        self.index.replace_with(fresh)
+        self._usage_since = started - self.usage_overlap
+        logger.info(f"Quota index loaded: {len(fresh)} users, {fresh.memory_bytes() // 1024} KiB")
+
+    async def refresh(self, telegram_ids: List[int]) -> None:
+        """Re-read the quotas of telegram_ids, users without one are dropped"""
+        async with self.db.background_connection() as conn:
+            rows = await conn.fetch(self.USERS_QUERY, telegram_ids)
+        found = set()
+        for row in rows:
+            self.index.put(*row)
+            found.add(row[0])
+        for telegram_id in telegram_ids:
+            if telegram_id not in found:
+                self.index.remove(telegram_id)
+
+    async def poll_usage(self) -> None:
+        """Mark users with traffic recorded since the last poll dirty"""
+        query = """
+            SELECT DISTINCT telegram_id FROM traffic_usage
+            WHERE recorded_at >= $1
+        """
+        async with self.db.background_connection() as conn:
+            now = await conn.fetchval("SELECT LOCALTIMESTAMP")
+            rows = await conn.fetch(query, self._usage_since or now - self.usage_overlap)
+        self._usage_since = now - self.usage_overlap
+        self._dirty.update(row[0] for row in rows)
+
+    async def sync_once(self) -> None:
+        if self._reload_pending:
+            self._reload_pending = False
+            await self.reload()
+        await self.poll_usage()
+        while self._dirty:
+            batch = [self._dirty.pop() for _ in range(min(self.batch_size, len(self._dirty)))]
+            try:
+                await self.refresh(batch)
+            except BaseException:
+                self._dirty.update(batch)
+                raise
+
+    async def _on_quota_changed(self, payload: Optional[str]) -> None:
+        if payload is None:
+            # Listener reconnected, notifications may have been lost
+            self._reload_pending = True
+        else:
+            self._dirty.add(int(payload))
+        self._wakeup.set()
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.sync_once()
+            except Exception as e:
+                logger.error(f"Quota index sync failed: {e}")
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+
+class QuotaServer:
+    """
+    Local quota lookups for edge nodes over TCP.
+    Line protocol, pipelining allowed: the client sends a telegram_id per
+    line and gets "<remaining_bytes> <expires_at>" back, expires_at in epoch
+    seconds. Unknown and expired users get remaining 0, malformed lines
+    and non-positive ids "ERR".
+    """
+
+    def __init__(self, index: QuotaIndex, host: str = "127.0.0.1", port: int = 8790):
+        self.index = index
+        self.host = host
+        self.port = port
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self) -> None:
+        self._server = await asyncio.start_server(self._serve, self.host, self.port)
+        logger.info(f"Quota server listening on {self.host}:{self.port}")
+
+    async def stop(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while line := await reader.readline():
+                writer.write(self.answer(line))
+                # Answers are batched per read, drain only when the buffer fills up
+                if writer.transport.get_write_buffer_size() > 64 * 1024:
+                    await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    def answer(self, line: bytes) -> bytes:
+        try:
+            telegram_id = int(line)
+        except ValueError:
+            return b"ERR\n"
+        if telegram_id <= 0:
+            return b"ERR\n"
+        now = to_seconds(datetime.now())
+        remaining = self.index.remaining_bytes(telegram_id, now)
+        return b"%d %d\n" % (remaining, self.index.expires_at(telegram_id))
@@ -0,0 +1,131 @@
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Optional
+
+
+class RateLimiter(ABC):
+    """
+    Per-user message rate limiter.
+    Checked before any repository call so abusive traffic never reaches the pool.
+    """
+
+    def __init__(self, limit: int, window: float = 60.0):
+        if limit <= 0:
+            raise ValueError("limit must be positive")
+        self.limit = limit
+        self.window = window
+
+    @abstractmethod
+    async def allow(self, telegram_id: int) -> bool:
+        """Take one message from the user's budget, False when over the limit"""
+
+    @classmethod
+    def from_config(cls, config: Any, redis: Any = None) -> "RateLimiter":
+        """Redis-backed limiter when a client is given (multi-worker), in-process otherwise"""
+        if redis is not None:
+            return RedisRateLimiter(redis, config.RATE_LIMIT_MESSAGES_PER_MINUTE)
+        return InMemoryRateLimiter(config.RATE_LIMIT_MESSAGES_PER_MINUTE)
+
+
+class InMemoryRateLimiter(RateLimiter):
+    """
+    Token bucket per telegram_id for a single worker.
+    Buckets are kept in last-use order, so idle ones are evicted from the
+    front in O(1); a bucket idle for a whole window is full anyway.
+    """
+
+    def __init__(self, limit: int, window: float = 60.0, max_buckets: int = 1_000_000):
+        super().__init__(limit, window)
+        self.max_buckets = max_buckets
+        self._rate = limit / window
+        self._buckets: "OrderedDict[int, list]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    def try_acquire(self, telegram_id: int, now: Optional[float] = None) -> bool:
+        """Synchronous check, see allow"""
+        if now is None:
+            now = time.monotonic()
+
+        bucket = self._buckets.get(telegram_id)
+        if bucket is None:
+            bucket = [float(self.limit), now]
+            self._buckets[telegram_id] = bucket
+        else:
+            bucket[0] = min(self.limit, bucket[0] + (now - bucket[1]) * self._rate)
+            bucket[1] = now
+            self._buckets.move_to_end(telegram_id)
+
+        allowed = bucket[0] >= 1.0
+        if allowed:
+            bucket[0] -= 1.0
+
+        self._evict(now)
+        return allowed
+
+    async def allow(self, telegram_id: int) -> bool:
+        return self.try_acquire(telegram_id)
+
+    def retry_after(self, telegram_id: int, now: Optional[float] = None) -> float:
+        """Seconds until the user's bucket holds a token again, 0 when it does now"""
+        bucket = self._buckets.get(telegram_id)
+        if bucket is None:
+            return 0.0
+        if now is None:
+            now = time.monotonic()
+        tokens = min(self.limit, bucket[0] + (now - bucket[1]) * self._rate)
+        return max(0.0, (1.0 - tokens) / self._rate)
+
+    def _evict(self, now: float) -> None:
+        buckets = self._buckets
+        while buckets:
+            telegram_id, (_, updated) = next(iter(buckets.items()))
+            if now - updated < self.window and len(buckets) <= self.max_buckets:
+                break
+            del buckets[telegram_id]
+
+
+class RedisRateLimiter(RateLimiter):
+    """
+    Token bucket per telegram_id in Redis, shared by all workers.
+    The bucket is updated atomically by a Lua script using the Redis clock;
+    idle buckets expire on their own.
+    """
+
+    SCRIPT = """
+        local capacity = tonumber(ARGV[1])
+        local rate = tonumber(ARGV[2])
+        local ttl = tonumber(ARGV[3])
+        local clock = redis.call('TIME')
+        local now = tonumber(clock[1]) * 1000 + math.floor(tonumber(clock[2]) / 1000)
+
+        local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+        local tokens = tonumber(state[1]) or capacity
+        local updated = tonumber(state[2]) or now
+        tokens = math.min(capacity, tokens + (now - updated) * rate)
+
+        local allowed = 0
+        if tokens >= 1 then
+            tokens = tokens - 1
+            allowed = 1
+        end
+        redis.call('HSET', KEYS[1], 'tokens', tokens, 'updated', now)
+        redis.call('PEXPIRE', KEYS[1], ttl)
+        return allowed
+    """
+
+    def __init__(self, redis: Any, limit: int, window: float = 60.0, prefix: str = "ezlink:rl"):
+        super().__init__(limit, window)
+        self.prefix = prefix
+        self._rate_per_ms = limit / (window * 1000)
+        self._ttl_ms = int(window * 1000)
+        self._script = redis.register_script(self.SCRIPT)
+
+    async def allow(self, telegram_id: int) -> bool:
+        allowed = await self._script(
+            keys=[f"{self.prefix}:{telegram_id}"],
+            args=[self.limit, self._rate_per_ms, self._ttl_ms]
+        )
+        return bool(allowed)
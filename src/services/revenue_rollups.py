@@ -0,0 +1,171 @@
+from dataclasses import dataclass
+from datetime import date, timedelta
+from typing import List, Optional
+from database.manager import DatabaseManager
+from config.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+# Aggregate of transactions completed on $1, in revenue_daily's shape. Nothing
+# completes before it's created, the created_at bound prunes later partitions
+_DAY_QUERY = """
+    SELECT
+        $1::date,
+        t.transaction_type,
+        COALESCE(t.plan_id, t.extra_traffic_plan_id, 0),
+        t.transaction_id % 16,
+        COUNT(*),
+        SUM(t.price_toman),
+        SUM(COALESCE(t.traffic_bytes, 0))
+    FROM transactions t
+    WHERE t.completed_at >= $1::date AND t.completed_at < $1::date + 1
+    AND t.created_at < $1::date + 1
+    AND t.status = 'completed'
+    GROUP BY 2, 3, 4
+"""
+
+# Rollups against a fresh aggregate over [$1, $2), only the rows that differ
+_VERIFY_QUERY = """
+    WITH expected AS (
+        SELECT
+            t.completed_at::date AS day,
+            t.transaction_type,
+            COALESCE(t.plan_id, t.extra_traffic_plan_id, 0) AS plan_id,
+            COUNT(*) AS purchases,
+            SUM(t.price_toman) AS revenue_toman,
+            SUM(COALESCE(t.traffic_bytes, 0)) AS traffic_bytes
+        FROM transactions t
+        WHERE t.completed_at >= $1::date AND t.completed_at < $2::date
+        AND t.created_at < $2::date
+        AND t.status = 'completed'
+        GROUP BY 1, 2, 3
+    ),
+    actual AS (
+        SELECT day, transaction_type, plan_id,
+            SUM(purchases) AS purchases,
+            SUM(revenue_toman) AS revenue_toman,
+            SUM(traffic_bytes) AS traffic_bytes
+        FROM revenue_daily
+        WHERE day >= $1 AND day < $2
+        GROUP BY 1, 2, 3
+        -- Shards left at zero by completed-then-refunded transactions
+        HAVING SUM(purchases) <> 0 OR SUM(revenue_toman) <> 0 OR SUM(traffic_bytes) <> 0
+    )
+    SELECT
+        day, transaction_type, plan_id,
+        e.purchases AS expected_purchases, a.purchases AS actual_purchases,
+        e.revenue_toman AS expected_revenue_toman, a.revenue_toman AS actual_revenue_toman,
+        e.traffic_bytes AS expected_traffic_bytes, a.traffic_bytes AS actual_traffic_bytes
+    FROM expected e
+    FULL JOIN actual a USING (day, transaction_type, plan_id)
+    WHERE (e.purchases, e.revenue_toman, e.traffic_bytes)
+        IS DISTINCT FROM (a.purchases, a.revenue_toman, a.traffic_bytes)
+    ORDER BY day, transaction_type, plan_id
+"""
+
+
+@dataclass
+class RollupMismatch:
+    day: date
+    transaction_type: str
+    plan_id: int
+    expected_purchases: Optional[int]
+    actual_purchases: Optional[int]
+    expected_revenue_toman: Optional[int]
+    actual_revenue_toman: Optional[int]
+    expected_traffic_bytes: Optional[int]
+    actual_traffic_bytes: Optional[int]
+
+
+class RevenueRollups:
+    """
+    Maintenance of revenue_daily outside the rollup_revenue trigger.
+    backfill() rebuilds days from transactions one day per transaction,
+    recording progress in rollup_backfills so an interrupted run continues
+    from the next unfinished day. verify() compares the rollups with a full
+    recompute from one snapshot.
+    """
+
+    NAME = "revenue_daily"
+
+    def __init__(self, db: DatabaseManager):
+        self.db = db
+
+    async def recompute_day(self, day: date, conn) -> None:
+        """Replace day's rollups with an aggregate of transactions, conn must be in a transaction"""
+        # Conflicts with the trigger's ROW EXCLUSIVE: waits for settlements that
+        # already touched revenue_daily to commit and holds new ones until this
+        # commits, so no settlement is both in the aggregate and added on top
+        await conn.execute("LOCK TABLE revenue_daily IN SHARE ROW EXCLUSIVE MODE")
+        await conn.execute("DELETE FROM revenue_daily WHERE day = $1", day)
+        await conn.execute(
+            f"""
+            INSERT INTO revenue_daily (
+                day, transaction_type, plan_id, shard, purchases, revenue_toman, traffic_bytes
+            )
+            {_DAY_QUERY}
+            """,
+            day
+        )
+
+    async def backfill(self, day_from: Optional[date] = None, day_to: Optional[date] = None) -> int:
+        """
+        Rebuild rollups for [day_from, day_to), returns the number of days done.
+        Without a range, continues an unfinished backfill, or starts one from
+        the first completion through today. Safe while settlements run.
+        """
+        async with self.db.background_connection() as conn:
+            if day_from is None and day_to is None:
+                state = await self.db.fetch_one(
+                    "SELECT next_day, until_day FROM rollup_backfills WHERE name = $1",
+                    self.NAME, conn=conn
+                )
+                if state:
+                    day_from, day_to = state["next_day"], state["until_day"]
+            if day_from is None or day_to is None:
+                bounds = await self.db.fetch_one(
+                    "SELECT MIN(completed_at)::date AS first_day, CURRENT_DATE + 1 AS tomorrow FROM transactions",
+                    conn=conn
+                )
+                day_from = day_from or bounds["first_day"] or bounds["tomorrow"]
+                day_to = day_to or bounds["tomorrow"]
+            await self.db.execute(
+                """
+                INSERT INTO rollup_backfills (name, next_day, until_day)
+                VALUES ($1, $2, $3)
+                ON CONFLICT (name) DO UPDATE SET
+                    next_day = EXCLUDED.next_day,
+                    until_day = EXCLUDED.until_day,
+                    updated_at = NOW()
+                """,
+                self.NAME, day_from, day_to, conn=conn
+            )
+
+            days = 0
+            day = day_from
+            while day < day_to:
+                async with conn.transaction():
+                    await self.recompute_day(day, conn)
+                    await self.db.execute(
+                        "UPDATE rollup_backfills SET next_day = $2, updated_at = NOW() WHERE name = $1",
+                        self.NAME, day + timedelta(days=1), conn=conn
+                    )
+                day += timedelta(days=1)
+                days += 1
+            if days:
+                logger.info(f"Backfilled {days} days of revenue rollups through {day_to - timedelta(days=1)}")
+            return days
+
+    async def verify(self, day_from: date, day_to: date) -> List[RollupMismatch]:
+        """
+        (day, type, plan) rows over [day_from, day_to) where the rollups differ
+        from transactions, read from one REPEATABLE READ snapshot. Only
+        meaningful for days whose partitions haven't been archived.
+        """
+        async with self.db.background_connection() as conn:
+            async with conn.transaction(isolation="repeatable_read", readonly=True):
+                rows = await self.db.fetch_all(_VERIFY_QUERY, day_from, day_to, conn=conn)
+        mismatches = [RollupMismatch(**row) for row in rows]
+        if mismatches:
+            logger.warning(f"{len(mismatches)} revenue rollups differ from transactions in [{day_from}, {day_to})")
+        return mismatches
@@ -0,0 +1,290 @@
+import asyncio
+import multiprocessing
+import os
+import queue
+import signal
+import time
+from collections import deque
+from typing import Any, AsyncIterable, Awaitable, Callable, Deque, Dict, List, Optional
+from database.manager import DatabaseManager
+from config.config import DatabaseConfig
+from config.logging_config import get_logger, get_log_pipeline, restart_logging_after_fork
+
+try:
+    import uvloop
+except ImportError:
+    uvloop = None
+
+logger = get_logger(__name__)
+
+Handler = Callable[[Any], Awaitable[None]]
+# Called once per worker with its DatabaseManager, returns the update handler
+Setup = Callable[[DatabaseManager], Awaitable[Handler]]
+
+# Sent through a worker queue to make it drain and exit
+_STOP = None
+
+
+def default_key(update: Any) -> int:
+    return update["telegram_id"]
+
+
+def shard_for(telegram_id: int, workers: int) -> int:
+    """Stable worker index for telegram_id; mixes the bits so sequential ids spread evenly"""
+    mixed = (telegram_id * 0x9E3779B97F4A7C15) & 0xFFFFFFFFFFFFFFFF
+    return (mixed >> 32) % workers
+
+
+def split_pool(config: DatabaseConfig, workers: int) -> DatabaseConfig:
+    """Per-worker copy of config sharing DB_MAX_POOL_SIZE (and the other pool limits) between workers"""
+    max_size = max(1, config.DB_MAX_POOL_SIZE // workers)
+    return config.model_copy(update={
+        "DB_MAX_POOL_SIZE": max_size,
+        "DB_MIN_POOL_SIZE": min(max_size, max(1, config.DB_MIN_POOL_SIZE // workers)),
+        "DB_WARMUP_POOL_SIZE": min(max_size, max(1, config.DB_WARMUP_POOL_SIZE // workers)),
+        "DB_BACKGROUND_MAX_CONNECTIONS": min(max_size, max(1, config.DB_BACKGROUND_MAX_CONNECTIONS // workers)),
+    })
+
+
+class OrderedDispatcher:
+    """
+    Runs the handler for up to max_concurrency users at once while updates
+    of the same user are handled strictly one after another, in arrival order.
+    """
+
+    def __init__(self, handler: Handler, key: Callable[[Any], int], max_concurrency: int = 100):
+        self.handler = handler
+        self.key = key
+        self._lanes: Dict[int, Deque[Any]] = {}
+        self._slots = asyncio.Semaphore(max_concurrency)
+        self._tasks: set = set()
+
+    async def submit(self, update: Any) -> None:
+        """Queue update; waits for a free slot when it starts a new lane"""
+        key = self.key(update)
+        lane = self._lanes.get(key)
+        if lane is not None:
+            lane.append(update)
+            return
+
+        await self._slots.acquire()
+        self._lanes[key] = deque([update])
+        task = asyncio.create_task(self._drain(key))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _drain(self, key: int) -> None:
+        lane = self._lanes[key]
+        try:
+            # Updates arriving meanwhile are appended to lane and handled here too
+            while lane:
+                update = lane.popleft()
+                try:
+                    await self.handler(update)
+                except Exception as e:
+                    logger.error(f"Update handler failed for {key}: {e}")
+        finally:
+            del self._lanes[key]
+            self._slots.release()
+
+    async def join(self) -> None:
+        """Wait until every queued update has been handled"""
+        while self._tasks:
+            await asyncio.gather(*self._tasks)
+
+
+async def _worker_loop(
+        index: int,
+        updates: multiprocessing.Queue,
+        setup: Setup,
+        db_config: DatabaseConfig,
+        key: Callable[[Any], int],
+        max_concurrency: int
+) -> None:
+    db = DatabaseManager(db_config)
+    await db.connect()
+    try:
+        dispatcher = OrderedDispatcher(await setup(db), key, max_concurrency)
+        loop = asyncio.get_running_loop()
+        logger.info(f"Worker {index} started, pid {os.getpid()}, pool {db_config.DB_MAX_POOL_SIZE}")
+        while True:
+            # Queue.get blocks, keep it off the event loop
+            update = await loop.run_in_executor(None, updates.get)
+            if update is _STOP:
+                break
+            await dispatcher.submit(update)
+        await dispatcher.join()
+    finally:
+        # Runs shutdown hooks (e.g. TrafficAccumulator flush) before closing the pool
+        await db.disconnect()
+        logger.info(f"Worker {index} drained")
+
+
+def _worker_main(
+        index: int,
+        updates: multiprocessing.Queue,
+        setup: Setup,
+        db_config: DatabaseConfig,
+        key: Callable[[Any], int],
+        max_concurrency: int,
+        use_uvloop: bool
+) -> None:
+    restart_logging_after_fork()
+    # The parent coordinates shutdown, a signal to the whole process group
+    # must not kill workers with updates still queued
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    if use_uvloop:
+        if uvloop is None:
+            logger.warning("uvloop is not installed, using the default event loop")
+        else:
+            asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    try:
+        asyncio.run(_worker_loop(index, updates, setup, db_config, key, max_concurrency))
+    finally:
+        # Forked children exit without atexit handlers, write what's queued now
+        pipeline = get_log_pipeline()
+        if pipeline is not None:
+            pipeline.stop()
+
+
+class ShardedRunner:
+    """
+    Forks worker processes, each with its own event loop and DatabaseManager
+    whose pool gets an equal share of DB_MAX_POOL_SIZE. Updates are routed by
+    telegram_id hash so one user's updates always reach the same worker and
+    are handled in order. SIGTERM/SIGINT stop intake; every worker then
+    handles what is already queued, flushes and disconnects its pool.
+    """
+
+    def __init__(
+            self,
+            setup: Setup,
+            db_config: DatabaseConfig,
+            workers: Optional[int] = None,
+            key: Callable[[Any], int] = default_key,
+            use_uvloop: bool = False,
+            max_concurrency: int = 100,
+            queue_size: int = 10_000,
+            drain_timeout: float = 30.0
+    ):
+        self.setup = setup
+        self.workers = workers or os.cpu_count() or 1
+        self.db_config = split_pool(db_config, self.workers)
+        self.key = key
+        self.use_uvloop = use_uvloop
+        self.max_concurrency = max_concurrency
+        self.drain_timeout = drain_timeout
+        self._context = multiprocessing.get_context("fork")
+        self._queues: List[multiprocessing.Queue] = [
+            self._context.Queue(queue_size) for _ in range(self.workers)
+        ]
+        self._processes: List[Optional[multiprocessing.Process]] = [None] * self.workers
+        self._stopping = False
+
+    @classmethod
+    def from_config(cls, setup: Setup, db_config: DatabaseConfig, config: Any, **kwargs) -> "ShardedRunner":
+        return cls(
+            setup,
+            db_config,
+            workers=config.WORKER_PROCESSES or None,
+            use_uvloop=config.WORKER_USE_UVLOOP,
+            max_concurrency=config.WORKER_MAX_CONCURRENCY,
+            drain_timeout=config.WORKER_DRAIN_TIMEOUT,
+            **kwargs
+        )
+
+    def start(self) -> None:
+        for index in range(self.workers):
+            self._spawn(index)
+
+    def _spawn(self, index: int) -> None:
+        process = self._context.Process(
+            target=_worker_main,
+            args=(
+                index, self._queues[index], self.setup, self.db_config,
+                self.key, self.max_concurrency, self.use_uvloop
+            ),
+            name=f"worker-{index}",
+            daemon=False
+        )
+        process.start()
+        self._processes[index] = process
+
+    def _restart_dead(self) -> None:
+        for index, process in enumerate(self._processes):
+            if process is not None and not process.is_alive() and not self._stopping:
+                logger.error(f"Worker {index} exited with {process.exitcode}, restarting")
+                self._spawn(index)
+
+    async def submit(self, update: Any) -> None:
+        """Route update to its worker, waits while that worker's queue is full"""
+        updates = self._queues[shard_for(self.key(update), self.workers)]
+        try:
+            updates.put_nowait(update)
+        except queue.Full:
+            await asyncio.get_running_loop().run_in_executor(None, updates.put, update)
+
+    async def run(self, source: AsyncIterable[Any]) -> None:
+        """Start workers, feed them from source until it ends or a stop signal, then drain"""
+        loop = asyncio.get_running_loop()
+        stop = asyncio.Event()
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            loop.add_signal_handler(signum, stop.set)
+
+        self.start()
+
+        async def feed() -> None:
+            async for update in source:
+                await self.submit(update)
+
+        async def supervise() -> None:
+            while True:
+                await asyncio.sleep(1.0)
+                self._restart_dead()
+
+        feeder = asyncio.create_task(feed())
+        supervisor = asyncio.create_task(supervise())
+        stopped = asyncio.create_task(stop.wait())
+        try:
+            await asyncio.wait({feeder, stopped}, return_when=asyncio.FIRST_COMPLETED)
+            if feeder.done():
+                feeder.result()
+        finally:
+            for task in (feeder, supervisor, stopped):
+                task.cancel()
+            for signum in (signal.SIGTERM, signal.SIGINT):
+                loop.remove_signal_handler(signum)
+            await loop.run_in_executor(None, self.shutdown)
+
+    def shutdown(self) -> None:
+        """
+        Let every worker handle its queued updates and exit within
+        drain_timeout, killing the ones that don't. Dead workers are skipped,
+        nothing would ever read their stop marker.
+        """
+        self._stopping = True
+        deadline = time.monotonic() + self.drain_timeout
+        stopping: Dict[int, multiprocessing.Process] = {}
+        for index, process in enumerate(self._processes):
+            if process is None:
+                continue
+            if not process.is_alive():
+                logger.warning(f"Worker {index} already exited with {process.exitcode}")
+                continue
+            try:
+                # A stuck worker leaves its queue full, don't wait on it forever
+                self._queues[index].put(_STOP, timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Full:
+                logger.error(f"Worker {index} queue still full after {self.drain_timeout}s, killing it")
+                process.kill()
+                process.join()
+                continue
+            stopping[index] = process
+        for index, process in stopping.items():
+            process.join(max(0.0, deadline - time.monotonic()))
+            if process.is_alive():
+                logger.error(f"Worker {index} did not drain in {self.drain_timeout}s, terminating")
+                process.kill()
+                process.join()
+        logger.info("All workers stopped")
@@ -0,0 +1,80 @@
+import asyncio
+from typing import Any, Dict, Optional
+import httpx
+from config.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+
+class TelegramError(Exception):
+    """Bot API call answered with ok = false"""
+
+    def __init__(self, code: int, description: str, retry_after: Optional[float] = None):
+        super().__init__(f"{code}: {description}")
+        self.code = code
+        self.description = description
+        # Set on 429, seconds the bot has to wait before any further call
+        self.retry_after = retry_after
+
+    @property
+    def transient(self) -> bool:
+        """Server-side or gateway failure, the same call may succeed when retried"""
+        return self.code >= 500
+
+
+class TelegramBotClient:
+    """Pooled Bot API client with bounded concurrency"""
+
+    def __init__(
+            self,
+            token: str,
+            base_url: str = "https://api.telegram.org",
+            max_concurrency: int = 100,
+            timeout: float = 10.0
+    ):
+        self.base_url = f"{base_url.rstrip('/')}/bot{token}"
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._client = httpx.AsyncClient(
+            timeout=timeout,
+            limits=httpx.Limits(
+                max_connections=max_concurrency,
+                max_keepalive_connections=max_concurrency
+            )
+        )
+
+    @classmethod
+    def from_config(cls, config, **kwargs) -> "TelegramBotClient":
+        """Create client from AppConfig"""
+        return cls(config.TELEGRAM_BOT_TOKEN, config.TELEGRAM_API_URL, **kwargs)
+
+    async def call(self, method: str, **params: Any) -> Any:
+        """
+        Call a Bot API method, returns its result.
+        Raises TelegramError when the API refuses the call and
+        httpx.HTTPError on transport failures. A reply that isn't JSON, such
+        as a proxy's HTML 502 page, raises a TelegramError with the HTTP
+        status, transient when that status is 5xx.
+        """
+        payload = {key: value for key, value in params.items() if value is not None}
+        async with self._semaphore:
+            response = await self._client.post(f"{self.base_url}/{method}", json=payload)
+        try:
+            body: Dict[str, Any] = response.json()
+        except ValueError:
+            raise TelegramError(response.status_code, f"Non-JSON response to {method}")
+        if not isinstance(body, dict):
+            raise TelegramError(response.status_code, f"Unexpected response to {method}")
+        if body.get("ok"):
+            return body.get("result")
+        parameters = body.get("parameters") or {}
+        raise TelegramError(
+            body.get("error_code", response.status_code),
+            body.get("description", ""),
+            parameters.get("retry_after")
+        )
+
+    async def send_message(self, chat_id: int, text: str, parse_mode: Optional[str] = None) -> Any:
+        return await self.call("sendMessage", chat_id=chat_id, text=text, parse_mode=parse_mode)
+
+    async def close(self) -> None:
+        await self._client.aclose()
@@ -0,0 +1,91 @@
+import asyncio
+from dataclasses import dataclass
+from typing import Optional
+import httpx
+from config.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+# Zarinpal result codes for a verified payment and an already verified one
+VERIFIED_CODES = (100, 101)
+# Codes that settle the authority for good: amount mismatch, payment not
+# made or cancelled, authority of another merchant, invalid authority.
+# Anything else (merchant misconfiguration, rate limiting, -52 gateway
+# error, unknown codes) says nothing about the payment.
+FAILED_CODES = (-50, -51, -53, -54)
+
+class ZarinpalError(Exception):
+    """Verify response that can't be interpreted, the payment state is unknown"""
+
+@dataclass
+class VerifyResult:
+    authority: str
+    code: int
+    ref_id: Optional[int] = None
+
+    @property
+    def is_paid(self) -> bool:
+        return self.code in VERIFIED_CODES
+
+    @property
+    def is_failed(self) -> bool:
+        return self.code in FAILED_CODES
+
+class ZarinpalClient:
+    """Pooled Zarinpal v4 client with bounded concurrency"""
+
+    def __init__(
+            self,
+            merchant_id: str,
+            base_url: str,
+            max_concurrency: int = 20,
+            timeout: float = 10.0
+    ):
+        self.merchant_id = merchant_id
+        self.base_url = base_url.rstrip("/")
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._client = httpx.AsyncClient(
+            timeout=timeout,
+            limits=httpx.Limits(
+                max_connections=max_concurrency,
+                max_keepalive_connections=max_concurrency
+            )
+        )
+
+    @classmethod
+    def from_config(cls, config, **kwargs) -> "ZarinpalClient":
+        """Create client from AppConfig"""
+        return cls(config.ZARINPAL_MERCHANT_ID, config.zarinpal_base_url, **kwargs)
+
+    async def verify(self, authority: str, amount: int) -> VerifyResult:
+        """
+        Verify payment. amount is in Rial as the gateway expects.
+        Raises httpx.HTTPError on transport failures and error statuses, and
+        ZarinpalError on bodies without a result code, so callers can retry later.
+        """
+        payload = {
+            "merchant_id": self.merchant_id,
+            "amount": amount,
+            "authority": authority,
+        }
+        async with self._semaphore:
+            response = await self._client.post(f"{self.base_url}/verify.json", json=payload)
+
+        response.raise_for_status()
+        try:
+            body = response.json()
+        except ValueError as e:
+            raise ZarinpalError(f"Unparseable verify response for {authority}: {e}") from e
+
+        # data is an object and errors an empty list on success, the other
+        # way around on failure
+        data = body.get("data") if isinstance(body, dict) else None
+        errors = body.get("errors") if isinstance(body, dict) else None
+        if isinstance(data, dict) and "code" in data:
+            return VerifyResult(authority=authority, code=data["code"], ref_id=data.get("ref_id"))
+        if isinstance(errors, dict) and "code" in errors:
+            return VerifyResult(authority=authority, code=errors["code"])
+        raise ZarinpalError(f"Verify response for {authority} has no result code")
+
+    async def close(self) -> None:
+        await self._client.aclose()
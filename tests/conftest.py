@@ -0,0 +1,8 @@
+import sys
+from pathlib import Path
+
+# Same import roots as the benchmarks: PYTHONPATH=src:src/database from the repository root
+ROOT = Path(__file__).resolve().parent.parent
+for path in (ROOT / "src" / "database", ROOT / "src", ROOT):
+    if str(path) not in sys.path:
+        sys.path.insert(0, str(path))
@@ -0,0 +1,115 @@
+"""
+BroadcastDispatcher against the local Bot API stub of benchmarks.broadcast and
+the load-test fake backend.
+"""
+import asyncio
+import time
+from typing import Optional, Set, Tuple
+
+from benchmarks.broadcast import BotApiStub
+from benchmarks.load.dataset import Dataset
+from benchmarks.load.fake import FakeStore, fake_pool_factory
+from src.config.config import DatabaseConfig
+from src.database.manager import DatabaseManager
+from models import Broadcast
+from services.broadcast import BroadcastDispatcher
+from services.telegram_bot import TelegramBotClient
+
+
+def _recipients(dataset: Dataset) -> Set[int]:
+    return {telegram_id for _, telegram_id in FakeStore(dataset).recipients(0, dataset.users)}
+
+
+async def _broadcast(
+        stub: BotApiStub,
+        dataset: Dataset,
+        interrupt_after: Optional[float] = None,
+        **dispatcher_kwargs
+) -> Tuple[Broadcast, Optional[Broadcast], float]:
+    """
+    Run one broadcast to completion, cancelled after interrupt_after seconds
+    and resumed when given; returns (finished, interrupted, elapsed seconds)
+    """
+    base_url = await stub.start()
+    factory = fake_pool_factory(FakeStore(dataset), latency=0, write_latency=0)
+    db = DatabaseManager(DatabaseConfig(), pool_factory=factory)
+    await db.connect()
+    bot = TelegramBotClient("0:stub", base_url, max_concurrency=10, timeout=5.0)
+    dispatcher = BroadcastDispatcher(db, bot, concurrency=10, **dispatcher_kwargs)
+    interrupted = None
+    try:
+        broadcast = await dispatcher.create("Scheduled maintenance tonight")
+        started = time.perf_counter()
+        if interrupt_after is not None:
+            first = asyncio.create_task(dispatcher.run(broadcast.broadcast_id))
+            await asyncio.sleep(interrupt_after)
+            first.cancel()
+            try:
+                await first
+            except asyncio.CancelledError:
+                pass
+            interrupted = await dispatcher.broadcasts.get(broadcast.broadcast_id)
+            (finished,) = await dispatcher.resume_unfinished()
+        else:
+            finished = await dispatcher.run(broadcast.broadcast_id)
+        elapsed = time.perf_counter() - started
+    finally:
+        await bot.close()
+        await db.disconnect()
+        await stub.stop()
+    return finished, interrupted, elapsed
+
+
+def test_sends_stay_under_the_global_rate():
+    dataset = Dataset(users=50, transactions=0)
+    stub = BotApiStub(rate=25.0, blocked_every=10 ** 12)
+    finished, _, elapsed = asyncio.run(_broadcast(stub, dataset, global_rate=20.0))
+
+    recipients = _recipients(dataset)
+    # A burst of 20, the rest at 20 per second
+    assert elapsed >= (len(recipients) - 20) / 20.0 * 0.9
+    assert stub.rejected == 0
+    assert set(stub.delivered) == recipients
+    assert finished.status == "completed"
+    assert finished.sent == len(recipients)
+
+
+def test_flood_limit_pauses_and_retries():
+    dataset = Dataset(users=25, transactions=0)
+    # The dispatcher allows twice what the stub does, so the stub answers 429s
+    stub = BotApiStub(rate=10.0, blocked_every=10 ** 12)
+    finished, _, _ = asyncio.run(_broadcast(stub, dataset, global_rate=20.0))
+
+    recipients = _recipients(dataset)
+    assert stub.rejected > 0
+    assert set(stub.delivered) == recipients
+    assert all(count == 1 for count in stub.delivered.values())
+    assert (finished.sent, finished.failed) == (len(recipients), 0)
+
+
+def test_blocked_users_are_counted_not_retried():
+    dataset = Dataset(users=40, transactions=0)
+    stub = BotApiStub(rate=1000.0, blocked_every=4)
+    finished, _, _ = asyncio.run(_broadcast(stub, dataset, global_rate=1000.0))
+
+    recipients = _recipients(dataset)
+    blocked = {telegram_id for telegram_id in recipients if telegram_id % 4 == 0}
+    assert stub.blocked == len(blocked)
+    assert set(stub.delivered) == recipients - blocked
+    assert (finished.sent, finished.blocked, finished.failed) == (len(recipients - blocked), len(blocked), 0)
+
+
+def test_interrupted_broadcast_resumes_from_checkpoint():
+    dataset = Dataset(users=60, transactions=0)
+    stub = BotApiStub(rate=1000.0, blocked_every=10 ** 12)
+    finished, interrupted, _ = asyncio.run(
+        _broadcast(stub, dataset, interrupt_after=1.0, global_rate=20.0, checkpoint_interval=0.1)
+    )
+
+    recipients = _recipients(dataset)
+    assert interrupted.status == "running"
+    assert 0 < interrupted.last_user_id < dataset.users
+    assert finished.status == "completed"
+    assert set(stub.delivered) == recipients
+    # Only messages in flight at the interruption go out twice
+    assert sum(count - 1 for count in stub.delivered.values()) <= 10
@@ -0,0 +1,195 @@
+import asyncio
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from src.cache import Cache
+from src.cache.local import MISS
+
+
+@dataclass(slots=True)
+class Account:
+    telegram_id: int = 0
+    username: Optional[str] = None
+    created_at: Optional[datetime] = None
+
+
+@dataclass(frozen=True, slots=True)
+class Tier:
+    tier_id: int = 0
+    name: str = ""
+
+
+class FakePubSub:
+    def __init__(self, redis: "FakeRedis"):
+        self.redis = redis
+        self.messages: asyncio.Queue = asyncio.Queue()
+        self.channels: List[str] = []
+
+    async def subscribe(self, channel: str) -> None:
+        self.channels.append(channel)
+        self.redis.subscribers.setdefault(channel, []).append(self)
+
+    async def get_message(self, ignore_subscribe_messages: bool = False, timeout: float = 0.0):
+        try:
+            return await asyncio.wait_for(self.messages.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    async def aclose(self) -> None:
+        for channel in self.channels:
+            self.redis.subscribers[channel].remove(self)
+
+
+class FakeRedis:
+    """The subset of redis.asyncio.Redis used by Cache, shared by several caches like one server"""
+
+    def __init__(self):
+        self.data: Dict[str, Tuple[bytes, float]] = {}
+        self.subscribers: Dict[str, List[FakePubSub]] = {}
+        self.down = False
+
+    def _check(self) -> None:
+        if self.down:
+            raise ConnectionError("Redis is down")
+
+    async def get(self, key: str) -> Optional[bytes]:
+        self._check()
+        entry = self.data.get(key)
+        if entry is None or entry[1] < time.monotonic():
+            return None
+        return entry[0]
+
+    async def set(self, key: str, value: bytes, px: int) -> None:
+        self._check()
+        self.data[key] = (value, time.monotonic() + px / 1000)
+
+    async def delete(self, *keys: str) -> int:
+        self._check()
+        return sum(self.data.pop(key, None) is not None for key in keys)
+
+    async def publish(self, channel: str, message: str) -> int:
+        self._check()
+        subscribers = self.subscribers.get(channel, [])
+        for pubsub in subscribers:
+            pubsub.messages.put_nowait({"type": "message", "channel": channel, "data": message})
+        return len(subscribers)
+
+    def pubsub(self) -> FakePubSub:
+        return FakePubSub(self)
+
+    async def aclose(self) -> None:
+        pass
+
+
+def _cache(redis: FakeRedis) -> Cache:
+    cache = Cache(redis)
+    cache.register_many({"accounts": Account, "tiers": Tier})
+    return cache
+
+
+async def _settle() -> None:
+    # Let subscriber tasks handle published messages
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def test_models_round_trip_through_redis_as_json():
+    async def check():
+        redis = FakeRedis()
+        writer, reader = _cache(redis), _cache(redis)
+        account = Account(42, "ali", datetime(2026, 1, 2, 3, 4, 5))
+        tiers = [Tier(1, "basic"), Tier(2, "pro")]
+        await writer.set("accounts", 42, account)
+        await writer.set("tiers", "all", tiers)
+        await writer.set("accounts.banned", 42, True)
+
+        raw = redis.data[writer._redis_key("accounts", 42)][0]
+        assert raw.startswith(b"{")
+        assert b"ali" in raw
+
+        assert await reader.get("accounts", 42) == account
+        assert await reader.get("tiers", "all") == tiers
+        assert await reader.get("accounts.banned", 42) is True
+        assert reader.stats.redis_hits == 3
+        assert await reader.get("accounts", 42) == account
+        assert reader.stats.local_hits == 1
+
+    asyncio.run(check())
+
+
+def test_unknown_users_are_cached_negatively():
+    async def check():
+        redis = FakeRedis()
+        cache = _cache(redis)
+        loads = []
+
+        async def loader():
+            loads.append(1)
+            return None
+
+        assert await cache.get_or_load("accounts", 7, loader) is None
+        assert await _cache(redis).get_or_load("accounts", 7, loader) is None
+        assert len(loads) == 1
+
+    asyncio.run(check())
+
+
+def test_undecodable_entries_are_misses():
+    async def check():
+        redis = FakeRedis()
+        cache = _cache(redis)
+        redis.data[cache._redis_key("accounts", 1)] = (b"\x80\x04not json", time.monotonic() + 60)
+        await Cache(redis).set("unregistered", 1, Account(1))
+
+        assert await cache.get("accounts", 1) is MISS
+        assert await cache.get("unregistered", 1) is MISS
+        assert cache.stats.misses == 2
+
+    asyncio.run(check())
+
+
+def test_invalidation_reaches_other_processes_local_tier():
+    async def check():
+        redis = FakeRedis()
+        first, second = _cache(redis), _cache(redis)
+        await first.start()
+        await second.start()
+        await _settle()
+
+        await first.set("accounts.banned", 5, False)
+        assert await second.get("accounts.banned", 5) is False
+        await first.invalidate("accounts.banned", [5])
+        await _settle()
+
+        assert second.local.get(("accounts.banned", 5)) is MISS
+        assert await second.get("accounts.banned", 5) is MISS
+        await first.close()
+        await second.close()
+
+    asyncio.run(check())
+
+
+def test_redis_failures_degrade_to_misses():
+    async def check():
+        redis = FakeRedis()
+        cache = _cache(redis)
+        redis.down = True
+        await cache.set("accounts", 3, Account(3))
+        await cache.invalidate("accounts", [3])
+        assert await cache.get("accounts", 3) is MISS
+        assert cache.stats.redis_errors == 3
+
+    asyncio.run(check())
+
+
+def test_namespace_model_conflicts_are_rejected():
+    cache = _cache(FakeRedis())
+    cache.register("accounts", Account)
+    try:
+        cache.register("accounts", Tier)
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("Conflicting registration accepted")
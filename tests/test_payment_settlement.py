@@ -0,0 +1,167 @@
+"""
+PaymentSettlement against a local stub of Zarinpal's verify endpoint and the
+load-test fake backend.
+"""
+import asyncio
+import json
+from typing import Dict, Optional, Tuple
+
+from benchmarks.load.dataset import GB, Dataset
+from benchmarks.load.fake import FakeStore, fake_pool_factory
+from src.config.config import DatabaseConfig
+from src.database.manager import DatabaseManager
+from repositories.plan_catalog import PlanCatalog
+from services.payment_settlement import PaymentSettlement
+from services.zarinpal import ZarinpalClient
+
+TELEGRAM_ID = 100_000_001
+PAID = {"data": {"code": 100, "message": "Paid", "ref_id": 201}, "errors": []}
+NOT_PAID = {"data": [], "errors": {"code": -51, "message": "Session is not active, paid try", "validations": []}}
+GATEWAY_ERROR = {"data": [], "errors": {"code": -52, "message": "Oops!!", "validations": []}}
+
+
+class ZarinpalStub:
+    """verify.json answering each authority with a scripted (status, body)"""
+
+    def __init__(self, responses: Dict[str, Tuple[int, object]]):
+        self.responses = responses
+        self.calls: Dict[str, int] = {}
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self) -> str:
+        self._server = await asyncio.start_server(self._serve, "127.0.0.1", 0)
+        return f"http://127.0.0.1:{self._server.sockets[0].getsockname()[1]}"
+
+    async def stop(self) -> None:
+        self._server.close()
+        await self._server.wait_closed()
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while await reader.readline():
+                headers = {}
+                while (line := await reader.readline()) not in (b"\r\n", b"\n", b""):
+                    name, _, value = line.decode().partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                body = json.loads(await reader.readexactly(int(headers.get("content-length", 0))))
+                authority = body["authority"]
+                self.calls[authority] = self.calls.get(authority, 0) + 1
+                status, payload = self.responses[authority]
+                data = payload if isinstance(payload, bytes) else json.dumps(payload).encode()
+                writer.write(b"HTTP/1.1 %d X\r\ncontent-length: %d\r\n\r\n%s" % (status, len(data), data))
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+
+async def _settle(
+        responses: Dict[str, Tuple[int, object]],
+        authorities,
+        base_url: Optional[str] = None,
+        store: Optional[FakeStore] = None,
+        extra_traffic_plan_id: Optional[int] = None
+):
+    """
+    Settle authorities, each a pending monthly plan purchase or, given
+    extra_traffic_plan_id, extra traffic purchase; returns (results, store, stub)
+    """
+    store = store or FakeStore(Dataset(users=10, transactions=0))
+    for authority in dict.fromkeys(authorities):
+        if extra_traffic_plan_id is None:
+            store.create_transaction(TELEGRAM_ID, "plan_purchase", 150_000, authority, 2, None)
+        else:
+            store.create_transaction(
+                TELEGRAM_ID, "extra_traffic_purchase", 30_000, authority, None, extra_traffic_plan_id
+            )
+    stub = ZarinpalStub(responses)
+    url = await stub.start()
+    db = DatabaseManager(DatabaseConfig(), pool_factory=fake_pool_factory(store, latency=0, write_latency=0))
+    await db.connect()
+    zarinpal = ZarinpalClient("merchant", base_url or url, max_concurrency=4, timeout=2.0)
+    try:
+        catalog = PlanCatalog(db)
+        await catalog.refresh()
+        results = await PaymentSettlement(db, zarinpal, catalog).settle_many(authorities)
+    finally:
+        await zarinpal.close()
+        await db.disconnect()
+        await stub.stop()
+    return results, store, stub
+
+
+def _status(store: FakeStore, authority: str) -> str:
+    return store.transactions[authority][3]
+
+
+def test_paid_payment_completes_with_subscription():
+    results, store, _ = asyncio.run(_settle({"A1": (200, PAID)}, ["A1"]))
+
+    (result,) = results
+    assert result.status == "completed"
+    assert result.transaction.ref_id == 201
+    assert result.subscription.telegram_id == TELEGRAM_ID
+    assert _status(store, "A1") == "completed"
+    assert [event[2] for event in store.outbox] == ["transaction.completed", "subscription.created"]
+
+
+def test_definitive_failure_marks_failed():
+    results, store, _ = asyncio.run(_settle({"A1": (200, NOT_PAID)}, ["A1"]))
+
+    assert results[0].status == "failed"
+    assert _status(store, "A1") == "failed"
+    assert store.outbox == []
+
+
+def test_duplicate_callbacks_settle_once():
+    results, store, stub = asyncio.run(_settle({"A1": (200, PAID)}, ["A1", "A1"]))
+
+    assert sorted(result.status for result in results) == ["already_settled", "completed"]
+    assert stub.calls["A1"] == 2
+    assert [event[2] for event in store.outbox] == ["transaction.completed", "subscription.created"]
+
+
+def test_transport_error_leaves_pending():
+    # Nothing listens on the discard port
+    results, store, _ = asyncio.run(_settle({}, ["A1"], base_url="http://127.0.0.1:9"))
+
+    assert results[0].status == "error"
+    assert _status(store, "A1") == "pending"
+
+
+def test_inconclusive_responses_leave_pending():
+    responses = {
+        "A1": (502, b"<html>Bad Gateway</html>"),
+        "A2": (200, b"<html>maintenance</html>"),
+        "A3": (200, GATEWAY_ERROR),
+    }
+    results, store, _ = asyncio.run(_settle(responses, ["A1", "A2", "A3"]))
+
+    assert [result.status for result in results] == ["error", "error", "error"]
+    assert all(_status(store, authority) == "pending" for authority in responses)
+
+
+def test_extra_traffic_reactivates_subscription_deactivated_over_quota():
+    store = FakeStore(Dataset(users=10, transactions=0))
+    store.create_subscription(TELEGRAM_ID, 1, 50 * GB, 30)
+    store.deactivate_subscriptions(TELEGRAM_ID)
+    results, store, _ = asyncio.run(
+        _settle({"A1": (200, PAID)}, ["A1"], store=store, extra_traffic_plan_id=1)
+    )
+
+    (result,) = results
+    assert result.status == "completed"
+    assert result.subscription.is_active
+    assert result.subscription.traffic_limit_bytes == 60 * GB
+    assert store.active_subscription(TELEGRAM_ID) is not None
+    assert [event[2] for event in store.outbox] == ["transaction.completed", "subscription.traffic_added"]
+
+
+def test_extra_traffic_without_subscription_is_not_completed():
+    results, store, _ = asyncio.run(_settle({"A1": (200, PAID)}, ["A1"], extra_traffic_plan_id=1))
+
+    # Postgres rolls the settlement back, the fake only sees the error
+    assert results[0].status == "error"
+    assert results[0].subscription is None
+    assert "subscription.traffic_added" not in [event[2] for event in store.outbox]
@@ -0,0 +1,149 @@
+"""DatabaseManager read routing over stub primary and replica pools"""
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Dict, List
+
+from src.config.config import DatabaseConfig
+from src.database.manager import DatabaseManager
+from src.database.routing import ReplicaRouter
+
+PRIMARY = "postgresql://primary/db"
+REPLICA_A = "postgresql://replica-a/db"
+REPLICA_B = "postgresql://replica-b/db"
+
+
+class StubConnection:
+    def __init__(self, pool: "StubPool"):
+        self.pool = pool
+
+    async def fetchval(self, query: str, *args, timeout=None):
+        if query == ReplicaRouter.LAG_QUERY:
+            return self.pool.lag
+        self.pool.queries.append(query)
+        # Stay outstanding across a loop iteration, like a real round-trip
+        await asyncio.sleep(0)
+        return self.pool.dsn
+
+    async def fetchrow(self, query: str, *args, timeout=None):
+        self.pool.queries.append(query)
+        return {"dsn": self.pool.dsn}
+
+    async def execute(self, query: str, *args, timeout=None) -> str:
+        self.pool.queries.append(query)
+        return "UPDATE 1"
+
+    @asynccontextmanager
+    async def transaction(self):
+        yield
+
+
+class _StubAcquire:
+    def __init__(self, pool: "StubPool"):
+        self.pool = pool
+
+    async def __aenter__(self) -> StubConnection:
+        if self.pool.down:
+            raise ConnectionRefusedError(f"{self.pool.dsn} is down")
+        return StubConnection(self.pool)
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        pass
+
+
+class StubPool:
+    def __init__(self, dsn: str, lag: float = 0.0):
+        self.dsn = dsn
+        self.lag = lag
+        self.down = False
+        self.queries: List[str] = []
+
+    def acquire(self, timeout=None) -> _StubAcquire:
+        return _StubAcquire(self)
+
+    async def expire_connections(self) -> None:
+        pass
+
+    async def close(self) -> None:
+        pass
+
+
+def _manager(lags: Dict[str, float]):
+    """Connected manager with one StubPool per DSN, the replicas lagging by lags"""
+    pools: Dict[str, StubPool] = {}
+
+    async def create_pool(dsn: str, **kwargs) -> StubPool:
+        pools[dsn] = StubPool(dsn, lags.get(dsn, 0.0))
+        return pools[dsn]
+
+    config = DatabaseConfig(
+        DB_DSN=PRIMARY,
+        DB_REPLICA_DSNS=list(lags),
+        DB_REPLICA_MAX_LAG_SECONDS=5.0,
+        DB_REPLICA_HEALTH_INTERVAL=3600,
+        DB_WARMUP_POOL_SIZE=0
+    )
+    return DatabaseManager(config, pool_factory=create_pool), pools
+
+
+def run(lags: Dict[str, float], check) -> None:
+    async def main():
+        db, pools = _manager(lags)
+        await db.connect()
+        try:
+            await check(db, pools)
+        finally:
+            await db.disconnect()
+    asyncio.run(main())
+
+
+def test_reads_go_to_replicas_writes_and_transactions_to_primary():
+    async def check(db, pools):
+        assert await db.fetch_val("SELECT 1") in (REPLICA_A, REPLICA_B)
+        assert (await db.fetch_one("INSERT INTO t VALUES (1) RETURNING *"))["dsn"] == PRIMARY
+        assert (await db.fetch_one("SELECT * FROM t FOR UPDATE"))["dsn"] == PRIMARY
+        await db.execute("UPDATE t SET x = 1")
+        async with db.transaction():
+            assert await db.fetch_val("SELECT 1") == PRIMARY
+        with db.primary():
+            assert await db.fetch_val("SELECT 1") == PRIMARY
+        assert "UPDATE t SET x = 1" in pools[PRIMARY].queries
+
+    run({REPLICA_A: 0.0, REPLICA_B: 0.0}, check)
+
+
+def test_reads_balance_over_replicas():
+    async def check(db, pools):
+        await asyncio.gather(*(db.fetch_val("SELECT 1") for _ in range(10)))
+        assert pools[REPLICA_A].queries and pools[REPLICA_B].queries
+        assert not pools[PRIMARY].queries
+
+    run({REPLICA_A: 0.0, REPLICA_B: 0.0}, check)
+
+
+def test_lagging_replica_is_excluded():
+    async def check(db, pools):
+        for _ in range(5):
+            assert await db.fetch_val("SELECT 1") == REPLICA_B
+        assert not pools[REPLICA_A].queries
+
+    run({REPLICA_A: 30.0, REPLICA_B: 0.5}, check)
+
+
+def test_falls_back_to_primary_when_all_replicas_lag():
+    async def check(db, pools):
+        assert await db.fetch_val("SELECT 1") == PRIMARY
+
+    run({REPLICA_A: 30.0, REPLICA_B: 60.0}, check)
+
+
+def test_falls_back_to_primary_when_replica_is_unreachable():
+    async def check(db, pools):
+        pools[REPLICA_A].down = True
+        assert await db.fetch_val("SELECT 1") == PRIMARY
+        assert db.replicas.pick() is None
+        # Health check brings it back
+        pools[REPLICA_A].down = False
+        await db.replicas.check_health()
+        assert await db.fetch_val("SELECT 1") == REPLICA_A
+
+    run({REPLICA_A: 0.0}, check)